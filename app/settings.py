@@ -12,6 +12,7 @@ INSTALLED_APPS += [
 ]
 
 MIDDLEWARE = ['debug_toolbar.middleware.DebugToolbarMiddleware'] + list(MIDDLEWARE)
+MIDDLEWARE += ['trionyx_projects.middleware.ConditionalLayoutMiddleware']
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -37,6 +38,8 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'development.sqlite3'),
+        # Project queries read the hourly rate variable from the cache table, that is created after the serialize
+        'TEST': {'SERIALIZE': False},
     }
 }
 
@@ -0,0 +1,55 @@
+"""Budget alerts follow the worked hours down as well as up"""
+from datetime import date
+
+from django.test import TestCase
+from trionyx.trionyx.models import User
+
+from trionyx_projects.models import Project, Item, WorkLog, BudgetAlert
+from trionyx_projects.moves import move_items
+
+
+class BudgetAlertTestCase(TestCase):
+    """Alerts are removed when the worked hours drop under the threshold"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alerts@example.com', 'secret')
+        self.project = Project.objects.create(
+            name='Fixed', code='FIXED', project_type=Project.TYPE_FIXED, fixed_price=1000, project_hourly_rate=100)
+
+    def log(self, item, worked):
+        worklog = WorkLog(item=item, date=date(2026, 1, 5), worked=worked, created_by=self.user)
+        worklog.save()
+        return worklog
+
+    def get_alerts(self, rule):
+        return list(BudgetAlert.objects.filter(rule=rule).order_by('threshold').values_list('project__code', 'threshold'))
+
+    def test_deleted_worklog_clears_item_alert(self):
+        item = Item.objects.create(project=self.project, name='Item', estimate=4)
+        worklog = self.log(item, 5)
+        self.assertEqual(self.get_alerts(BudgetAlert.RULE_ITEM_ESTIMATE), [('FIXED', 100)])
+
+        worklog.delete()
+        self.assertEqual(self.get_alerts(BudgetAlert.RULE_ITEM_ESTIMATE), [])
+
+        self.log(item, 5)
+        self.assertEqual(self.get_alerts(BudgetAlert.RULE_ITEM_ESTIMATE), [('FIXED', 100)])
+
+    def test_deleted_worklog_clears_project_alert(self):
+        item = Item.objects.create(project=self.project, name='Item')
+        self.log(item, 5)
+        worklog = self.log(item, 4)
+        self.assertEqual(self.get_alerts(BudgetAlert.RULE_PROJECT_BUDGET), [('FIXED', 80)])
+
+        worklog.delete()
+        self.assertEqual(self.get_alerts(BudgetAlert.RULE_PROJECT_BUDGET), [])
+
+    def test_move_checks_source_and_target_budget(self):
+        target = Project.objects.create(
+            name='Target', code='TARGET', project_type=Project.TYPE_FIXED, fixed_price=500, project_hourly_rate=100)
+        item = Item.objects.create(project=self.project, name='Item')
+        self.log(item, 9)
+        self.assertEqual(self.get_alerts(BudgetAlert.RULE_PROJECT_BUDGET), [('FIXED', 80)])
+
+        move_items([item], target)
+        self.assertEqual(self.get_alerts(BudgetAlert.RULE_PROJECT_BUDGET), [('TARGET', 80), ('TARGET', 100)])
@@ -0,0 +1,33 @@
+"""Scaling benchmark of the save paths, forms and layouts"""
+import time
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+
+from trionyx_projects.management.commands.benchmark_projects import Command
+
+SIZES = [10, 50]
+
+
+class QuadraticCommand(Command):
+    """Benchmark with an operation that is quadratic in the number of items"""
+
+    operations = [('quadratic', 1)]
+
+    def bench_quadratic(self, project, request):
+        return lambda: time.sleep(project.open_items ** 2 * 1e-6)
+
+
+class BenchmarkTestCase(TestCase):
+    """Operations do not grow superlinear with the smallest seed sizes"""
+
+    def test_operations_scale(self):
+        stdout = StringIO()
+        call_command('benchmark_projects', sizes=SIZES, repeat=3, stdout=stdout)
+        for name, expected in Command.operations:
+            self.assertIn(f'{name:<18} growth exponent', stdout.getvalue())
+
+    def test_superlinear_operation_fails(self):
+        with self.assertRaisesRegex(CommandError, 'quadratic time grows with exponent'):
+            call_command(QuadraticCommand(), sizes=SIZES, repeat=3, stdout=StringIO())
@@ -0,0 +1,143 @@
+"""Billed hours allocation"""
+import threading
+import time
+from datetime import date
+
+from django.db import connection, OperationalError
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase
+from trionyx.trionyx.models import User
+
+from trionyx_projects.models import Project, Item, WorkLog
+
+
+def create_project(**kwargs):
+    return Project.objects.create(**{
+        'name': 'Billing',
+        'code': 'BILL',
+        'project_type': Project.TYPE_HOURLY_BASED,
+        **kwargs,
+    })
+
+
+class AllocateBilledTestCase(TestCase):
+    """Billed hours of a worklog are allocated from the remaining estimate"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('billing@example.com', 'secret')
+        self.project = create_project()
+
+    def log(self, item, worked, billed=None, day=date(2026, 1, 5)):
+        worklog = WorkLog(item=item, date=day, worked=worked, billed=billed, created_by=self.user)
+        worklog.save()
+        return worklog
+
+    def test_billed_is_capped_at_estimate(self):
+        item = Item.objects.create(project=self.project, name='Item', estimate=5)
+
+        self.assertEqual(self.log(item, 3).billed, 3)
+        self.assertEqual(self.log(item, 3).billed, 2)
+        self.assertEqual(self.log(item, 1).billed, 0)
+
+        item.refresh_from_db()
+        self.assertEqual((item.total_worked, item.total_billed), (7, 5))
+
+    def test_without_estimate_billed_is_worked(self):
+        item = Item.objects.create(project=self.project, name='Item')
+        self.assertEqual(self.log(item, 4).billed, 4)
+
+    def test_non_billable_item(self):
+        item = Item.objects.create(project=self.project, name='Item', estimate=5, non_billable=True)
+        self.assertEqual(self.log(item, 2).billed, 0)
+
+    def test_given_billed_is_kept(self):
+        item = Item.objects.create(project=self.project, name='Item', estimate=5)
+        self.assertEqual(self.log(item, 2, billed=1.5).billed, 1.5)
+
+    def test_edit_reallocates_own_hours(self):
+        item = Item.objects.create(project=self.project, name='Item', estimate=5)
+        worklog = self.log(item, 4)
+
+        worklog.worked = 6
+        worklog.billed = None
+        worklog.save()
+
+        self.project.refresh_from_db()
+        self.assertEqual(worklog.billed, 5)
+        self.assertEqual((self.project.total_worked, self.project.total_billed), (6, 5))
+
+    def test_bulk_log_matches_save(self):
+        item = Item.objects.create(project=self.project, name='Item', estimate=5)
+        worklogs = WorkLog.objects.bulk_log([
+            WorkLog(item=item, date=date(2026, 1, 5), worked=3, created_by=self.user),
+            WorkLog(item=item, date=date(2026, 1, 6), worked=3, created_by=self.user),
+        ])
+
+        item.refresh_from_db()
+        self.project.refresh_from_db()
+        self.assertEqual([worklog.billed for worklog in worklogs], [3, 2])
+        self.assertEqual((item.total_worked, item.total_billed), (6, 5))
+        self.assertEqual((self.project.total_worked, self.project.total_billed), (6, 5))
+
+
+class ParallelBillingTestCase(TransactionTestCase):
+    """Worklogs saved from many threads on one item are never billed over the estimate"""
+
+    threads = 8
+    worklogs = 5
+    estimate = 10.0
+    worked = 0.75
+
+    def save_worklog(self, item_id, user, description, retries=100):
+        """
+        SQLite has no row locks and fails fast on concurrent writes, these are retried.
+
+        Commit hooks can fail after the worklog is committed, a committed worklog is not saved again.
+        """
+        for attempt in range(retries + 1):
+            try:
+                if not WorkLog.objects.filter(item_id=item_id, description=description).exists():
+                    WorkLog(
+                        item=Item.objects.get(id=item_id), date=date.today(), worked=self.worked, description=description,
+                        created_by=user).save()
+                return
+            except OperationalError as e:
+                if 'locked' not in str(e) or attempt == retries:
+                    raise
+                time.sleep(0.01 * (attempt + 1))
+
+    def test_parallel_worklogs(self):
+        user = User.objects.create_user('stress@example.com', 'secret')
+        project = create_project(code='STRESS')
+        item = Item.objects.create(project=project, name='Stress item', estimate=self.estimate)
+
+        errors = []
+        barrier = threading.Barrier(self.threads)
+
+        def worker():
+            try:
+                barrier.wait()
+                for number in range(self.worklogs):
+                    self.save_worklog(item.id, user, f'{threading.get_ident()}-{number}')
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        item.refresh_from_db()
+        project.refresh_from_db()
+        logged = item.worklogs.aggregate(worked=Sum('worked'), billed=Sum('billed'))
+
+        self.assertEqual(item.worklogs.count(), self.threads * self.worklogs)
+        self.assertLessEqual(logged['billed'], self.estimate + 1e-6)
+        self.assertAlmostEqual(item.total_billed, logged['billed'])
+        self.assertAlmostEqual(item.total_worked, logged['worked'])
+        self.assertAlmostEqual(project.total_billed, logged['billed'])
+        self.assertAlmostEqual(project.total_worked, logged['worked'])
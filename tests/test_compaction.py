@@ -0,0 +1,72 @@
+"""Worklog compaction keeps totals, revenue and invoices"""
+from datetime import date
+
+from django.db.models import Sum
+from django.test import TestCase
+from trionyx.trionyx.models import User
+
+from trionyx_projects.compaction import PERIOD_DAY, PERIOD_MONTH, compact_worklogs
+from trionyx_projects.models import Project, Item, WorkLog, WorkLogArchive, HourlyRate
+from trionyx_projects.rates import get_revenues
+
+
+class CompactionTestCase(TestCase):
+    """Merged worklogs sum to the same item and project totals"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('compact@example.com', 'secret')
+        self.project = Project.objects.create(name='Compact', code='COMPACT', project_type=Project.TYPE_HOURLY_BASED)
+        self.item = Item.objects.create(project=self.project, name='Item', estimate=20)
+        HourlyRate.objects.create(project=self.project, valid_from=date(2026, 1, 1), rate=100)
+        HourlyRate.objects.create(project=self.project, valid_from=date(2026, 1, 15), rate=120)
+
+        for day in (5, 5, 6, 14, 15, 20, 20):
+            WorkLog(item=self.item, date=date(2026, 1, day), worked=1.5, description=f'Day {day}', created_by=self.user).save()
+        WorkLog(item=self.item, date=date(2026, 2, 2), worked=1, created_by=self.user).save()
+
+    def get_totals(self):
+        self.item.refresh_from_db()
+        self.project.refresh_from_db()
+        return {
+            'worklogs': WorkLog.objects.filter(item=self.item).aggregate(worked=Sum('worked'), billed=Sum('billed')),
+            'item': (self.item.total_worked, self.item.total_billed),
+            'project': (self.project.total_worked, self.project.total_billed, self.project.total_revenue),
+            'revenue': get_revenues([self.project])[self.project.id],
+        }
+
+    def test_day_compaction_keeps_totals(self):
+        totals = self.get_totals()
+        self.assertEqual(compact_worklogs(before=date(2026, 2, 1), period=PERIOD_DAY, archive=False), (2, 2))
+
+        self.assertEqual(self.get_totals(), totals)
+        self.assertEqual(WorkLog.objects.filter(item=self.item).count(), 6)
+        self.assertEqual(WorkLog.objects.get(item=self.item, date=date(2026, 1, 5)).description, 'Day 5')
+
+    def test_month_compaction_splits_on_rate(self):
+        totals = self.get_totals()
+        self.assertEqual(compact_worklogs(before=date(2026, 2, 1), period=PERIOD_MONTH, archive=False), (2, 5))
+
+        self.assertEqual(self.get_totals(), totals)
+        self.assertEqual(
+            sorted(WorkLog.objects.filter(item=self.item, date__lt=date(2026, 2, 1)).values_list('worked', flat=True)),
+            [4.5, 6.0],
+        )
+
+    def test_invoiced_worklogs_are_not_merged_with_open_worklogs(self):
+        WorkLog.objects.filter(item=self.item, date=date(2026, 1, 5)).update(invoiced_on=date(2026, 2, 1))
+
+        compact_worklogs(before=date(2026, 2, 1), period=PERIOD_MONTH, archive=False)
+        self.assertEqual(WorkLog.objects.filter(item=self.item, invoiced_on__isnull=False).count(), 1)
+        self.assertEqual(WorkLog.objects.get(item=self.item, invoiced_on__isnull=False).worked, 3)
+
+    def test_archive_keeps_originals(self):
+        compact_worklogs(before=date(2026, 2, 1), period=PERIOD_DAY, archive=True)
+        compact_worklogs(before=date(2026, 2, 1), period=PERIOD_MONTH, archive=True)
+
+        originals = [row for archive in WorkLogArchive.objects.all() for row in archive.get_worklogs()]
+        self.assertEqual(len(originals), 7)
+        self.assertAlmostEqual(sum(row['worked'] for row in originals), 7 * 1.5)
+
+    def test_dry_run(self):
+        self.assertEqual(compact_worklogs(before=date(2026, 2, 1), period=PERIOD_DAY, archive=False, dry_run=True), (2, 2))
+        self.assertEqual(WorkLog.objects.filter(item=self.item).count(), 8)
@@ -0,0 +1,31 @@
+"""Project change events published after commit"""
+from datetime import date
+from unittest import mock
+
+from django.test import TransactionTestCase
+from trionyx.trionyx.models import User
+
+from trionyx_projects.events import BaseEventBackend
+from trionyx_projects.models import Project, Item, WorkLog
+
+
+class FailingEventBackend(BaseEventBackend):
+    """Backend with an unavailable cache"""
+
+    def publish(self, channel, event):
+        raise ConnectionError('Cache is down')
+
+
+class PublishTestCase(TransactionTestCase):
+    """A failed publish does not fail the committed change"""
+
+    def test_failed_publish_is_logged(self):
+        user = User.objects.create_user('events@example.com', 'secret')
+        project = Project.objects.create(name='Events', code='EVENTS', project_type=Project.TYPE_HOURLY_BASED)
+        item = Item.objects.create(project=project, name='Item')
+
+        with mock.patch('trionyx_projects.events.get_backend', FailingEventBackend):
+            with self.assertLogs('trionyx_projects.events', 'ERROR'):
+                WorkLog(item=item, date=date(2026, 1, 5), worked=1, created_by=user).save()
+
+        self.assertEqual(WorkLog.objects.filter(item=item).count(), 1)
@@ -0,0 +1,47 @@
+"""Startup import time of the app"""
+import json
+import subprocess
+import sys
+
+from django.test import TestCase
+
+from trionyx_projects.conf import settings as app_settings
+from trionyx_projects.management.commands.check_import_time import DEFERRED_MODULES, SETUP_SCRIPT
+
+
+class ImportTimeTestCase(TestCase):
+    """
+    django.setup() stays within the budget and does not import the deferred modules.
+
+    Python -X importtime does not log the modules Django imports with importlib, sys.modules is checked as well.
+    """
+
+    repeat = 3
+
+    def run_setup(self):
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', SETUP_SCRIPT], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.assertEqual(process.returncode, 0, process.stderr.decode(errors='replace')[-2000:])
+
+        imports = {}
+        for line in process.stderr.decode().splitlines():
+            if line.startswith('import time:') and '|' in line and 'self [us]' not in line:
+                _, cumulative, name = line.split('|')
+                imports[name.strip()] = int(cumulative)
+        return json.loads(process.stdout.decode().strip().splitlines()[-1]), imports
+
+    def test_deferred_modules_are_not_imported(self):
+        result, imports = self.run_setup()
+        for name in {'trionyx_projects.project_layouts', 'trionyx_projects.model_forms', *DEFERRED_MODULES}:
+            self.assertNotIn(name, result['modules'])
+            self.assertNotIn(name, imports)
+
+    def test_startup_within_budget(self):
+        runs = [self.run_setup() for _ in range(self.repeat)]
+        (result, imports) = min(runs, key=lambda run: run[0]['ms'])
+        slowest = sorted(imports.items(), key=lambda row: -row[1])[:10]
+        self.assertLessEqual(
+            result['ms'], app_settings.IMPORT_TIME_BUDGET,
+            'Startup took {:.0f}ms, slowest imports: {}'.format(
+                result['ms'], ', '.join(f'{name} {cumulative / 1000:.0f}ms' for name, cumulative in slowest)),
+        )
@@ -0,0 +1,90 @@
+"""Effective dated hourly rates"""
+from datetime import date
+
+from django.test import SimpleTestCase, TestCase
+from trionyx.trionyx.models import User
+
+from trionyx_projects.models import Project, Item, WorkLog, HourlyRate
+from trionyx_projects.rates import RateTimeline, get_timelines, get_revenues
+
+
+class RateTimelineTestCase(SimpleTestCase):
+    """Days are bisected against the rate boundaries"""
+
+    def setUp(self):
+        self.default = RateTimeline([(date(2026, 1, 1), 50)], 40)
+        self.timeline = RateTimeline([
+            (date(2026, 3, 1), 100),
+            (date(2026, 2, 1), 80),
+            (date(2026, 4, 1), None),
+        ], self.default)
+
+    def test_rate_on_boundaries(self):
+        self.assertEqual(self.timeline.rate_on(date(2026, 2, 1)), 80)
+        self.assertEqual(self.timeline.rate_on(date(2026, 2, 28)), 80)
+        self.assertEqual(self.timeline.rate_on(date(2026, 3, 1)), 100)
+
+    def test_rate_falls_back_before_first_period(self):
+        self.assertEqual(self.timeline.rate_on(date(2026, 1, 31)), 50)
+        self.assertEqual(self.timeline.rate_on(date(2025, 12, 31)), 40)
+
+    def test_empty_rate_falls_back(self):
+        self.assertEqual(self.timeline.rate_on(date(2026, 4, 1)), 50)
+
+    def test_price_matches_rate_per_day(self):
+        hours = [
+            (date(2025, 12, 31), 1),
+            (date(2026, 1, 15), 2),
+            (date(2026, 2, 1), 3),
+            (date(2026, 3, 5), 0.5),
+            (date(2026, 3, 6), None),
+            (date(2026, 4, 2), 4),
+        ]
+        self.assertAlmostEqual(
+            self.timeline.price(hours),
+            sum(float(billed or 0) * self.timeline.rate_on(day) for day, billed in hours),
+        )
+        self.assertAlmostEqual(self.timeline.price(hours), 1 * 40 + 2 * 50 + 3 * 80 + 0.5 * 100 + 4 * 50)
+
+    def test_price_without_hours(self):
+        self.assertEqual(self.timeline.price([]), 0)
+
+
+class RevenueTestCase(TestCase):
+    """Revenue of a project is priced with the rate of each worklog date"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('rates@example.com', 'secret')
+        self.project = Project.objects.create(name='Rates', code='RATES', project_type=Project.TYPE_HOURLY_BASED)
+        self.item = Item.objects.create(project=self.project, name='Item')
+
+    def log(self, day, worked):
+        WorkLog(item=self.item, date=day, worked=worked, created_by=self.user).save()
+
+    def test_timeline_falls_back_to_default_rates(self):
+        HourlyRate.objects.create(valid_from=date(2026, 1, 1), rate=70)
+        HourlyRate.objects.create(project=self.project, valid_from=date(2026, 6, 1), rate=90)
+
+        timeline = get_timelines([self.project], default_rate=30)[self.project.id]
+        self.assertEqual(timeline.rate_on(date(2025, 12, 1)), 30)
+        self.assertEqual(timeline.rate_on(date(2026, 5, 31)), 70)
+        self.assertEqual(timeline.rate_on(date(2026, 6, 1)), 90)
+
+    def test_rate_change_reprices_history(self):
+        self.log(date(2026, 1, 10), 2)
+        self.log(date(2026, 2, 10), 3)
+        HourlyRate.objects.create(project=self.project, valid_from=date(2026, 1, 1), rate=100)
+        HourlyRate.objects.create(project=self.project, valid_from=date(2026, 2, 1), rate=120)
+
+        self.project.refresh_from_db()
+        self.assertAlmostEqual(self.project.total_revenue, 2 * 100 + 3 * 120)
+        self.assertAlmostEqual(get_revenues([self.project])[self.project.id], 2 * 100 + 3 * 120)
+
+    def test_worklog_is_priced_at_its_date(self):
+        HourlyRate.objects.create(project=self.project, valid_from=date(2026, 1, 1), rate=100)
+        HourlyRate.objects.create(project=self.project, valid_from=date(2026, 2, 1), rate=120)
+        self.log(date(2026, 1, 31), 1)
+        self.log(date(2026, 2, 1), 1)
+
+        self.project.refresh_from_db()
+        self.assertAlmostEqual(self.project.total_revenue, 220)
@@ -0,0 +1,49 @@
+"""Buffered timer intervals flushed as worklogs"""
+from datetime import date
+
+from django.test import TestCase
+from trionyx.trionyx.models import User
+
+from trionyx_projects.models import Project, Item, WorkLog
+from trionyx_projects.timers import buffer_intervals, flush_timers, pop_intervals
+
+
+class FlushTimersTestCase(TestCase):
+    """Intervals are merged per user, item and day"""
+
+    def setUp(self):
+        pop_intervals()
+        self.user = User.objects.create_user('timers@example.com', 'secret')
+        self.project = Project.objects.create(name='Timers', code='TIMERS', project_type=Project.TYPE_HOURLY_BASED)
+        self.item = Item.objects.create(project=self.project, name='Item')
+
+    def tearDown(self):
+        pop_intervals()
+
+    def interval(self, item_id, seconds, day=date(2026, 1, 5)):
+        return {'user_id': self.user.id, 'item_id': item_id, 'date': day.isoformat(), 'seconds': seconds}
+
+    def test_intervals_are_merged(self):
+        buffer_intervals([self.interval(self.item.id, 1800), self.interval(self.item.id, 3600)])
+        self.assertEqual(flush_timers(), 1)
+
+        worklog = WorkLog.objects.get(item=self.item)
+        self.assertEqual((worklog.worked, worklog.timer, worklog.created_by), (1.5, True, self.user))
+
+        buffer_intervals([self.interval(self.item.id, 900)])
+        flush_timers()
+        self.assertEqual(WorkLog.objects.get(item=self.item).worked, 1.75)
+
+    def test_intervals_of_deleted_item_are_dropped(self):
+        deleted = Item.objects.create(project=self.project, name='Deleted')
+        buffer_intervals([self.interval(deleted.id, 3600), self.interval(self.item.id, 3600)])
+        deleted.delete()
+
+        with self.assertLogs('trionyx_projects.timers', 'WARNING'):
+            self.assertEqual(flush_timers(), 1)
+        self.assertEqual(WorkLog.objects.get().item, self.item)
+        self.assertEqual(pop_intervals(), [])
+
+        buffer_intervals([self.interval(self.item.id, 3600)])
+        self.assertEqual(flush_timers(), 1)
+        self.assertEqual(WorkLog.objects.get(item=self.item).worked, 2)
@@ -0,0 +1,118 @@
+"""Weekly timesheet cells written back as worklog differences"""
+from datetime import date
+
+from django.db.models.signals import post_delete
+from django.test import TestCase
+from trionyx.trionyx.models import User
+
+from trionyx_projects.models import Project, Item, WorkLog, HourlyRate
+from trionyx_projects.timesheets import TimesheetError, get_week_start, get_timesheet, save_timesheet
+
+MONDAY = date(2026, 1, 5)
+
+
+class TimesheetTestCase(TestCase):
+    """Only the difference with the current cell total is written"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('timesheet@example.com', 'secret')
+        self.project = Project.objects.create(name='Timesheet', code='SHEET', project_type=Project.TYPE_HOURLY_BASED)
+        self.item = Item.objects.create(project=self.project, name='Item')
+
+    def log(self, worked, day=MONDAY, **kwargs):
+        worklog = WorkLog(item=self.item, date=day, worked=worked, created_by=self.user, **kwargs)
+        worklog.save()
+        return worklog
+
+    def get_cell(self, day=MONDAY):
+        return sorted(WorkLog.objects.filter(item=self.item, date=day).values_list('worked', flat=True))
+
+    def assertTotals(self):
+        self.item.refresh_from_db()
+        self.project.refresh_from_db()
+        worked = sum(WorkLog.objects.filter(item=self.item).values_list('worked', flat=True))
+        self.assertAlmostEqual(self.item.total_worked, worked)
+        self.assertAlmostEqual(self.project.total_worked, worked)
+
+    def test_week_start(self):
+        self.assertEqual(get_week_start(date(2026, 1, 11)), MONDAY)
+        self.assertEqual(get_week_start(MONDAY), MONDAY)
+
+    def test_pivot_per_item_and_day(self):
+        self.log(1)
+        self.log(2)
+        self.log(3, day=date(2026, 1, 7))
+        self.log(5, day=date(2026, 1, 12))
+
+        timesheet = get_timesheet(self.user, MONDAY)
+        self.assertEqual(len(timesheet['rows']), 1)
+        self.assertEqual(timesheet['rows'][0]['hours'], {'2026-01-05': 3, '2026-01-07': 3})
+        self.assertEqual(timesheet['totals']['2026-01-05'], 3)
+        self.assertEqual(timesheet['totals']['2026-01-11'], 0)
+
+    def test_unchanged_cell_is_not_written(self):
+        worklog = self.log(2)
+
+        self.assertEqual(save_timesheet(self.user, [(self.item.id, MONDAY, 2)]), 0)
+        self.assertEqual(WorkLog.objects.get(id=worklog.id).updated_at, worklog.updated_at)
+
+    def test_new_cell_adds_worklog(self):
+        self.assertEqual(save_timesheet(self.user, [(self.item.id, MONDAY, 1.5)]), 1)
+        self.assertEqual(self.get_cell(), [1.5])
+        self.assertTotals()
+
+    def test_raised_cell_adds_to_newest_worklog(self):
+        self.log(1)
+        self.log(2)
+
+        save_timesheet(self.user, [(self.item.id, MONDAY, 4.5)])
+        self.assertEqual(self.get_cell(), [1, 3.5])
+        self.assertTotals()
+
+    def test_lowered_cell_takes_from_newest_worklogs(self):
+        self.log(2)
+        self.log(1)
+
+        save_timesheet(self.user, [(self.item.id, MONDAY, 1.5)])
+        self.assertEqual(self.get_cell(), [1.5])
+        self.assertTotals()
+
+        save_timesheet(self.user, [(self.item.id, MONDAY, 0)])
+        self.assertEqual(self.get_cell(), [])
+        self.assertTotals()
+
+    def test_emptied_cell_is_deleted_as_worklog(self):
+        HourlyRate.objects.create(project=self.project, valid_from=date(2026, 1, 1), rate=100)
+        self.log(2)
+        self.log(1, day=date(2026, 1, 6))
+
+        deleted = []
+
+        def receiver(instance, **kwargs):
+            deleted.append((instance.date, instance.worked))
+        post_delete.connect(receiver, sender=WorkLog)
+        try:
+            save_timesheet(self.user, [(self.item.id, MONDAY, 0)])
+        finally:
+            post_delete.disconnect(receiver, sender=WorkLog)
+
+        self.assertEqual(deleted, [(MONDAY, 2)])
+        self.assertTotals()
+        self.assertAlmostEqual(self.project.total_revenue, 100)
+
+    def test_invoiced_hours_are_kept(self):
+        self.log(2, invoiced_on=date(2026, 2, 1))
+        self.log(1)
+
+        save_timesheet(self.user, [(self.item.id, MONDAY, 2.5)])
+        self.assertEqual(self.get_cell(), [0.5, 2])
+
+        with self.assertRaises(TimesheetError):
+            save_timesheet(self.user, [(self.item.id, MONDAY, 1)])
+        self.assertEqual(self.get_cell(), [0.5, 2])
+
+    def test_invalid_entries(self):
+        with self.assertRaises(TimesheetError):
+            save_timesheet(self.user, [(self.item.id, MONDAY, 25)])
+        with self.assertRaises(TimesheetError):
+            save_timesheet(self.user, [(0, MONDAY, 1)])
@@ -0,0 +1,95 @@
+"""Project export and import round trip"""
+import io
+from datetime import date
+
+from django.test import TestCase
+from trionyx.trionyx.models import User
+
+from trionyx_projects.compaction import PERIOD_MONTH, compact_worklogs
+from trionyx_projects.invoicing import invoice_worklogs
+from trionyx_projects.models import Project, HourlyRate, Item, InvoiceLine, ItemDependency, Comment, WorkLog
+from trionyx_projects.transfer import TransferError, export_project, import_project
+
+
+class TransferTestCase(TestCase):
+    """An imported export is a copy of the project with new ids and codes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('transfer@example.com', 'secret')
+        self.project = Project.objects.create(name='Source', code='SRC', project_type=Project.TYPE_HOURLY_BASED)
+        HourlyRate.objects.create(project=self.project, valid_from=date(2026, 1, 1), rate=100)
+
+        self.items = [
+            Item.objects.create(project=self.project, name=f'Item {index}', estimate=4, description='<b>Work</b>')
+            for index in range(3)
+        ]
+        ItemDependency.objects.create(item=self.items[2], blocked_by=self.items[0])
+        Comment.objects.create(item=self.items[0], comment='Hello', created_by=self.user)
+        for day in range(1, 9):
+            WorkLog(item=self.items[day % 2], date=date(2026, 1, day), worked=1.25, created_by=self.user).save()
+
+        invoice_worklogs([self.project], end=date(2026, 1, 3), reference='INV-1')
+        compact_worklogs(before=date(2026, 2, 1), period=PERIOD_MONTH, archive=True)
+
+    def round_trip(self, **kwargs):
+        fileobj = io.StringIO()
+        counts = export_project(self.project, fileobj)
+        fileobj.seek(0)
+        project, imported = import_project(fileobj, **kwargs)
+        self.assertEqual({name: imported.get(name, 0) for name in counts}, counts)
+        return project
+
+    def get_stats(self, project):
+        project.refresh_from_db()
+        return (
+            project.open_items, project.completed_items, project.total_items_estimate, project.item_increment_id,
+            project.total_worked, project.total_billed, project.total_revenue,
+        )
+
+    def test_round_trip_keeps_rows_and_totals(self):
+        project = self.round_trip(code='copy', name='Copy')
+
+        self.assertEqual((project.code, project.name), ('COPY', 'Copy'))
+        self.assertEqual(self.get_stats(project), self.get_stats(self.project))
+        self.assertEqual(
+            sorted(project.items.values_list('code', 'name', 'total_worked', 'total_billed', 'earliest_finish')),
+            sorted((code.replace('SRC-', 'COPY-'), *values) for code, *values in self.project.items.values_list(
+                'code', 'name', 'total_worked', 'total_billed', 'earliest_finish')),
+        )
+
+        dependency = ItemDependency.objects.get(item__project=project)
+        self.assertEqual((dependency.item.name, dependency.blocked_by.name), ('Item 2', 'Item 0'))
+        self.assertEqual(Comment.objects.get(item__project=project).created_by, self.user)
+        self.assertEqual(project.hourly_rates.get().rate, 100)
+
+    def test_round_trip_keeps_invoices_and_archives(self):
+        project = self.round_trip(code='copy')
+
+        def get_lines(project):
+            return sorted(
+                (line.item.name, line.reference, line.total, line.worklog_count,
+                 sorted(line.invoiced_worklogs.values_list('worked', flat=True)))
+                for line in InvoiceLine.objects.filter(project=project)
+            )
+        self.assertEqual(len(get_lines(project)), 2)
+        self.assertEqual(get_lines(project), get_lines(self.project))
+
+        def get_originals(project):
+            return sorted(
+                (row['date'], row['worked'])
+                for worklog in WorkLog.objects.filter(item__project=project, archive__isnull=False)
+                for row in worklog.archive.get_worklogs()
+            )
+        self.assertEqual(len(get_originals(self.project)), 7)
+        self.assertEqual(get_originals(project), get_originals(self.project))
+
+    def test_existing_code_is_refused(self):
+        with self.assertRaises(TransferError):
+            self.round_trip()
+        self.assertEqual(Project.objects.count(), 1)
+
+    def test_invalid_file_is_refused(self):
+        with self.assertRaises(TransferError):
+            import_project(io.StringIO('{"model": "project"}\n'))
+        with self.assertRaises(TransferError):
+            import_project(io.StringIO('{"model": "header", "version": 0}\n'))
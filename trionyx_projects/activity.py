@@ -0,0 +1,131 @@
+"""
+Append-only item activity
+
+Activities of a transaction are kept per thread and savepoint and written with one bulk insert after
+commit. Every activity registers its own commit callback, a rolled back savepoint or transaction drops
+the callbacks of its activities. The batch is written by the callback of its last activity. Feeds are
+read with keyset pagination on (project, id), every page is one index range scan at any table size.
+"""
+import logging
+import threading
+from datetime import date
+from functools import partial
+
+from django.db import transaction
+from django.utils import timezone
+from trionyx.utils import get_current_request
+
+from .models import Activity
+
+logger = logging.getLogger(__name__)
+
+local = threading.local()
+
+
+class ActivityBatch:
+    """
+    Activities recorded in one savepoint of the current transaction.
+
+    Savepoint ids are unique per thread, a rolled back savepoint never gets a new activity. The batch of the
+    outermost transaction is reused after a rollback, the callbacks of the rolled back activities never run.
+    """
+
+    def __init__(self):
+        self.committed = []
+        self.last = None
+
+    def add(self, activity):
+        """Add activity, outside a transaction it is written directly"""
+        self.last = activity
+        transaction.on_commit(partial(self.commit, activity))
+
+    def commit(self, activity):
+        self.committed.append(activity)
+        if activity is self.last:
+            self.flush()
+
+    def flush(self):
+        # Runs after commit, new activities start new batches
+        local.batches = {}
+        activities, self.committed = self.committed, []
+        try:
+            Activity.objects.bulk_create(activities, batch_size=500)
+        except Exception as e:
+            logger.exception(e)
+
+        from .capacity import invalidate_projects
+        from .notifications import queue_notifications
+        try:
+            invalidate_projects({activity.project_id for activity in activities})
+            queue_notifications(activities)
+        except Exception as e:
+            logger.exception(e)
+
+
+def get_user_id():
+    """Get id of current user"""
+    request = get_current_request()
+    return request.user.id if request and not request.user.is_anonymous else None
+
+
+def json_value(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def record(event, project_id, item_id=None, changes=None, user_id=None):
+    """Record activity, written when the current transaction is committed"""
+    activity = Activity(
+        event=event,
+        project_id=project_id,
+        item_id=item_id,
+        user_id=user_id or get_user_id(),
+        changes={
+            field: [json_value(part) for part in value] if isinstance(value, list) else json_value(value)
+            for field, value in (changes or {}).items()
+        },
+        created_at=timezone.now(),
+    )
+
+    connection = transaction.get_connection()
+    key = tuple(connection.savepoint_ids) if connection.in_atomic_block else None
+    batches = getattr(local, 'batches', None)
+    if batches is None:
+        batches = local.batches = {}
+    if key not in batches:
+        batches[key] = ActivityBatch()
+    batches[key].add(activity)
+
+
+def record_item(item, created=False):
+    """Record created or changed item"""
+    changes = item.get_activity_changes()
+    if created:
+        record(Activity.EVENT_ITEM_CREATED, item.project_id, item.id, {'name': item.name})
+    elif changes:
+        record(Activity.EVENT_ITEM_CHANGED, item.project_id, item.id, changes)
+
+
+def record_worklog(worklog, project_id, created=False):
+    """Record added or changed worklog"""
+    changes = worklog.get_activity_changes()
+    if created:
+        record(Activity.EVENT_WORKLOG_ADDED, project_id, worklog.item_id, {
+            'date': worklog.date,
+            'worked': worklog.worked,
+        }, worklog.created_by_id)
+    elif changes:
+        record(Activity.EVENT_WORKLOG_CHANGED, project_id, worklog.item_id, changes)
+
+
+def get_feed(before=None, limit=50, **filters):
+    """
+    Get page of activity newest first, filtered on project or item.
+
+    Gives back the activities and the id to pass as before for the next page, None on the last page.
+    """
+    queryset = Activity.objects.filter(**filters)
+    if before:
+        queryset = queryset.filter(id__lt=before)
+
+    activities = list(queryset.select_related('item', 'user').order_by('-id')[:limit])
+    return activities, activities[-1].id if len(activities) == limit else None
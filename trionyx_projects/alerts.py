@@ -0,0 +1,96 @@
+"""
+Budget alerts, evaluated from the worked hours delta of a worklog write
+
+A threshold alerts when a write moves the worked hours from below to above it, so a check only
+compares the old and new total. Raised alerts are stored with a unique key, parallel writes that
+cross the same threshold only alert once. When the worked hours drop below the threshold again the
+alert is removed and can be raised again.
+"""
+import logging
+from functools import lru_cache
+
+from django.core.mail import mail_managers
+from django.db import IntegrityError, transaction
+from django.utils.module_loading import import_string
+
+from .conf import settings as app_settings
+from .models import BudgetAlert
+
+logger = logging.getLogger(__name__)
+
+
+class BaseNotifier:
+    """Notifier sends raised budget alerts"""
+
+    def notify(self, alert):
+        """Send alert"""
+        raise NotImplementedError()
+
+
+class LogNotifier(BaseNotifier):
+    """Write alerts to the log"""
+
+    def notify(self, alert):
+        logger.warning(alert.message)
+
+
+class MailNotifier(BaseNotifier):
+    """Mail alerts to the site managers"""
+
+    def notify(self, alert):
+        mail_managers(f'Budget alert {alert.project.code}', alert.message, fail_silently=True)
+
+
+@lru_cache()
+def get_notifier():
+    """Get configured notifier"""
+    return import_string(app_settings.ALERT_NOTIFIER)()
+
+
+def check_thresholds(rule, project_id, item_id, old, new, limit, thresholds):
+    """Raise or clear alerts of the thresholds (percentage of limit) that are crossed from old to new"""
+    if not limit or limit <= 0 or old == new:
+        return
+
+    for threshold in thresholds:
+        value = float(limit) * threshold / 100
+        if old < value <= new:
+            raise_alert(rule, project_id, item_id, threshold, new, limit)
+        elif new < value <= old:
+            clear_alert(rule, project_id, item_id, threshold)
+
+
+def raise_alert(rule, project_id, item_id, threshold, worked, limit):
+    """Store alert and notify when the current transaction is committed, alerts that already exist are skipped"""
+    try:
+        with transaction.atomic():
+            alert = BudgetAlert.objects.create(
+                key=BudgetAlert.get_key(rule, project_id, item_id, threshold),
+                rule=rule,
+                project_id=project_id,
+                item_id=item_id,
+                threshold=threshold,
+                worked=worked,
+                limit=limit,
+            )
+    except IntegrityError:
+        return
+
+    transaction.on_commit(lambda: get_notifier().notify(alert))
+
+
+def clear_alert(rule, project_id, item_id, threshold):
+    """Remove alert so it is raised again on the next crossing"""
+    BudgetAlert.objects.filter(key=BudgetAlert.get_key(rule, project_id, item_id, threshold)).delete()
+
+
+def check_item_worked(item, old, new):
+    """Check worked hours of item against its estimate"""
+    check_thresholds(
+        BudgetAlert.RULE_ITEM_ESTIMATE, item.project_id, item.id, old, new, item.estimate, app_settings.ITEM_ALERT_THRESHOLDS)
+
+
+def check_project_worked(project_id, old, new, budget_hours):
+    """Check worked hours of fixed price project against the budget hours"""
+    check_thresholds(
+        BudgetAlert.RULE_PROJECT_BUDGET, project_id, None, old, new, budget_hours, app_settings.BUDGET_ALERT_THRESHOLDS)
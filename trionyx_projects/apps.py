@@ -1,22 +1,83 @@
 """Trionyx_projects app configuration"""
+from functools import lru_cache
+
 from trionyx.trionyx.apps import BaseConfig
 from trionyx.config import ModelConfig
 
+STATUS_LABEL_CLASSES = {
+    10: 'default',
+    20: 'info',
+    30: 'default',
+    40: 'success',
+    99: 'danger',
+}
+
+
+@lru_cache(maxsize=None)
+def get_status_labels():
+    """Get rendered status label for every status"""
+    from .models import Project
+    return {
+        status: '<span class="label label-{}">{}</span>'.format(STATUS_LABEL_CLASSES.get(status, 'default'), label)
+        for status, label in Project.STATUS_CHOICES
+    }
+
 
 def render_status(model, *args, **kwargs):
     """Render status as label"""
-    mapping = {
-        10: 'default',
-        20: 'info',
-        30: 'default',
-        40: 'success',
-        99: 'danger',
-    }
+    label = get_status_labels().get(model.status)
+    if label is None:
+        label = '<span class="label label-default">{}</span>'.format(model.get_status_display())
+    return label
+
+
+def render_progress(model, *args, **kwargs):
+    """Render progress as progress bar"""
+    from trionyx.layout import ProgressBar
+    return ProgressBar(value=round(model.progress or 0), size='xs').render({})
 
-    return '<span class="label label-{}">{}</span>'.format(
-        mapping.get(model.status, 'default'),
-        model.get_status_display()
-    )
+
+def render_hours(model, field, *args, **kwargs):
+    """Render hours field"""
+    value = getattr(model, field, None)
+    return f"{round(value, 2)}h" if value else ''
+
+
+def render_price(model, field, *args, **kwargs):
+    """Render price field"""
+    from trionyx.renderer import price_value_renderer
+    return price_value_renderer(getattr(model, field, None))
+
+
+def show_move_items(obj, context):
+    """Show move items button on project view"""
+    from trionyx.utils import get_current_request
+    return context.get('page') == 'view' and get_current_request().user.has_perm('trionyx_projects.change_item')
+
+
+def render_subscribe_label(obj, context):
+    """Subscribe or unsubscribe label of the current user"""
+    from trionyx.utils import get_current_request
+    from .notifications import is_subscribed
+    return 'Unsubscribe' if is_subscribed(get_current_request().user, obj) else 'Subscribe'
+
+
+def get_subscribe_button(url):
+    """Header button that subscribes the current user to the digest of the object"""
+    return {
+        'label': render_subscribe_label,
+        'url': url,
+        'type': 'default',
+        'show': lambda obj, context: context.get('page') == 'view',
+        'dialog_options': {
+            'callback': """function(data, dialog){
+                if (data.success) {
+                    dialog.close();
+                    window.location.reload();
+                }
+            }""",
+        },
+    }
 
 
 class Config(BaseConfig):
@@ -29,27 +90,145 @@ class Config(BaseConfig):
         'projects/style.css'
     ]
 
+    js_files = [
+        'projects/events.js',
+        'projects/ranking.js',
+        'projects/timesheet.js',
+        'projects/activity.js',
+    ]
+
+    def ready(self):
+        """Replace Project auditlog handlers and add the timesheet menu item, runs after the Trionyx core app connected them"""
+        from .auditlog import init_auditlog
+        init_auditlog()
+
+        from .registry import lazy_registration
+        lazy_registration.add_menu_item(
+            'timesheet', 'Timesheet', 'trionyx_projects:timesheet', icon='fa fa-calendar', order=45,
+            permission='trionyx_projects.view_worklog')
+
     class Project(ModelConfig):
         menu_root = True
         menu_icon = 'fa fa-cubes'
         menu_order = 40
         verbose_name = '{code} - {name}'
         list_default_fields = ['name', 'code', 'status', 'deadline']
+        list_prefetch_related = ['for_object']
+        header_buttons = [
+            get_subscribe_button('trionyx_projects:project-subscribe'),
+            {
+                'label': 'Move items',
+                'url': 'trionyx_projects:project-move-items',
+                'type': 'default',
+                'show': show_move_items,
+                'dialog_options': {
+                    'callback': """function(data, dialog){
+                        if (data.success) {
+                            dialog.close();
+                            trionyx_reload_tab('general');
+                        }
+                    }""",
+                },
+            },
+        ]
         list_fields = [
+            {
+                'field': 'for_object_id',
+                'label': 'Object',
+                'renderer': lambda model, *args, **kwargs: str(model.for_object) if model.for_object_id else '',
+            },
             {
                 'field': 'status',
                 'renderer': render_status
-            }
+            },
+            {
+                'field': 'progress',
+                'label': 'Progress',
+                'type': 'float',
+                'choices': None,
+                'renderer': render_progress,
+            },
+            {
+                'field': 'total_items_estimate',
+                'label': 'Remaining estimate',
+                'renderer': render_hours,
+            },
+            {
+                'field': 'total_billed',
+                'label': 'Hours billed',
+                'renderer': render_hours,
+            },
+            {
+                'field': 'budget_hours',
+                'label': 'Budget hours',
+                'type': 'float',
+                'choices': None,
+                'renderer': render_hours,
+            },
+            {
+                'field': 'budget_used',
+                'label': 'Budget used (%)',
+                'type': 'float',
+                'choices': None,
+                'renderer': lambda model, *args, **kwargs: f"{round(model.budget_used)}%" if model.budget_used is not None else '',
+            },
+            {
+                'field': 'revenue',
+                'label': 'Revenue',
+                'type': 'float',
+                'choices': None,
+                'renderer': render_price,
+            },
         ]
 
-        auditlog_ignore_fields = ['item_increment_id']
+        # Derived stats are rewritten on every item and worklog save
+        auditlog_ignore_fields = [
+            'item_increment_id',
+            'open_items',
+            'completed_items',
+            'total_items_estimate',
+            'total_worked',
+            'total_billed',
+            'description_html',
+            'description_excerpt',
+            'total_revenue',
+        ]
+
+    class HourlyRate(ModelConfig):
+        menu_name = 'Hourly rates'
+        menu_icon = 'fa fa-euro'
+        menu_order = 41
+        disable_search_index = True
+        list_default_fields = ['project', 'valid_from', 'rate']
+
+    class InvoiceLine(ModelConfig):
+        menu_name = 'Invoice lines'
+        menu_icon = 'fa fa-file-text-o'
+        menu_order = 42
+        disable_search_index = True
+        list_default_fields = ['invoiced_on', 'reference', 'project', 'description', 'hours', 'rate', 'total']
 
     class Item(ModelConfig):
         menu_exclude = True
         disable_search_index = True
         auditlog_disable = True
+        # Totals of detached worklog partitions are derived, like the other item totals
+        auditlog_ignore_fields = [
+            'total_worked',
+            'total_billed',
+            'detached_worked',
+            'detached_billed',
+        ]
 
         verbose_name = '{code}'
+        header_buttons = [
+            get_subscribe_button('trionyx_projects:item-subscribe'),
+        ]
+
+    class ItemDependency(ModelConfig):
+        menu_exclude = True
+        disable_search_index = True
+        auditlog_disable = True
 
     class Comment(ModelConfig):
         menu_exclude = True
@@ -60,3 +239,28 @@ class Config(BaseConfig):
         menu_exclude = True
         disable_search_index = True
         auditlog_disable = True
+
+    class WorkLogArchive(ModelConfig):
+        menu_exclude = True
+        disable_search_index = True
+        auditlog_disable = True
+
+    class BudgetAlert(ModelConfig):
+        menu_exclude = True
+        disable_search_index = True
+        auditlog_disable = True
+
+    class Activity(ModelConfig):
+        menu_exclude = True
+        disable_search_index = True
+        auditlog_disable = True
+
+    class Subscription(ModelConfig):
+        menu_exclude = True
+        disable_search_index = True
+        auditlog_disable = True
+
+    class Notification(ModelConfig):
+        menu_exclude = True
+        disable_search_index = True
+        auditlog_disable = True
@@ -0,0 +1,93 @@
+"""Project auditlog, skips saves of ignored fields and can defer writing entries to Celery"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.contrib.contenttypes.models import ContentType
+from trionyx.config import models_config
+from trionyx.trionyx import auditlog
+from trionyx.trionyx.models import AuditLogEntry
+from trionyx.utils import get_current_request
+
+from .conf import settings as app_settings
+from .models import Project
+
+logger = logging.getLogger(__name__)
+
+
+def create_log(instance, changes, action):
+    """Create log entry, when AUDITLOG_ASYNC is enabled the entry is written by Celery after commit"""
+    if not app_settings.AUDITLOG_ASYNC:
+        return auditlog.create_log(instance, changes, action)
+
+    from .tasks import create_auditlog_entry
+
+    request = get_current_request()
+    entry = {
+        'content_type_id': ContentType.objects.get_for_model(instance).id,
+        'object_id': instance.pk,
+        'object_verbose_name': str(instance),
+        'action': action,
+        'changes': {field: [str(old), str(new)] for field, (old, new) in changes.items()},
+        'user_id': request.user.id if request and not request.user.is_anonymous else None,
+    }
+    transaction.on_commit(lambda: create_auditlog_entry.delay(**entry))
+
+
+def log_add(sender, instance, created, **kwargs):
+    """Log model add"""
+    try:
+        if created:
+            changes = auditlog.model_instance_diff(None, instance)
+            if changes:
+                create_log(instance, changes, AuditLogEntry.ACTION_ADDED)
+    except Exception as e:
+        logger.exception(e)
+
+
+def log_change(sender, instance, update_fields=None, **kwargs):
+    """Log model update, saves that only update ignored fields don't fetch the old object"""
+    try:
+        if instance.pk is None:
+            return
+
+        ignore_fields = models_config.get_config(sender).auditlog_ignore_fields or []
+        if update_fields and set(update_fields).issubset(ignore_fields):
+            return
+
+        try:
+            old = sender.objects.get(pk=instance.pk)
+        except sender.DoesNotExist:
+            return
+
+        changes = auditlog.model_instance_diff(old, instance)
+        if changes:
+            create_log(instance, changes, AuditLogEntry.ACTION_CHANGED)
+    except Exception as e:
+        logger.exception(e)
+
+
+def log_delete(sender, instance, **kwargs):
+    """Log model delete"""
+    try:
+        if instance.pk is not None:
+            changes = auditlog.model_instance_diff(instance, None)
+            if changes:
+                create_log(instance, changes, AuditLogEntry.ACTION_DELETED)
+    except Exception as e:
+        logger.exception(e)
+
+
+def init_auditlog():
+    """Replace the Trionyx auditlog handlers of Project"""
+    if settings.TX_DISABLE_AUDITLOG or models_config.get_config(Project).auditlog_disable:
+        return
+
+    for signal, handler, replacement in [
+        (post_save, auditlog.log_add, log_add),
+        (pre_save, auditlog.log_change, log_change),
+        (post_delete, auditlog.log_delete, log_delete),
+    ]:
+        signal.disconnect(sender=Project, dispatch_uid=(handler, Project, signal))
+        signal.connect(replacement, sender=Project, dispatch_uid=(replacement, Project, signal))
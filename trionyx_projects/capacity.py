@@ -0,0 +1,166 @@
+"""
+Capacity planning of the open backlog
+
+The velocity of a project is the hours per working day its users worked on it in the last
+CAPACITY_HISTORY_DAYS, the forecast is the day the remaining estimate of the open items is done at
+that velocity. Open estimates and worked hours of all projects are loaded with one grouped query each.
+Remaining hours and velocities are cached per project and day, a write to a project only removes the cache
+of that project and the next plan loads the removed projects together.
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .conf import settings as app_settings
+from .models import Project, Item, WorkLog
+
+CACHE_KEY = 'trionyx-projects-capacity-{day}-{project_id}'
+
+PLANNED_STATUSES = [Project.STATUS_DRAFT, Project.STATUS_ACTIVE, Project.STATUS_ON_HOLD]
+
+
+def count_working_days(start, end):
+    """Number of weekdays from start until end, end is not included"""
+    if end <= start:
+        return 0
+
+    weeks, rest = divmod((end - start).days, 7)
+    return weeks * 5 + sum(1 for offset in range(rest) if (start.weekday() + offset) % 7 < 5)
+
+
+def add_working_days(start, days):
+    """Date of the last day when working given days from start, the first weekday from start is the first day"""
+    while start.weekday() >= 5:
+        start += timedelta(days=1)
+
+    weeks, rest = divmod(max(days, 1) - 1, 5)
+    day = start + timedelta(weeks=weeks)
+    while rest:
+        day += timedelta(days=1)
+        if day.weekday() < 5:
+            rest -= 1
+    return day
+
+
+def get_cache_key(project_id, day=None):
+    return CACHE_KEY.format(day=(day or timezone.now().date()).isoformat(), project_id=project_id)
+
+
+def invalidate_projects(project_ids):
+    """Remove cached stats of projects, they are loaded again on the next plan"""
+    cache.delete_many([get_cache_key(project_id) for project_id in set(project_ids)])
+
+
+def load_stats(project_ids, today):
+    """
+    Remaining hours and velocity per user of projects, with one query for the open estimates and one for the worked hours.
+
+    Open items count with their estimate minus the hours already worked on them.
+    """
+    remaining = dict(Item.objects.filter(
+        project__in=project_ids,
+        completed_on__isnull=True,
+        estimate__gt=F('total_worked'),
+    ).values('project').annotate(
+        remaining=Sum(F('estimate') - F('total_worked')),
+    ).values_list('project', 'remaining').order_by())
+
+    history_start = today - timedelta(days=app_settings.CAPACITY_HISTORY_DAYS)
+    history_days = max(count_working_days(history_start, today), 1)
+    velocities = defaultdict(dict)
+    for project_id, user_id, worked in WorkLog.objects.filter(
+        item__project__in=project_ids,
+        date__gte=history_start,
+        date__lt=today,
+    ).values('item__project', 'created_by').annotate(worked=Sum('worked')).values_list(
+            'item__project', 'created_by', 'worked').order_by():
+        velocities[project_id][user_id] = float(worked or 0.0) / history_days
+
+    return {
+        project_id: {
+            'remaining': float(remaining.get(project_id) or 0.0),
+            'users': velocities[project_id],
+        } for project_id in project_ids
+    }
+
+
+def get_stats(project_ids, today):
+    """Get stats of projects from the cache, missing stats are loaded together and cached until the end of the day"""
+    keys = {project_id: get_cache_key(project_id, today) for project_id in project_ids}
+    cached = cache.get_many(keys.values())
+    stats = {project_id: cached[key] for project_id, key in keys.items() if key in cached}
+
+    missing = [project_id for project_id in project_ids if project_id not in stats]
+    if missing:
+        loaded = load_stats(missing, today)
+        cache.set_many({keys[project_id]: values for project_id, values in loaded.items()}, timeout=86400)
+        stats.update(loaded)
+    return stats
+
+
+def get_forecast(project_id, code, name, deadline, stats, today):
+    """Forecast of project at its current velocity"""
+    hours = stats['remaining']
+    velocity = sum(stats['users'].values())
+
+    forecast = None
+    if not hours:
+        forecast = today
+    elif velocity:
+        forecast = add_working_days(today, math.ceil(hours / velocity))
+
+    deadline_days = count_working_days(today, deadline + timedelta(days=1)) if deadline else None
+    return {
+        'project_id': project_id,
+        'code': code,
+        'name': name,
+        'deadline': deadline,
+        'remaining': round(hours, 2),
+        'velocity': round(velocity, 2),
+        'forecast': forecast,
+        # Hours per working day that are needed to finish before the deadline
+        'required': round(hours / deadline_days, 2) if deadline_days else None,
+        'fits': forecast <= deadline if forecast and deadline else None,
+        'users': stats['users'],
+    }
+
+
+def get_plan(today=None):
+    """
+    Forecast of the planned projects and the load of their users.
+
+    The required load of a user is the required velocity of each project divided by the share
+    the user has in the current velocity of the project.
+    """
+    today = today or timezone.now().date()
+    projects = list(Project.objects.filter(status__in=PLANNED_STATUSES).values_list(
+        'id', 'code', 'name', 'deadline').order_by('code'))
+    stats = get_stats([project[0] for project in projects], today)
+    forecasts = [get_forecast(*project, stats[project[0]], today) for project in projects]
+
+    load = defaultdict(lambda: {'current': 0.0, 'required': 0.0})
+    for forecast in forecasts:
+        for user_id, velocity in forecast['users'].items():
+            load[user_id]['current'] += velocity
+            if forecast['required'] and forecast['velocity']:
+                load[user_id]['required'] += forecast['required'] * velocity / forecast['velocity']
+
+    users = get_user_model().objects.in_bulk([user_id for user_id in load if user_id])
+    return {
+        'projects': sorted(forecasts, key=lambda forecast: (
+            forecast['fits'] is not False, forecast['deadline'] or forecast['forecast'] or today, forecast['code'])),
+        'users': sorted([
+            {
+                'user_id': user_id,
+                'name': users[user_id].get_full_name() if user_id in users else 'System',
+                'current': round(values['current'], 2),
+                'required': round(values['required'], 2),
+                'overbooked': values['required'] > app_settings.HOURS_PER_DAY,
+            } for user_id, values in load.items()
+        ], key=lambda user: -user['required']),
+    }
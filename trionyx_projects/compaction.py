@@ -0,0 +1,144 @@
+"""
+Worklog compaction
+
+Worklogs before the horizon are merged into one worklog per item, user and day or month. Worklogs are
+only merged with the same invoice and hourly rate, so item totals, revenue and invoices stay the same.
+The merged rows are deleted without loading them, originals can be kept in a compressed archive.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .conf import settings as app_settings
+from .models import Project, Item, WorkLog, WorkLogArchive
+from .rates import get_timelines
+
+PERIOD_DAY = 'day'
+PERIOD_MONTH = 'month'
+
+MAX_DESCRIPTION_LENGTH = 2000
+
+
+def get_horizon(days=None):
+    """First date that is not compacted"""
+    return timezone.now().date() - timedelta(days=app_settings.WORKLOG_COMPACT_AFTER_DAYS if days is None else days)
+
+
+def get_period_start(day, period):
+    return day.replace(day=1) if period == PERIOD_MONTH else day
+
+
+def serialize_worklog(worklog):
+    return {
+        'id': worklog.id,
+        'created_at': worklog.created_at,
+        'created_by': worklog.created_by_id,
+        'date': worklog.date,
+        'worked': worklog.worked,
+        'billed': worklog.billed,
+        'description': worklog.description,
+        'timer': worklog.timer,
+    }
+
+
+def merge_description(worklogs):
+    descriptions = list(dict.fromkeys(worklog.description for worklog in worklogs if worklog.description))
+    description = '\n'.join(descriptions)
+    if len(description) > MAX_DESCRIPTION_LENGTH:
+        return f'Compacted {len(worklogs)} worklogs'
+    return description
+
+
+def compact_worklogs(before=None, period=None, archive=None, batch_size=100, dry_run=False):
+    """
+    Merge worklogs before given date, items are compacted in batches with one transaction per batch.
+
+    Gives back the number of merged worklogs and the number of worklogs that are removed.
+    """
+    before = before or get_horizon()
+    period = period or app_settings.WORKLOG_COMPACT_PERIOD
+    archive = app_settings.WORKLOG_ARCHIVE if archive is None else archive
+    if period not in (PERIOD_DAY, PERIOD_MONTH):
+        raise ValueError(f'Invalid compact period {period}')
+
+    item_ids = list(WorkLog.objects.filter(date__lt=before).order_by('item').values_list('item', flat=True).distinct())
+    merged = removed = 0
+    for index in range(0, len(item_ids), batch_size):
+        batch_merged, batch_removed = compact_items(item_ids[index:index + batch_size], before, period, archive, dry_run)
+        merged += batch_merged
+        removed += batch_removed
+    return merged, removed
+
+
+def compact_items(item_ids, before, period, archive, dry_run=False):
+    """Merge worklogs of items before given date"""
+    with transaction.atomic():
+        # Lock items so the worklog aggregates of parallel saves see the merged rows
+        project_ids = dict(Item.objects.select_for_update().filter(id__in=item_ids).values_list('id', 'project'))
+        timelines = get_timelines(Project.objects.filter(id__in=set(project_ids.values())).only('id', 'project_hourly_rate'))
+
+        groups = defaultdict(list)
+        for worklog in WorkLog.objects.filter(item_id__in=item_ids, date__lt=before).order_by('date', 'id'):
+            groups[(
+                worklog.item_id,
+                worklog.created_by_id,
+                get_period_start(worklog.date, period),
+                worklog.invoiced_on,
+                worklog.invoice_reference,
+                worklog.invoice_line_id,
+                timelines[project_ids[worklog.item_id]].rate_on(worklog.date),
+            )].append(worklog)
+        groups = [worklogs for worklogs in groups.values() if len(worklogs) > 1]
+        if dry_run or not groups:
+            return len(groups), sum(len(worklogs) - 1 for worklogs in groups)
+
+        archives = {
+            worklog_archive.worklog_id: worklog_archive
+            for worklog_archive in WorkLogArchive.objects.filter(
+                worklog_id__in=[worklog.id for worklogs in groups for worklog in worklogs])
+        }
+
+        now = timezone.now()
+        kept, removed_ids, new_archives, updated_archives = [], [], [], []
+        for worklogs in groups:
+            worklog = worklogs[0]
+            group_archives = [archives[row.id] for row in worklogs if row.id in archives]
+            if archive or group_archives:
+                # Compacted rows are replaced by their own originals
+                originals = []
+                for row in worklogs:
+                    originals.extend(archives[row.id].get_worklogs() if row.id in archives else [serialize_worklog(row)])
+
+                worklog_archive = archives.get(worklog.id)
+                if worklog_archive is None:
+                    worklog_archive = WorkLogArchive(worklog=worklog)
+                    new_archives.append(worklog_archive)
+                else:
+                    updated_archives.append(worklog_archive)
+                worklog_archive.set_worklogs(originals)
+
+            worklog.worked = sum(float(row.worked or 0.0) for row in worklogs)
+            worklog.billed = sum(float(row.billed or 0.0) for row in worklogs)
+            worklog.description = merge_description(worklogs)
+            worklog.timer = False
+            worklog.render_html_fields()
+            worklog.verbose_name = worklog.generate_verbose_name()
+            worklog.updated_at = now
+            kept.append(worklog)
+            removed_ids.extend(row.id for row in worklogs[1:])
+
+        WorkLogArchive.objects.filter(worklog_id__in=removed_ids).delete()
+        WorkLogArchive.objects.bulk_create(new_archives, batch_size=100)
+        WorkLogArchive.objects.bulk_update(updated_archives, ['count', 'data'], batch_size=100)
+        WorkLog.objects.bulk_update(
+            kept,
+            ['worked', 'billed', 'description', 'description_html', 'description_excerpt', 'verbose_name', 'timer', 'updated_at'],
+            batch_size=500,
+        )
+        for index in range(0, len(removed_ids), 500):
+            # Delete without loading the rows and sending signals, totals do not change
+            WorkLog.objects.filter(id__in=removed_ids[index:index + 500])._raw_delete(WorkLog.objects.db)
+
+    return len(kept), len(removed_ids)
@@ -3,5 +3,28 @@ from django.utils.translation import ugettext_lazy as _
 
 
 settings = AppSettings('PROJECTS', {
-    'HOURLY_RATE': 60
-})
\ No newline at end of file
+    'HOURLY_RATE': 60,
+    'AUDITLOG_ASYNC': False,
+    'EVENTS_BACKEND': 'trionyx_projects.events.CacheEventBackend',
+    'EVENTS_BUFFER': 100,
+    'EVENTS_TIMEOUT': 300,
+    'EVENTS_POLL_INTERVAL': 5,
+    'RANK_REBALANCE_LENGTH': 16,
+    'HOURS_PER_DAY': 8,
+    'TIMER_CACHE': 'default',
+    'TIMER_MAX_HOURS': 8,
+    'ALERT_NOTIFIER': 'trionyx_projects.alerts.LogNotifier',
+    'BUDGET_ALERT_THRESHOLDS': [80, 100],
+    'ITEM_ALERT_THRESHOLDS': [100],
+    'WORKLOG_COMPACT_AFTER_DAYS': 730,
+    'WORKLOG_COMPACT_PERIOD': 'month',
+    'WORKLOG_ARCHIVE': False,
+    'WORKLOG_PARTITIONING': False,
+    'WORKLOG_PARTITIONS_AHEAD': 3,
+    'WORKLOG_PARTITIONS_DETACH_MONTHS': None,
+    'CAPACITY_HISTORY_DAYS': 28,
+    'NOTIFICATION_EVENTS': ['comment_added', 'worklog_added', 'worklog_changed', 'worklog_deleted'],
+    'NOTIFICATION_DIGEST_BATCH': 100,
+    'NOTIFICATION_DIGEST_LOCK_TIMEOUT': 600,
+    'IMPORT_TIME_BUDGET': 500,
+})
@@ -0,0 +1,27 @@
+"""App cron schedule"""
+from datetime import timedelta
+
+from celery.schedules import crontab
+
+schedule = {
+    'update_default_revenues': {
+        'task': 'trionyx_projects.tasks.update_default_revenues',
+        'schedule': timedelta(hours=1),
+    },
+    'flush_worklog_timers': {
+        'task': 'trionyx_projects.tasks.flush_worklog_timers',
+        'schedule': timedelta(minutes=15),
+    },
+    'compact_worklogs': {
+        'task': 'trionyx_projects.tasks.compact_worklogs',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'roll_worklog_partitions': {
+        'task': 'trionyx_projects.tasks.roll_worklog_partitions',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    'send_notification_digests': {
+        'task': 'trionyx_projects.tasks.send_notification_digests',
+        'schedule': timedelta(minutes=10),
+    },
+}
@@ -0,0 +1,390 @@
+"""
+Item dependency graph, keeps a topological order and earliest finish hours of the project items up to date
+
+Edits only touch the affected part of the graph. A new edge that agrees with the stored order needs no
+reordering, otherwise only the items between both positions are searched and reordered (Pearce-Kelly).
+Earliest finish hours are propagated from the changed item in topological order and stop where a value
+does not change. Only changed items are written back.
+
+Edits load a partial graph: the items blocked by the changed item, their direct blockers and for a new
+edge the blockers of the new blocker positioned after the blocked item. A partial graph with an invalid
+stored order is replaced by the full graph.
+"""
+import heapq
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q, Count, Max
+from django.utils import timezone
+
+from .conf import settings as app_settings
+from .models import Item, ItemDependency, Project
+
+
+class DependencyCycleError(ValueError):
+    """Raised when a dependency would create a cycle"""
+
+
+class DependencyGraph:
+    """Dependency graph of project items, edge blocker -> blocked means blocker must finish first"""
+
+    def __init__(self, project_id, items, edges, partial=False):
+        self.project_id = project_id
+        self.partial = partial
+        self.stamp = None
+        self.order = {}
+        self.estimate = {}
+        self.finish = {}
+        self.parent = {}
+        self.successors = defaultdict(set)
+        self.predecessors = defaultdict(set)
+        self.changed = set()
+
+        for item_id, order, estimate, completed_on, finish, parent in items:
+            self.order[item_id] = order
+            self.estimate[item_id] = self.get_estimate(estimate, completed_on)
+            self.finish[item_id] = finish
+            self.parent[item_id] = parent
+
+        for blocked, blocker in edges:
+            if blocked in self.order and blocker in self.order:
+                self.successors[blocker].add(blocked)
+                self.predecessors[blocked].add(blocker)
+
+        self.valid = self.normalize_order()
+
+    @classmethod
+    def load(cls, project_id, item_ids=None, blocker_id=None, stamped=False):
+        """
+        Load graph of project, with item_ids only the items they block and their direct blockers are loaded.
+
+        With blocker_id the blocker of a new edge to item_ids is loaded with the blockers an edge can reorder.
+        A stamped graph can be reused in a later transaction when is_current.
+        """
+        stamp = cls.get_stamp(project_id) if stamped else None
+        fields = ['id', 'dependency_order', 'estimate', 'completed_on', 'earliest_finish', 'critical_predecessor_id']
+        edges = ItemDependency.objects.filter(item__project_id=project_id, item__deleted=False, blocked_by__deleted=False)
+
+        if item_ids is None:
+            graph = cls(
+                project_id,
+                Item.objects.filter(project_id=project_id).values_list(*fields),
+                edges.values_list('item_id', 'blocked_by_id'),
+            )
+            graph.stamp = stamp
+            return graph
+
+        loaded_edges = set()
+        item_ids = set(item_ids)
+        frontier = set(item_ids)
+        while frontier:
+            found = set(edges.filter(blocked_by_id__in=frontier).values_list('item_id', 'blocked_by_id'))
+            loaded_edges |= found
+            frontier = {blocked for blocked, _ in found} - item_ids
+            item_ids |= frontier
+
+        # Finish of the direct blockers is read, they are not recalculated
+        loaded_edges |= set(edges.filter(item_id__in=item_ids).values_list('item_id', 'blocked_by_id'))
+
+        if blocker_id:
+            lower = min(Item.objects.filter(id__in=item_ids).values_list('dependency_order', flat=True), default=0)
+            blockers = {blocker_id}
+            frontier = {blocker_id}
+            while frontier:
+                found = set(edges.filter(
+                    item_id__in=frontier,
+                    blocked_by__dependency_order__gte=lower,
+                ).values_list('item_id', 'blocked_by_id'))
+                loaded_edges |= found
+                frontier = {blocker for _, blocker in found} - blockers
+                blockers |= frontier
+            item_ids |= blockers
+
+        graph = cls(
+            project_id,
+            Item.objects.filter(
+                project_id=project_id,
+                id__in=item_ids | {blocker for _, blocker in loaded_edges},
+            ).values_list(*fields),
+            loaded_edges,
+            partial=True,
+        )
+        if not graph.valid:
+            return cls.load(project_id, stamped=stamped)
+        graph.stamp = stamp
+        return graph
+
+    @staticmethod
+    def get_stamp(project_id):
+        """Count and last change of the items and dependencies of project, a loaded graph is outdated when it changes"""
+        return (
+            Item._base_manager.filter(project_id=project_id).aggregate(Max('updated_at'), Count('id')),
+            ItemDependency._base_manager.filter(item__project_id=project_id).aggregate(Max('updated_at'), Count('id')),
+        )
+
+    def is_current(self):
+        """Check that the items and dependencies of the project did not change since the graph was loaded"""
+        return self.stamp is not None and self.stamp == self.get_stamp(self.project_id)
+
+    @staticmethod
+    def get_estimate(estimate, completed_on):
+        """Hours an item still takes, completed items take none"""
+        return 0.0 if completed_on else float(estimate or 0.0)
+
+    def normalize_order(self):
+        """
+        Give new items a position at the end, fall back to a full sort when the stored order is invalid.
+
+        Gives back False for a partial graph with an invalid order, it can only be sorted as a whole.
+        """
+        new_items = sorted(item_id for item_id, order in self.order.items() if not order)
+        if new_items:
+            if self.partial:
+                next_order = (Item._base_manager.filter(project_id=self.project_id).aggregate(
+                    order=Max('dependency_order'))['order'] or 0) + 1
+            else:
+                next_order = max(self.order.values(), default=0) + 1
+            for item_id in new_items:
+                self.order[item_id] = next_order
+                self.changed.add(item_id)
+                next_order += 1
+
+        if any(self.order[blocker] >= self.order[blocked] for blocker in self.successors for blocked in self.successors[blocker]):
+            if self.partial:
+                return False
+            self.rebuild()
+        return True
+
+    def rebuild(self):
+        """Full topological sort and earliest finish calculation"""
+        in_degree = {item_id: len(self.predecessors[item_id]) for item_id in self.order}
+        ready = [(self.order[item_id], item_id) for item_id, degree in in_degree.items() if not degree]
+        heapq.heapify(ready)
+
+        position = 0
+        while ready:
+            _, item_id = heapq.heappop(ready)
+            position += 1
+            if self.order[item_id] != position:
+                self.order[item_id] = position
+                self.changed.add(item_id)
+            self.update_finish(item_id)
+
+            for blocked in self.successors[item_id]:
+                in_degree[blocked] -= 1
+                if not in_degree[blocked]:
+                    heapq.heappush(ready, (self.order[blocked], blocked))
+
+        if position != len(self.order):
+            raise DependencyCycleError('Dependencies of project contain a cycle')
+
+    def update_finish(self, item_id):
+        """Recalculate earliest finish of item from its blockers, gives back True when changed"""
+        parent = max(self.predecessors[item_id], key=lambda blocker: (self.finish[blocker], -self.order[blocker]), default=None)
+        finish = (self.finish[parent] if parent else 0.0) + self.estimate[item_id]
+
+        if abs(finish - self.finish[item_id]) < 1e-9 and parent == self.parent[item_id]:
+            return False
+
+        self.finish[item_id] = finish
+        self.parent[item_id] = parent
+        self.changed.add(item_id)
+        return True
+
+    def propagate(self, item_ids):
+        """Update earliest finish of items and everything they block, in topological order"""
+        queue = [(self.order[item_id], item_id) for item_id in set(item_ids) if item_id in self.order]
+        heapq.heapify(queue)
+        queued = {item_id for _, item_id in queue}
+        force = set(queued)
+
+        while queue:
+            _, item_id = heapq.heappop(queue)
+            queued.discard(item_id)
+            if not self.update_finish(item_id) and item_id not in force:
+                continue
+
+            for blocked in self.successors[item_id]:
+                if blocked not in queued:
+                    queued.add(blocked)
+                    heapq.heappush(queue, (self.order[blocked], blocked))
+
+    def reaches(self, source, target, upper_bound):
+        """Forward search from source over items positioned before upper bound"""
+        found = {source}
+        stack = [source]
+        while stack:
+            for blocked in self.successors[stack.pop()]:
+                if blocked == target:
+                    return True, found
+                if blocked not in found and self.order[blocked] <= upper_bound:
+                    found.add(blocked)
+                    stack.append(blocked)
+        return False, found
+
+    def would_create_cycle(self, blocker, blocked):
+        """Check if blocker -> blocked creates a cycle"""
+        if blocker == blocked:
+            return True
+        if self.order[blocker] < self.order[blocked]:
+            return False
+        return self.reaches(blocked, blocker, self.order[blocker])[0]
+
+    def add_edge(self, blocker, blocked):
+        """Add dependency and reorder the affected items"""
+        if blocker == blocked:
+            raise DependencyCycleError('Item can not block itself')
+        if blocked in self.successors[blocker]:
+            return
+
+        lower, upper = self.order[blocked], self.order[blocker]
+        if lower < upper:
+            cycle, forward = self.reaches(blocked, blocker, upper)
+            if cycle:
+                raise DependencyCycleError('Dependency would create a cycle')
+
+            backward = {blocker}
+            stack = [blocker]
+            while stack:
+                for item_id in self.predecessors[stack.pop()]:
+                    if item_id not in backward and self.order[item_id] >= lower:
+                        backward.add(item_id)
+                        stack.append(item_id)
+
+            # Blockers take the lowest positions of the affected region, the blocked items the rest
+            positions = sorted(self.order[item_id] for item_id in backward | forward)
+            reordered = sorted(backward, key=self.order.get) + sorted(forward, key=self.order.get)
+            for item_id, position in zip(reordered, positions):
+                if self.order[item_id] != position:
+                    self.order[item_id] = position
+                    self.changed.add(item_id)
+
+        self.successors[blocker].add(blocked)
+        self.predecessors[blocked].add(blocker)
+        self.propagate([blocked])
+
+    def remove_edge(self, blocker, blocked):
+        """Remove dependency, topological order stays valid"""
+        self.successors[blocker].discard(blocked)
+        self.predecessors[blocked].discard(blocker)
+        self.propagate([blocked])
+
+    def set_estimate(self, item_id, estimate, completed_on=None):
+        """Change remaining hours of item"""
+        self.estimate[item_id] = self.get_estimate(estimate, completed_on)
+        self.propagate([item_id])
+
+    def critical_path(self):
+        """Items of the longest chain, from first to last"""
+        if not self.finish:
+            return []
+
+        item_id = max(self.finish, key=lambda key: (self.finish[key], -self.order[key]))
+        path = []
+        while item_id:
+            path.append(item_id)
+            item_id = self.parent[item_id]
+        return list(reversed(path))
+
+    def save(self):
+        """Write changed items"""
+        items = [
+            Item(
+                id=item_id,
+                dependency_order=self.order[item_id],
+                earliest_finish=self.finish[item_id],
+                critical_predecessor_id=self.parent[item_id],
+            )
+            for item_id in self.changed if item_id in self.order
+        ]
+        Item.objects.bulk_update(items, ['dependency_order', 'earliest_finish', 'critical_predecessor_id'], batch_size=500)
+        self.changed = set()
+        return len(items)
+
+
+def get_critical_path(project_id, limit=10):
+    """First open items of the longest chain of project, with the remaining hours of the chain"""
+    last = Item.objects.filter(project_id=project_id).order_by('-earliest_finish', 'dependency_order').values_list(
+        'id', 'earliest_finish').first()
+    if not last:
+        return [], 0.0
+
+    predecessors = dict(Item.objects.filter(
+        project_id=project_id,
+        critical_predecessor__isnull=False,
+    ).values_list('id', 'critical_predecessor_id'))
+
+    path = {last[0]}
+    item_id = last[0]
+    while item_id in predecessors and len(path) <= len(predecessors):
+        item_id = predecessors[item_id]
+        path.add(item_id)
+
+    # Open items in dependency order, stop when enough items of the path are found
+    item_ids = []
+    for item_id in Item.objects.filter(project_id=project_id, completed_on__isnull=True).order_by(
+            'dependency_order').values_list('id', flat=True).iterator():
+        if item_id in path:
+            item_ids.append(item_id)
+            if len(item_ids) >= limit:
+                break
+
+    items = Item.objects.in_bulk(item_ids)
+    return [items[item_id] for item_id in item_ids], float(last[1] or 0.0)
+
+
+def predict_completion(hours, start=None):
+    """Date the given hours are done, working HOURS_PER_DAY on weekdays"""
+    day = start or timezone.now().date()
+    if hours <= 0:
+        return day
+
+    days = math.ceil(hours / float(app_settings.HOURS_PER_DAY))
+    while days > 1 or day.weekday() >= 5:
+        if day.weekday() < 5:
+            days -= 1
+        day += timedelta(days=1)
+    return day
+
+
+def lock_project(project_id):
+    """Lock project so dependency edits of a project are applied one after the other"""
+    Project.objects.select_for_update().filter(id=project_id).values_list('id').first()
+
+
+def update_item_schedule(item):
+    """Update schedule after the estimate or completion of item changed"""
+    edges = list(ItemDependency.objects.filter(
+        Q(item_id=item.id) | Q(blocked_by_id=item.id),
+        item__deleted=False,
+        blocked_by__deleted=False,
+    ).values_list('item_id', flat=True)[:1])
+    if not edges:
+        # Item without dependencies, finish is only its own estimate
+        finish = DependencyGraph.get_estimate(item.estimate, item.completed_on)
+        if item.earliest_finish != finish or item.critical_predecessor_id:
+            item.earliest_finish = finish
+            item.critical_predecessor_id = None
+            Item.objects.filter(id=item.id).update(earliest_finish=finish, critical_predecessor=None)
+        return
+
+    with transaction.atomic():
+        lock_project(item.project_id)
+        graph = DependencyGraph.load(item.project_id, [item.id])
+        if item.id in graph.order:
+            graph.set_estimate(item.id, item.estimate, item.completed_on)
+        graph.save()
+
+
+def reschedule_items(project_id, item_ids):
+    """Update schedule of items after one of their blockers is removed"""
+    if not item_ids:
+        return
+
+    with transaction.atomic():
+        lock_project(project_id)
+        graph = DependencyGraph.load(project_id, item_ids)
+        graph.propagate(item_ids)
+        graph.save()
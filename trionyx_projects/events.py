@@ -0,0 +1,146 @@
+"""Project change events, published from the save paths and polled by open project pages"""
+import logging
+import threading
+from collections import deque
+from functools import lru_cache
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .conf import settings as app_settings
+
+logger = logging.getLogger(__name__)
+
+# Send when a client missed events and should reload the whole tab
+RELOAD_EVENT = {'type': 'reload'}
+
+
+def get_channel(project_id):
+    """Get event channel of project"""
+    return f'project-{project_id}'
+
+
+class BaseEventBackend:
+    """Event backend keeps the last events per channel with an increasing id"""
+
+    def publish(self, channel, event):
+        """Publish event on channel, gives back event id"""
+        raise NotImplementedError()
+
+    def get_last_id(self, channel):
+        """Get id of last published event on channel"""
+        raise NotImplementedError()
+
+    def fetch(self, channel, last_id):
+        """Get list of (id, event) that where published after given id"""
+        raise NotImplementedError()
+
+
+class MemoryEventBackend(BaseEventBackend):
+    """In process backend, only for development and single process deployments"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.channels = {}
+        self.last_ids = {}
+
+    def publish(self, channel, event):
+        with self.lock:
+            event_id = self.last_ids.get(channel, 0) + 1
+            self.last_ids[channel] = event_id
+            self.channels.setdefault(channel, deque(maxlen=app_settings.EVENTS_BUFFER)).append((event_id, event))
+            return event_id
+
+    def get_last_id(self, channel):
+        return self.last_ids.get(channel, 0)
+
+    def fetch(self, channel, last_id):
+        with self.lock:
+            events = [(event_id, event) for event_id, event in self.channels.get(channel, []) if event_id > last_id]
+            current = self.last_ids.get(channel, 0)
+
+        if current > last_id and (not events or events[0][0] != last_id + 1):
+            return [(current, RELOAD_EVENT)]
+        return events
+
+
+class CacheEventBackend(BaseEventBackend):
+    """
+    Backend on the Django cache, shared between processes when the cache is shared (Redis, Memcached, database).
+
+    The counter incr is not atomic on every cache (the DatabaseCache reads and writes it), an event id is
+    claimed with add on the event key and a taken id is skipped, so parallel publishers never share an id.
+    """
+
+    def get_key(self, channel, event_id=None):
+        return f'trionyx-projects-events-{channel}' + (f'-{event_id}' if event_id else '')
+
+    def publish(self, channel, event):
+        key = self.get_key(channel)
+        cache.add(key, 0, None)
+        event_id = cache.incr(key)
+        while not cache.add(self.get_key(channel, event_id), event, app_settings.EVENTS_TIMEOUT):
+            event_id = cache.incr(key)
+        return event_id
+
+    def get_last_id(self, channel):
+        return cache.get(self.get_key(channel), 0)
+
+    def fetch(self, channel, last_id):
+        current = self.get_last_id(channel)
+        if current <= last_id:
+            return []
+
+        if current - last_id > app_settings.EVENTS_BUFFER:
+            return [(current, RELOAD_EVENT)]
+
+        found = cache.get_many([self.get_key(channel, event_id) for event_id in range(last_id + 1, current + 1)])
+        events = []
+        for event_id in range(last_id + 1, current + 1):
+            event = found.get(self.get_key(channel, event_id))
+            if event is None:
+                # Last event can still be written, a missing event before that is expired
+                if event_id < current:
+                    return [(current, RELOAD_EVENT)]
+                break
+            events.append((event_id, event))
+        return events
+
+
+@lru_cache()
+def get_backend():
+    """Get configured event backend"""
+    return import_string(app_settings.EVENTS_BACKEND)()
+
+
+def publish(project_id, event):
+    """Publish event for project when the current transaction is committed"""
+    transaction.on_commit(lambda: send(project_id, event))
+
+
+def send(project_id, event):
+    """Publish event on the backend, the change is committed so a failed publish is only logged"""
+    try:
+        get_backend().publish(get_channel(project_id), event)
+    except Exception as e:
+        logger.exception(e)
+
+
+def publish_item(item, deleted=False):
+    """Publish item change"""
+    publish(item.project_id, {
+        'type': 'item',
+        'action': 'deleted' if deleted or item.deleted else 'saved',
+        'id': item.id,
+    })
+
+
+def publish_worklog(worklog, project_id, deleted=False):
+    """Publish worklog change"""
+    publish(project_id, {
+        'type': 'worklog',
+        'action': 'deleted' if deleted or worklog.deleted else 'saved',
+        'id': worklog.id,
+        'item_id': worklog.item_id,
+    })
@@ -0,0 +1,95 @@
+"""
+Batch invoicing of billed hours
+
+Uninvoiced worklogs are collected with one streaming query over the uninvoiced index, grouped in
+invoice lines per item and rate and marked invoiced with one UPDATE per line and batch. Invoice lines
+are stored, the revenue of invoiced worklogs is the line total and does not change with later rates.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Project, WorkLog, InvoiceLine, update_revenues
+from .rates import get_timelines
+
+
+class InvoiceError(Exception):
+    """Raised when worklogs are invoiced by another run"""
+
+
+def get_invoice_projects(projects=None, for_object=None):
+    """Hourly based projects to invoice, given projects or all projects of object (account)"""
+    queryset = Project.objects.filter(project_type=Project.TYPE_HOURLY_BASED)
+    if for_object is not None:
+        queryset = queryset.filter(id__in=Project.objects.for_object(for_object).values('id'))
+    if projects is not None:
+        queryset = queryset.filter(id__in=[project.id if isinstance(project, Project) else project for project in projects])
+    return list(queryset.only('id', 'code', 'project_hourly_rate'))
+
+
+def collect_invoice_lines(projects, start=None, end=None):
+    """Collect uninvoiced billed hours of projects in period, gives back unsaved invoice lines with their worklog ids"""
+    projects = {project.id: project for project in projects}
+    timelines = get_timelines(projects.values())
+
+    queryset = WorkLog.objects.filter(
+        item__project__in=projects.keys(),
+        invoiced_on__isnull=True,
+        billed__gt=0,
+    )
+    if start:
+        queryset = queryset.filter(date__gte=start)
+    if end:
+        queryset = queryset.filter(date__lte=end)
+
+    lines = {}
+    for worklog_id, project_id, item_id, item_code, item_name, date, billed in queryset.order_by(
+            'item__project', 'item__rank', 'item', 'date').values_list(
+            'id', 'item__project', 'item', 'item__code', 'item__name', 'date', 'billed').iterator():
+        rate = timelines[project_id].rate_on(date)
+        line = lines.get((item_id, rate))
+        if line is None:
+            line = lines[(item_id, rate)] = InvoiceLine(
+                project=projects[project_id],
+                item_id=item_id,
+                description=f'{item_code} - {item_name}'[:256],
+                rate=rate,
+            )
+            line.worklog_ids = []
+        line.hours += float(billed)
+        line.worklog_ids.append(worklog_id)
+
+    for line in lines.values():
+        line.worklog_count = len(line.worklog_ids)
+        line.total = round(line.hours * line.rate, 2)
+    return list(lines.values())
+
+
+def invoice_worklogs(projects, start=None, end=None, reference='', batch_size=500):
+    """
+    Collect and save invoice lines and mark the worklogs invoiced, gives back the invoice lines.
+
+    Rows are marked after the streaming query, SQLite gives no isolation between a running query
+    and writes on the same connection. A batch that was marked by a parallel run rolls back everything.
+    Revenue of the invoiced projects is priced again, invoiced hours now count with their line total.
+    """
+    now = timezone.now()
+    today = now.date()
+    with transaction.atomic():
+        lines = collect_invoice_lines(projects, start, end)
+        for line in lines:
+            line.invoiced_on = today
+            line.reference = reference
+            line.save()
+            for index in range(0, len(line.worklog_ids), batch_size):
+                batch = line.worklog_ids[index:index + batch_size]
+                updated = WorkLog.objects.filter(id__in=batch, invoiced_on__isnull=True).update(
+                    invoiced_on=today,
+                    invoice_reference=reference,
+                    invoice_line=line,
+                    updated_at=now,
+                )
+                if updated != len(batch):
+                    raise InvoiceError('Worklogs are invoiced by another run')
+
+        update_revenues({line.project_id: line.project for line in lines}.values())
+    return lines
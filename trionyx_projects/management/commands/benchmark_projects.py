@@ -0,0 +1,266 @@
+"""Benchmark project save paths and layout rendering"""
+import math
+import time
+import statistics
+import tracemalloc
+from datetime import date, timedelta
+
+from crispy_forms.utils import render_crispy_form
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.template.context_processors import csrf
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from trionyx.trionyx import LOCAL_DATA
+from trionyx.views import tabs, sidebars
+
+from trionyx_projects.models import Project, Item, ItemDependency, WorkLog
+from trionyx_projects.dependencies import DependencyGraph
+from trionyx_projects.model_forms import ProjectForm, ItemForm
+
+
+WORKLOGS_PER_ITEM = 12
+# Worklogs of an item are spread over the last year
+WORKLOG_DAYS = 365
+DEPENDENCIES_PER_ITEM = 5
+
+
+class Rollback(Exception):
+    """Raised to discard all benchmark data"""
+
+
+class Command(BaseCommand):
+    """Benchmark save paths, forms and layouts against seeded projects of increasing size"""
+
+    help = 'Benchmark project save paths, forms and layouts, fails when an operation scales superlinear'
+
+    # Operation name and expected growth exponent of the cost per call when the project grows
+    operations = [
+        ('item_save', 0),
+        ('worklog_save', 0),
+        ('project_form', 0),
+        ('item_form', 0),
+        ('project_form_render', 0),
+        ('item_form_render', 0),
+        ('project_overview', 1),
+        ('item_sidebar', 0),
+        ('dependency_add', 0),
+        ('dependency_estimate', 0),
+    ]
+
+    def add_arguments(self, parser):
+        """Add command arguments"""
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10, 100, 1000], help='Number of items per project')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per operation, median time is reported')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Allowed growth exponent above the expected exponent before an operation fails')
+        parser.add_argument('--operation', action='append', dest='selected', help='Only run given operation')
+
+    def handle(self, *args, **options):
+        """Run benchmarks inside a transaction that is rolled back"""
+        sizes = sorted(set(options['sizes']))
+        if len(sizes) < 2:
+            raise CommandError('At least two sizes are required to detect scaling')
+
+        operations = [
+            (name, expected) for name, expected in self.operations
+            if not options['selected'] or name in options['selected']
+        ]
+
+        results = {}
+        try:
+            with transaction.atomic():
+                user = get_user_model().objects.create_superuser('benchmark@trionyx.local')
+                request = RequestFactory().get('/')
+                request.user = user
+                LOCAL_DATA.request = request
+
+                for size in sizes:
+                    project = self.seed(size, user)
+                    for name, _ in operations:
+                        results[(name, size)] = self.measure(
+                            getattr(self, f'bench_{name}')(project, request),
+                            options['repeat'],
+                        )
+                raise Rollback()
+        except Rollback:
+            pass
+        finally:
+            LOCAL_DATA.request = None
+
+        failures = []
+        self.stdout.write('{:<18} {:>8} {:>12} {:>9} {:>12}'.format('operation', 'items', 'time (ms)', 'queries', 'peak (KiB)'))
+        for name, expected in operations:
+            for size in sizes:
+                result = results[(name, size)]
+                self.stdout.write('{:<18} {:>8} {:>12.3f} {:>9} {:>12.1f}'.format(
+                    name, size, result['time'] * 1000, result['queries'], result['memory'] / 1024))
+
+            exponent = self.growth_exponent(sizes, [results[(name, size)]['time'] for size in sizes])
+            self.stdout.write(f'{name:<18} growth exponent {exponent:.2f} (expected {expected})\n')
+
+            if exponent > expected + options['tolerance']:
+                failures.append(f'{name} time grows with exponent {exponent:.2f}, expected {expected}')
+
+            queries = [results[(name, size)]['queries'] for size in sizes]
+            if queries[-1] > queries[0]:
+                failures.append(f'{name} queries grow from {queries[0]} to {queries[-1]}')
+
+        if failures:
+            raise CommandError('Scaling regression:\n - {}'.format('\n - '.join(failures)))
+
+    def seed(self, size, user):
+        """Create project with given number of items, bypassing the save side effects"""
+        project = Project.objects.create(
+            name=f'Benchmark {size}',
+            code=f'BENCH{size}'[:10],
+            status=Project.STATUS_ACTIVE,
+            project_type=Project.TYPE_HOURLY_BASED,
+            created_by=user,
+        )
+
+        Item.objects.bulk_create([
+            Item(
+                project=project,
+                code=f'{project.code}-{index}',
+                name=f'Benchmark item {index}',
+                description='<p>Benchmark item</p>',
+                description_html='<p>Benchmark item</p>',
+                description_excerpt='Benchmark item',
+                estimate=4.0,
+                total_worked=float(WORKLOGS_PER_ITEM),
+                total_billed=float(WORKLOGS_PER_ITEM),
+                created_by=user,
+            ) for index in range(1, size + 1)
+        ], batch_size=500)
+
+        today = date.today()
+        WorkLog.objects.bulk_create([
+            WorkLog(
+                item=item,
+                date=today - timedelta(days=(item.id * 7 + index * WORKLOG_DAYS // WORKLOGS_PER_ITEM) % WORKLOG_DAYS),
+                worked=1.0,
+                billed=1.0,
+                description='<p>Benchmark work</p>',
+                description_html='<p>Benchmark work</p>',
+                description_excerpt='Benchmark work',
+                created_by=user,
+            ) for item in project.items.all() for index in range(WORKLOGS_PER_ITEM)
+        ], batch_size=500)
+
+        Project.objects.filter(id=project.id).update(
+            item_increment_id=size,
+            open_items=size,
+            total_items_estimate=4.0 * size,
+            total_worked=float(WORKLOGS_PER_ITEM * size),
+            total_billed=float(WORKLOGS_PER_ITEM * size),
+        )
+
+        # Every item blocks the next items, a long chain with many edges
+        item_ids = list(project.items.order_by('id').values_list('id', flat=True))
+        ItemDependency.objects.bulk_create([
+            ItemDependency(item_id=item_ids[index + offset], blocked_by_id=item_id, created_by=user)
+            for index, item_id in enumerate(item_ids)
+            for offset in range(1, DEPENDENCIES_PER_ITEM + 1) if index + offset < len(item_ids) - 1
+        ], batch_size=500)
+        graph = DependencyGraph.load(project.id)
+        graph.rebuild()
+        graph.save()
+
+        project.refresh_from_db()
+        return project
+
+    def measure(self, func, repeat):
+        """Measure median time, queries and peak memory of given function"""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+
+        with CaptureQueriesContext(connection) as queries:
+            func()
+
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'time': statistics.median(timings),
+            'queries': len(queries),
+            'memory': peak,
+        }
+
+    def growth_exponent(self, sizes, timings):
+        """Least squares slope of the log-log curve, 1 is linear and above is superlinear"""
+        xs = [math.log(size) for size in sizes]
+        ys = [math.log(max(timing, 1e-9)) for timing in timings]
+        mean_x = statistics.mean(xs)
+        mean_y = statistics.mean(ys)
+        return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sum((x - mean_x) ** 2 for x in xs)
+
+    def bench_item_save(self, project, request):
+        """Save an existing item, the project totals are only touched when the estimate or completed date change"""
+        item = project.items.order_by('id').first()
+        return lambda: Item.objects.get(id=item.id).save()
+
+    def bench_worklog_save(self, project, request):
+        """Log time on an existing item, totals are summed over the worklogs of the item and added to the project"""
+        item = project.items.order_by('id').first()
+        return lambda: WorkLog(item=Item.objects.get(id=item.id), date=date.today(), worked=0.25).save()
+
+    def bench_project_form(self, project, request):
+        """Construct project edit form"""
+        return lambda: ProjectForm(instance=project)
+
+    def bench_item_form(self, project, request):
+        """Construct item edit form"""
+        item = project.items.order_by('id').first()
+        return lambda: ItemForm(instance=item)
+
+    def bench_project_form_render(self, project, request):
+        """Construct and render project edit dialog form"""
+        return lambda: render_crispy_form(ProjectForm(instance=project), context=csrf(request))
+
+    def bench_item_form_render(self, project, request):
+        """Construct and render item create dialog form"""
+        return lambda: render_crispy_form(ItemForm(initial={'project': project.id}), context=csrf(request))
+
+    def bench_project_overview(self, project, request):
+        """Render project general tab"""
+        tab = tabs.get_tab(Project, project, 'general')
+        return lambda: tab.get_layout(Project.objects.get(id=project.id)).render(request)
+
+    def bench_item_sidebar(self, project, request):
+        """Render item sidebar"""
+        item = project.items.order_by('id').first()
+        sidebar = sidebars.get_sidebar(Item)
+        return lambda: sidebar(request, Item.objects.get(id=item.id))
+
+    def bench_dependency_add(self, project, request):
+        """Add and remove a dependency, only the blocked item, its blocked items and their blockers are loaded"""
+        first, last = project.items.order_by('id').first(), project.items.order_by('-id').first()
+
+        def func():
+            dependency = ItemDependency(item=last, blocked_by=first)
+            dependency.save()
+            dependency.delete()
+        return func
+
+    def bench_dependency_estimate(self, project, request):
+        """
+        Change estimate of the last blocked item.
+
+        Only the item and its direct blockers are loaded and the project totals get the difference.
+        """
+        item = project.items.order_by('-id')[1]
+
+        def func():
+            item.estimate = 8.0 if item.estimate == 4.0 else 4.0
+            item.save(update_fields=['estimate'])
+        return func
@@ -0,0 +1,68 @@
+"""Check the startup import time of the app"""
+import json
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from trionyx_projects.conf import settings as app_settings
+
+# Modules that are only needed to render views or run tasks and must not be imported by django.setup()
+DEFERRED_MODULES = [
+    'trionyx_projects.model_forms',
+    'trionyx_projects.project_layouts',
+    'trionyx_projects.capacity',
+    'trionyx_projects.moves',
+    'trionyx_projects.notifications',
+    'trionyx_projects.partitions',
+    'trionyx_projects.timesheets',
+    'trionyx_projects.transfer',
+]
+
+# Python -X importtime does not log the modules Django imports with importlib, setup is timed in the process
+SETUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+print(json.dumps({
+    'ms': (time.perf_counter() - start) * 1000,
+    'modules': sorted(name for name in sys.modules if name.startswith('trionyx_projects')),
+}))
+"""
+
+
+class Command(BaseCommand):
+    """Time django.setup() in a new process, the way a worker or management command starts"""
+
+    help = 'Fail when Django startup is slower than the budget or imports modules that are deferred'
+
+    def add_arguments(self, parser):
+        """Add command arguments"""
+        parser.add_argument('--budget', type=float, help='Maximum startup time in ms, default PROJECTS_IMPORT_TIME_BUDGET')
+        parser.add_argument('--repeat', type=int, default=3, help='Startups to time, the fastest counts')
+
+    def handle(self, *args, **options):
+        """Time startup"""
+        budget = options['budget'] or app_settings.IMPORT_TIME_BUDGET
+        results = [self.run_setup() for _ in range(max(options['repeat'], 1))]
+        elapsed = min(result['ms'] for result in results)
+        imported = [name for name in DEFERRED_MODULES if name in results[0]['modules']]
+
+        self.stdout.write(f'Startup: {elapsed:.0f}ms (budget {budget:.0f}ms)')
+        self.stdout.write('Imported: ' + ', '.join(name.split('.', 1)[1] for name in results[0]['modules'][1:]))
+
+        errors = []
+        if elapsed > budget:
+            errors.append(f'Startup took {elapsed:.0f}ms, budget is {budget:.0f}ms')
+        if imported:
+            errors.append('Deferred modules imported on startup: ' + ', '.join(imported))
+        if errors:
+            raise CommandError('\n'.join(errors))
+
+    def run_setup(self):
+        """Run django.setup() in a new interpreter with the environment of this command"""
+        process = subprocess.run([sys.executable, '-c', SETUP_SCRIPT], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if process.returncode:
+            raise CommandError(f'Django setup failed:\n{process.stderr.decode(errors="replace")}')
+        return json.loads(process.stdout.decode().strip().splitlines()[-1])
@@ -0,0 +1,25 @@
+"""Merge old worklogs into one worklog per item, user and period"""
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from trionyx_projects.compaction import PERIOD_DAY, PERIOD_MONTH, compact_worklogs, get_horizon
+
+
+class Command(BaseCommand):
+    """Compact worklogs before the horizon, worked and billed totals stay the same"""
+
+    help = 'Merge old worklogs into one worklog per item, user and day or month'
+
+    def add_arguments(self, parser):
+        """Add command arguments"""
+        parser.add_argument('--before', type=parse_date, help='Compact worklogs before date (YYYY-MM-DD), default from settings')
+        parser.add_argument('--period', choices=[PERIOD_DAY, PERIOD_MONTH], help='Default from settings')
+        parser.add_argument('--archive', action='store_true', default=None, help='Keep originals in a compressed archive')
+        parser.add_argument('--batch-size', type=int, default=100, help='Items per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the worklogs that are merged')
+
+    def handle(self, *args, **options):
+        """Compact worklogs"""
+        before = options['before'] or get_horizon()
+        merged, removed = compact_worklogs(before, options['period'], options['archive'], options['batch_size'], options['dry_run'])
+        self.stdout.write(f'{removed} worklogs before {before} {"can be" if options["dry_run"] else "are"} merged into {merged} worklogs')
@@ -0,0 +1,29 @@
+"""Export project as gzip compressed JSON Lines"""
+from django.core.management.base import BaseCommand, CommandError
+
+from trionyx_projects.models import Project
+from trionyx_projects.transfer import export_project, open_archive
+
+
+class Command(BaseCommand):
+    """Stream project with its items, comments and worklogs to a portable archive"""
+
+    help = 'Export project with its items, comments and worklogs as gzip compressed JSON Lines'
+
+    def add_arguments(self, parser):
+        """Add command arguments"""
+        parser.add_argument('project', help='Project code')
+        parser.add_argument('path', help='Archive file, - writes to stdout')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows read per query')
+
+    def handle(self, *args, **options):
+        """Export project"""
+        project = Project.objects.filter(code=options['project'].upper()).first()
+        if not project:
+            raise CommandError(f'Unknown project {options["project"]}')
+
+        with open_archive(options['path'], 'w') as fileobj:
+            counts = export_project(project, fileobj, options['chunk_size'])
+
+        if options['path'] != '-':
+            self.stdout.write(f'Exported {project.code}: ' + ', '.join(f'{count} {name}' for name, count in counts.items()))
@@ -0,0 +1,28 @@
+"""Import project from a project export"""
+from django.core.management.base import BaseCommand, CommandError
+
+from trionyx_projects.transfer import import_project, open_archive
+
+
+class Command(BaseCommand):
+    """Stream a portable project archive into a new project"""
+
+    help = 'Import project export as a new project, items get new ids and codes'
+
+    def add_arguments(self, parser):
+        """Add command arguments"""
+        parser.add_argument('path', help='Archive file, - reads from stdin')
+        parser.add_argument('--code', help='Code of the new project, default the exported code')
+        parser.add_argument('--name', help='Name of the new project, default the exported name')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows inserted per batch')
+
+    def handle(self, *args, **options):
+        """Import project"""
+        try:
+            with open_archive(options['path']) as fileobj:
+                project, counts = import_project(fileobj, options['code'], options['name'], options['chunk_size'])
+        except (OSError, ValueError) as e:
+            # TransferError and invalid JSON are both ValueError
+            raise CommandError(f'Import failed: {e}')
+
+        self.stdout.write(f'Imported {project.code}: ' + ', '.join(f'{count} {name}' for name, count in counts.items()))
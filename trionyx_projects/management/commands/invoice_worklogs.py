@@ -0,0 +1,55 @@
+"""Invoice uninvoiced billed hours of projects"""
+from django.apps import apps
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from trionyx.renderer import price_value_renderer
+
+from trionyx_projects.invoicing import get_invoice_projects, collect_invoice_lines, invoice_worklogs, InvoiceError
+from trionyx_projects.models import Project
+
+
+class Command(BaseCommand):
+    """Collect invoice lines of uninvoiced worklogs per project or account and mark the worklogs invoiced"""
+
+    help = 'Make invoice lines of the uninvoiced billed hours of projects and mark the worklogs invoiced'
+
+    def add_arguments(self, parser):
+        """Add command arguments"""
+        parser.add_argument('--project', action='append', dest='projects', help='Project code, default all hourly based projects')
+        parser.add_argument('--for-object', help='Invoice projects of object, as app_label.model:id')
+        parser.add_argument('--start', type=parse_date, help='First worklog date (YYYY-MM-DD)')
+        parser.add_argument('--end', type=parse_date, help='Last worklog date (YYYY-MM-DD)')
+        parser.add_argument('--reference', default='', help='Invoice reference stored on the worklogs')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Only show the invoice lines')
+
+    def handle(self, *args, **options):
+        """Invoice worklogs"""
+        projects = None
+        if options['projects']:
+            projects = list(Project.objects.filter(code__in=[code.upper() for code in options['projects']]).values_list('id', flat=True))
+
+        for_object = None
+        if options['for_object']:
+            try:
+                model, object_id = options['for_object'].split(':')
+                for_object = apps.get_model(model).objects.get(pk=object_id)
+            except (ValueError, LookupError, ObjectDoesNotExist) as e:
+                raise CommandError(f'Invalid object {options["for_object"]}: {e}')
+
+        projects = get_invoice_projects(projects, for_object)
+        if options['dry_run']:
+            lines = collect_invoice_lines(projects, options['start'], options['end'])
+        else:
+            try:
+                lines = invoice_worklogs(projects, options['start'], options['end'], options['reference'], options['batch_size'])
+            except InvoiceError as e:
+                raise CommandError(str(e))
+
+        for line in lines:
+            self.stdout.write('{:<10} {:<60} {:>8.2f}h {:>12} {:>12}'.format(
+                line.project.code, line.description[:60], line.hours, price_value_renderer(line.rate), price_value_renderer(line.total)))
+
+        self.stdout.write('{} worklogs in {} lines, total {}'.format(
+            sum(line.worklog_count for line in lines), len(lines), price_value_renderer(sum(line.total for line in lines))))
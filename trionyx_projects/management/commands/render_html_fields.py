@@ -0,0 +1,44 @@
+"""Backfill sanitized html and excerpts of Wysiwyg fields"""
+from django.core.management.base import BaseCommand
+
+from trionyx_projects.models import Project, Item, Comment, WorkLog
+from trionyx_projects.sanitize import sanitize_html
+
+
+class Command(BaseCommand):
+    """Render the stored html and excerpt of all Wysiwyg fields"""
+
+    help = 'Sanitize Wysiwyg fields of existing rows and store the rendered html and excerpt'
+
+    def add_arguments(self, parser):
+        """Add command arguments"""
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        """Render all rows in batches"""
+        for Model in [Project, Item, Comment, WorkLog]:
+            total = 0
+            for field in Model.rendered_html_fields:
+                fields = [f'{field}_html', f'{field}_excerpt']
+                batch = []
+
+                # Base manager also renders soft deleted rows
+                for obj in Model._base_manager.only('id', field, *fields).iterator(chunk_size=options['batch_size']):
+                    html, excerpt = sanitize_html(getattr(obj, field))
+                    if (html, excerpt) == (getattr(obj, fields[0]), getattr(obj, fields[1])):
+                        continue
+
+                    setattr(obj, fields[0], html)
+                    setattr(obj, fields[1], excerpt)
+                    batch.append(obj)
+
+                    if len(batch) >= options['batch_size']:
+                        Model._base_manager.bulk_update(batch, fields)
+                        total += len(batch)
+                        batch = []
+
+                if batch:
+                    Model._base_manager.bulk_update(batch, fields)
+                    total += len(batch)
+
+            self.stdout.write(f'{Model.__name__}: rendered {total} rows')
@@ -0,0 +1,39 @@
+"""Manage the PostgreSQL date partitions of worklogs"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from trionyx_projects.partitions import (
+    PartitionError, is_partitioned, get_partitions, partition_table, create_partitions, detach_partitions
+)
+
+
+class Command(BaseCommand):
+    """Convert worklogs to a partitioned table, create partitions ahead or detach old partitions"""
+
+    help = 'Show, create or detach the date partitions of worklogs'
+
+    def add_arguments(self, parser):
+        """Add command arguments"""
+        parser.add_argument('--convert', action='store_true', help='Convert the worklog table to a partitioned table')
+        parser.add_argument('--ahead', type=int, help='Create the month partitions until given months ahead')
+        parser.add_argument('--detach-before', type=parse_date, help='Detach partitions that end on or before date (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        """Manage partitions"""
+        if options['convert']:
+            try:
+                partition_table(months_ahead=options['ahead'])
+            except PartitionError as e:
+                raise CommandError(str(e))
+        elif not is_partitioned():
+            raise CommandError('Worklogs are not partitioned, use --convert')
+        elif options['ahead'] is not None:
+            for name in create_partitions(months_ahead=options['ahead']):
+                self.stdout.write(f'Created {name}')
+
+        if options['detach_before']:
+            for name in detach_partitions(options['detach_before']):
+                self.stdout.write(f'Detached {name}')
+
+        for name, start, end in get_partitions():
+            self.stdout.write('{:<45} {:>10} - {:>10}'.format(name, str(start or ''), str(end or '')))
@@ -0,0 +1,127 @@
+"""App middleware"""
+import hashlib
+
+from django.db.models import Count, Max, OuterRef, Subquery, IntegerField, DateTimeField
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+
+from .conf import settings as app_settings
+from .models import Project, HourlyRate, Item, ItemDependency, Comment, WorkLog
+from .timers import get_running_timer
+
+
+def aggregate_subquery(queryset, field, aggregate, output_field):
+    """Subquery that gives aggregate of the related rows, deleted rows are included so soft deletes change the result"""
+    return Subquery(
+        queryset.order_by().values(field).annotate(value=aggregate).values('value'),
+        output_field=output_field,
+    )
+
+
+def related_stamps(model, field, prefix=''):
+    """Max updated_at and row count of related model, hard deletes only change the count"""
+    queryset = model._base_manager.filter(**{field: OuterRef('pk')})
+    return {
+        f'{prefix}{model._meta.model_name}_updated': aggregate_subquery(queryset, field, Max('updated_at'), DateTimeField()),
+        f'{prefix}{model._meta.model_name}_count': aggregate_subquery(queryset, field, Count('id'), IntegerField()),
+    }
+
+
+def default_rate_stamps():
+    """Max updated_at and row count of the default rates"""
+    queryset = HourlyRate._base_manager.filter(project__isnull=True)
+    return {
+        'default_rate_updated': aggregate_subquery(queryset, 'project', Max('updated_at'), DateTimeField()),
+        'default_rate_count': aggregate_subquery(queryset, 'project', Count('id'), IntegerField()),
+    }
+
+
+def get_project_version(project_id):
+    """
+    Version stamp of project overview, changes when the project, its items, dependencies, worklogs or rates change.
+
+    Rank moves touch the item updated_at. The forecast and current rate depend on the date, the date is part of the stamp.
+    """
+    version = Project._base_manager.filter(id=project_id).annotate(
+        **related_stamps(Item, 'project'),
+        **related_stamps(ItemDependency, 'item__project'),
+        **related_stamps(WorkLog, 'item__project'),
+        **related_stamps(HourlyRate, 'project'),
+        **default_rate_stamps(),
+    ).values_list(
+        'updated_at', 'item_updated', 'item_count', 'itemdependency_updated', 'itemdependency_count',
+        'worklog_updated', 'worklog_count', 'hourlyrate_updated', 'hourlyrate_count', 'default_rate_updated', 'default_rate_count'
+    ).first()
+    return [*version, timezone.now().date()] if version else None
+
+
+def get_item_version(item_id):
+    """Version stamp of item sidebar, changes when the item, its comments, dependencies or worklogs change"""
+    return Item._base_manager.filter(id=item_id).annotate(
+        **related_stamps(Comment, 'item'),
+        **related_stamps(ItemDependency, 'item'),
+        **related_stamps(ItemDependency, 'blocked_by', prefix='blocking_'),
+        **related_stamps(WorkLog, 'item'),
+    ).values_list(
+        'updated_at', 'comment_updated', 'comment_count', 'itemdependency_updated', 'itemdependency_count',
+        'blocking_itemdependency_updated', 'blocking_itemdependency_count', 'worklog_updated', 'worklog_count'
+    ).first()
+
+
+class ConditionalLayoutMiddleware:
+    """
+    Answer reloads of the project overview tab and item sidebar with 304 Not Modified
+    when nothing changed since the client last fetched them.
+
+    The ETag is build from a version stamp that costs a single query and is per user,
+    rendered content depends on the user permissions and localization.
+    """
+
+    def __init__(self, get_response):
+        """Init"""
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Set ETag on rendered layouts"""
+        response = self.get_response(request)
+
+        etag = getattr(request, 'projects_etag', None)
+        if etag and response.status_code == 200 and response.content.startswith(b'{"status": "success"'):
+            response['ETag'] = etag
+            patch_cache_control(response, private=True, no_cache=True)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Give 304 response when client has current version"""
+        if request.method != 'GET' or not request.user.is_authenticated or not request.resolver_match:
+            return None
+
+        version = self.get_version(request, request.resolver_match.url_name, view_kwargs)
+        if not version:
+            return None
+
+        request.projects_etag = quote_etag(hashlib.md5(':'.join(str(value) for value in [
+            request.user.pk,
+            request.user.language,
+            request.user.timezone,
+            *version,
+        ]).encode()).hexdigest())
+
+        return get_conditional_response(request, etag=request.projects_etag)
+
+    def get_version(self, request, url_name, kwargs):
+        """Get version stamp of requested layout"""
+        if request.resolver_match.namespace != 'trionyx' or kwargs.get('app') != 'trionyx_projects':
+            return None
+
+        if url_name == 'model-tab' and kwargs.get('model') == 'project' and request.GET.get('tab') == 'general':
+            version = get_project_version(kwargs['pk'])
+            return [*version, app_settings.HOURLY_RATE] if version else None
+
+        if url_name == 'model-sidebar' and kwargs.get('model') == 'item' and not kwargs.get('code'):
+            version = get_item_version(kwargs['pk'])
+            timer = get_running_timer(request.user)
+            return [*version, timer['item_id'] if timer else None] if version else None
+
+        return None
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trionyx_projects', '0007_auto_20261019_1214'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['for_object_type', 'for_object_id'], name='trionyx_pro_for_obj_ed51b8_idx'),
+        ),
+    ]
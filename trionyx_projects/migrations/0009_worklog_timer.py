@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trionyx_projects', '0008_auto_20261019_1215'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='worklog',
+            name='timer',
+            field=models.BooleanField(blank=True, default=False),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:25
+
+from django.db import migrations, models
+
+from trionyx_projects.ranking import rank_keys
+
+
+def rank_items(apps, schema_editor):
+    """Rank existing items in the previous backlog order"""
+    Item = apps.get_model('trionyx_projects', 'Item')
+    project_ids = Item.objects.values_list('project_id', flat=True).distinct()
+    for project_id in project_ids:
+        items = list(Item.objects.filter(project_id=project_id).order_by('-priority', 'item_type', 'code').only('id'))
+        for item, rank in zip(items, rank_keys(len(items))):
+            item.rank = rank
+        Item.objects.bulk_update(items, ['rank'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trionyx_projects', '0009_worklog_timer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='rank',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.RunPython(rank_items, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['project', 'rank'], name='trionyx_pro_project_b6786b_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import Coalesce
+
+
+def set_earliest_finish(apps, schema_editor):
+    """Items have no dependencies yet, open items finish after their own estimate"""
+    Item = apps.get_model('trionyx_projects', 'Item')
+    Item.objects.filter(completed_on__isnull=True).update(earliest_finish=Coalesce(models.F('estimate'), 0.0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('trionyx_projects', '0010_item_rank'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='critical_predecessor',
+            field=models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='trionyx_projects.Item'),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='dependency_order',
+            field=models.IntegerField(blank=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='earliest_finish',
+            field=models.FloatField(blank=True, default=0.0),
+        ),
+        migrations.CreateModel(
+            name='ItemDependency',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated at')),
+                ('deleted', models.BooleanField(default=False, verbose_name='Deleted')),
+                ('verbose_name', models.TextField(blank=True, default='', verbose_name='Verbose name')),
+                ('blocked_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blocking', to='trionyx_projects.Item')),
+                ('created_by', models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Created by')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dependencies', to='trionyx_projects.Item')),
+            ],
+            options={
+                'unique_together': {('item', 'blocked_by')},
+            },
+        ),
+        migrations.RunPython(set_earliest_finish, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('trionyx_projects', '0011_item_dependency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetAlert',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated at')),
+                ('deleted', models.BooleanField(default=False, verbose_name='Deleted')),
+                ('verbose_name', models.TextField(blank=True, default='', verbose_name='Verbose name')),
+                ('key', models.CharField(max_length=128, unique=True)),
+                ('rule', models.CharField(choices=[('project_budget', 'Project budget hours'), ('item_estimate', 'Item estimate')], max_length=32)),
+                ('threshold', models.IntegerField()),
+                ('worked', models.FloatField()),
+                ('limit', models.FloatField()),
+                ('created_by', models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Created by')),
+                ('item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='budget_alerts', to='trionyx_projects.Item')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='budget_alerts', to='trionyx_projects.Project')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import Cast, Coalesce
+import trionyx.models
+
+
+def set_total_revenue(apps, schema_editor):
+    """Projects have no rate history yet, price billed hours at the current rate"""
+    # Variables are read from the cache that can not exist yet, read the variable row like AppSettings does
+    SystemVariable = apps.get_model('trionyx', 'SystemVariable')
+    variable = SystemVariable.objects.filter(code='PROJECTS_HOURLY_RATE').first()
+    hourly_rate = variable.value if variable else getattr(settings, 'PROJECTS_HOURLY_RATE', 60)
+    Project = apps.get_model('trionyx_projects', 'Project')
+    Project.objects.update(total_revenue=models.F('total_billed') * Coalesce(
+        Cast('project_hourly_rate', models.FloatField()),
+        models.Value(float(hourly_rate)),
+        output_field=models.FloatField(),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('trionyx', '0002_systemvariable'),
+        ('trionyx_projects', '0012_budget_alert'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='total_revenue',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.CreateModel(
+            name='HourlyRate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated at')),
+                ('deleted', models.BooleanField(default=False, verbose_name='Deleted')),
+                ('verbose_name', models.TextField(blank=True, default='', verbose_name='Verbose name')),
+                ('valid_from', models.DateField()),
+                ('rate', trionyx.models.PriceField(blank=True, decimal_places=4, help_text='Empty uses the default rates', max_digits=11, null=True)),
+                ('created_by', models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Created by')),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='hourly_rates', to='trionyx_projects.Project')),
+            ],
+            options={
+                'unique_together': {('project', 'valid_from')},
+            },
+        ),
+        migrations.RunPython(set_total_revenue, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trionyx_projects', '0013_hourly_rate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='worklog',
+            name='invoice_reference',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='worklog',
+            name='invoiced_on',
+            field=models.DateField(blank=True, default=None, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='worklog',
+            index=models.Index(condition=models.Q(invoiced_on__isnull=True), fields=['item', 'date'], name='projects_worklog_uninvoiced'),
+        ),
+    ]
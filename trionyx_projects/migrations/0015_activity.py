@@ -0,0 +1,38 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import jsonfield.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('trionyx_projects', '0014_worklog_invoiced'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Activity',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event', models.CharField(choices=[('item_created', 'Created item'), ('item_changed', 'Changed item'), ('item_deleted', 'Deleted item'), ('comment_added', 'Added comment'), ('comment_deleted', 'Deleted comment'), ('worklog_added', 'Logged hours'), ('worklog_changed', 'Changed worklog'), ('worklog_deleted', 'Deleted worklog')], max_length=32)),
+                ('changes', jsonfield.fields.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('item', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='trionyx_projects.Item')),
+                ('project', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='trionyx_projects.Project')),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['project', 'id'], name='projects_activity_project'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['item', 'id'], name='projects_activity_item'),
+        ),
+    ]
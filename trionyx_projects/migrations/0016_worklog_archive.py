@@ -0,0 +1,23 @@
+# Generated by Django 2.2.28 on 2026-10-19 13:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trionyx_projects', '0015_activity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkLogArchive',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0)),
+                ('data', models.BinaryField()),
+                ('worklog', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archive', to='trionyx_projects.WorkLog')),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.28 on 2026-10-19 13:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def partition_worklogs(apps, schema_editor):
+    """Partition worklogs by date when enabled on PostgreSQL"""
+    # Variables are read from the cache that can not exist yet, use the settings file
+    if not getattr(settings, 'PROJECTS_WORKLOG_PARTITIONING', False) or schema_editor.connection.vendor != 'postgresql':
+        return
+
+    from trionyx_projects.partitions import partition_table
+    partition_table(schema_editor.connection, getattr(settings, 'PROJECTS_WORKLOG_PARTITIONS_AHEAD', 3))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trionyx_projects', '0016_worklog_archive'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='worklogarchive',
+            name='worklog',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='archive', to='trionyx_projects.WorkLog'),
+        ),
+        migrations.RunPython(partition_worklogs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-19 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trionyx_projects', '0017_worklog_partitions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activity',
+            name='event',
+            field=models.CharField(choices=[('item_created', 'Created item'), ('item_changed', 'Changed item'), ('item_deleted', 'Deleted item'), ('item_moved', 'Moved item'), ('comment_added', 'Added comment'), ('comment_deleted', 'Deleted comment'), ('worklog_added', 'Logged hours'), ('worklog_changed', 'Changed worklog'), ('worklog_deleted', 'Deleted worklog')], max_length=32),
+        ),
+    ]
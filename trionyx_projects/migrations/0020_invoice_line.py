@@ -0,0 +1,45 @@
+# Generated by Django 2.2.28 on 2026-10-19 13:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import trionyx.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('trionyx_projects', '0019_subscriptions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceLine',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated at')),
+                ('deleted', models.BooleanField(default=False, verbose_name='Deleted')),
+                ('verbose_name', models.TextField(blank=True, default='', verbose_name='Verbose name')),
+                ('invoiced_on', models.DateField()),
+                ('reference', models.CharField(blank=True, default='', max_length=64)),
+                ('description', models.CharField(blank=True, default='', max_length=256)),
+                ('rate', trionyx.models.PriceField(decimal_places=4, default=0.0, max_digits=11)),
+                ('hours', models.FloatField(default=0.0)),
+                ('worklog_count', models.IntegerField(default=0)),
+                ('total', trionyx.models.PriceField(decimal_places=4, default=0.0, max_digits=11)),
+                ('created_by', models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Created by')),
+                ('item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='invoice_lines', to='trionyx_projects.Item')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invoice_lines', to='trionyx_projects.Project')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='worklog',
+            name='invoice_line',
+            field=models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='invoiced_worklogs', to='trionyx_projects.InvoiceLine'),
+        ),
+    ]
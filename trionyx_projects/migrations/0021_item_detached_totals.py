@@ -0,0 +1,23 @@
+# Generated by Django 2.2.28 on 2026-10-19 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trionyx_projects', '0020_invoice_line'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='detached_billed',
+            field=models.FloatField(blank=True, default=0.0),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='detached_worked',
+            field=models.FloatField(blank=True, default=0.0),
+        ),
+    ]
@@ -0,0 +1,305 @@
+"""
+trionyx_projects.model_forms
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: 2019 by Maikel Martens
+:license: GPLv3
+"""
+from functools import lru_cache
+
+from django.utils import timezone
+from django.apps import apps
+from trionyx import forms
+from trionyx.forms.helper import FormHelper
+from trionyx.forms.layout import Layout, Div, HTML, Depend, DateTimePicker
+from django.utils.translation import ugettext_lazy as _
+from django.utils.html import strip_tags
+from trionyx.utils import get_current_request
+
+from .models import Project, HourlyRate, Item, ItemDependency, Comment, WorkLog
+
+
+@lru_cache()
+def get_project_form_helper(accounts_installed):
+    """Project form helper, the layout is build once and shared by all form instances"""
+    helper = FormHelper()
+    helper.layout = Layout(
+        Div(
+            Div(
+                Div(
+                    Div(
+                        'name',
+                        css_class='col-md-8',
+                    ),
+                    Div(
+                        'code',
+                        css_class='col-md-2',
+                    ),
+                    Div(
+                        'status',
+                        css_class='col-md-2',
+                    ),
+                    css_class='row',
+                ),
+                Div(
+                    Div(
+                        'account' if accounts_installed else None,
+                        css_class='col-md-8',
+                    ),
+                    Div(
+                        DateTimePicker('deadline', format='%Y-%m-%d'),
+                        css_class='col-md-4',
+                    ),
+                    css_class='row',
+                ),
+                Div(
+                    Div(
+                        'project_type',
+                        css_class='col-md-8',
+                    ),
+                    Div(
+                        Depend(
+                            [('project_type', '10')],
+                            'fixed_price',
+                        ),
+                        Depend(
+                            [('project_type', '20')],
+                            'project_hourly_rate',
+                        ),
+                        css_class='col-md-4',
+                    ),
+                    css_class='row',
+                ),
+                css_class='col-md-6',
+            ),
+            Div(
+                'description',
+                css_class='col-md-6',
+            ),
+            css_class='row',
+        ),
+    )
+    return helper
+
+
+@forms.register(default_create=True, default_edit=True)
+class ProjectForm(forms.ModelForm):
+    description = forms.Wysiwyg(required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if apps.is_installed("trionyx_accounts"):
+            from trionyx_accounts.models import Account
+            self.fields['account'] = forms.ModelChoiceField(
+                label=_('Account'),
+                queryset=Account.objects.only('id', 'verbose_name'),
+                required=False,
+                initial=self.instance.for_object_id,
+            )
+
+        self.helper = get_project_form_helper(apps.is_installed('trionyx_accounts'))
+
+    class Meta:
+        model = Project
+        fields = ['name', 'code', 'status', 'deadline', 'description', 'project_type', 'fixed_price', 'project_hourly_rate']
+
+    def save(self, commit=True):
+        invoice = super().save(commit=False)
+
+        if self.cleaned_data.get('account'):
+            invoice.for_object = self.cleaned_data['account']
+
+        if commit:
+            invoice.save()
+
+        return invoice
+
+
+@forms.register(default_create=True, default_edit=True)
+class HourlyRateForm(forms.ModelForm):
+    valid_from = forms.DateField(initial=timezone.now)
+
+    class Meta:
+        model = HourlyRate
+        fields = ['project', 'valid_from', 'rate']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['project'].help_text = _('Rates without project are the default of all projects')
+
+
+@lru_cache()
+def get_item_form_helper(limited):
+    """Item form helper, limited users can not change the estimate"""
+    helper = FormHelper()
+    helper.layout = Layout(
+        'project',
+        Div(
+            Div(
+                'item_type',
+                css_class='col-md-6',
+            ),
+            Div(
+                'priority',
+                css_class='col-md-6',
+            ),
+            css_class='row',
+        ),
+        'name',
+        Div(
+            Div(
+                'estimate',
+                css_class='col-md-6',
+            ),
+            Div(
+                'non_billable',
+                css_class='col-md-6',
+            ),
+            css_class='row',
+        ) if not limited else Div(),
+        'description',
+    )
+    return helper
+
+
+@lru_cache()
+def get_type_choices():
+    """Item type choices with icon"""
+    return [(choice[0], '{} {}'.format(Item.get_type_icon(choice[0]), choice[1])) for choice in Item.TYPE_CHOICES]
+
+
+@lru_cache()
+def get_priority_choices():
+    """Item priority choices with icon"""
+    return [(choice[0], '{} {}'.format(Item.get_priority_icon(choice[0]), choice[1])) for choice in Item.PRIORITY_CHOICES]
+
+
+@forms.register(code='limited', create_permission='trionyx_projects.limit_add_item', edit_permission='trionyx_projects.limit_change_item')
+@forms.register(default_create=True, default_edit=True)
+class ItemForm(forms.ModelForm):
+    description = forms.Wysiwyg(required=False)
+
+    item_type = forms.ChoiceField(choices=get_type_choices, required=False)
+
+    priority = forms.ChoiceField(choices=get_priority_choices, required=False, initial=Item.PRIORITY_MEDIUM)
+
+    class Meta:
+        model = Item
+        fields = ['project', 'item_type', 'priority', 'name', 'description', 'estimate', 'non_billable']
+        widgets = {
+            'project': forms.HiddenInput(),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        request = get_current_request()
+        permission = 'change' if self.instance.id else 'add'
+        limited = not request.user.has_perm(f'trionyx_projects.{permission}_item') and request.user.has_perm(
+            f'trionyx_projects.limit_{permission}_item')
+
+        if limited:
+            self.fields['estimate'].disabled = True
+            self.fields['non_billable'].disabled = True
+
+        self.helper = get_item_form_helper(limited)
+
+
+@forms.register(default_create=True, default_edit=True)
+class CommentForm(forms.ModelForm):
+    comment = forms.Wysiwyg()
+
+    class Meta:
+        model = Comment
+        fields = ['item', 'comment']
+
+        widgets = {
+            'item': forms.HiddenInput(),
+        }
+
+    def clean_comment(self):
+        if not strip_tags(self.cleaned_data['comment']).replace('&nbsp;', ' ').strip():
+            raise forms.ValidationError('This field is required.')
+
+        return self.cleaned_data['comment']
+
+
+@forms.register(default_create=True, default_edit=True)
+class WorklogForm(forms.ModelForm):
+    description = forms.Wysiwyg(required=False)
+    date = forms.DateField(initial=timezone.now)
+
+    class Meta:
+        model = WorkLog
+        fields = ['item', 'date', 'worked', 'billed', 'description']
+
+        widgets = {
+            'item': forms.HiddenInput(),
+        }
+
+    def clean(self):
+        if self.instance.invoiced_on:
+            raise forms.ValidationError(_('Worklog is invoiced on {} and can not be changed').format(self.instance.invoiced_on))
+
+        return super().clean()
+
+
+@forms.register(default_create=True, default_edit=True)
+class ItemDependencyForm(forms.ModelForm):
+
+    class Meta:
+        model = ItemDependency
+        fields = ['item', 'blocked_by']
+
+        widgets = {
+            'item': forms.HiddenInput(),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.graph = None
+
+        item_id = self.data.get('item') or self.initial.get('item') or self.instance.item_id
+        item = Item.objects.filter(id=item_id).only('id', 'project_id').first()
+        self.fields['blocked_by'].queryset = Item.objects.filter(
+            project_id=item.project_id if item else None,
+        ).exclude(id=item_id).order_by('rank', 'id')
+
+    def clean(self):
+        from .dependencies import DependencyGraph
+
+        cleaned_data = super().clean()
+        item = cleaned_data.get('item')
+        blocked_by = cleaned_data.get('blocked_by')
+        if item and blocked_by:
+            self.graph = DependencyGraph.load(item.project_id, [item.id], blocker_id=blocked_by.id, stamped=True)
+            if self.graph.would_create_cycle(blocked_by.id, item.id):
+                raise forms.ValidationError(_('{} already depends on {}').format(blocked_by.code, item.code))
+
+        return cleaned_data
+
+    def save(self, commit=True):
+        """Save dependency with the graph loaded by clean"""
+        instance = super().save(commit=False)
+        if commit:
+            instance.save(graph=self.graph)
+        return instance
+
+
+class MoveItemsForm(forms.Form):
+    """Select items of a project and the project to move them to"""
+
+    items = forms.ModelMultipleChoiceField(queryset=Item.objects.none())
+    target = forms.ModelChoiceField(queryset=Project.objects.none(), label=_('Move to project'))
+
+    def __init__(self, project, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['items'].queryset = project.items.order_by('rank', 'id')
+        self.fields['target'].queryset = Project.objects.exclude(id=project.id).order_by('code')
+
+    def get_title(self):
+        return _('Move items')
+
+    def get_submit_label(self):
+        return _('Move')
@@ -1,14 +1,170 @@
 """App models"""
+import json
+import zlib
+from datetime import date
+
 from trionyx import models
 from trionyx.utils import CacheLock
+from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.utils import timezone
 from django.utils.translation import gettext as _
-from django.utils.html import strip_tags
 
 from .conf import settings as app_settings
+from .sanitize import sanitize_html
+from .events import publish_item, publish_worklog
+from .ranking import rank_between, rank_keys
+
+# HOURLY_RATE setting the hourly projects are priced with
+DEFAULT_RATE_CACHE_KEY = 'trionyx-projects-default-hourly-rate'
+
+
+class RenderedHtmlMixin:
+    """Sanitize Wysiwyg fields on save and store the safe html in `<field>_html` and plain text in `<field>_excerpt`"""
+
+    rendered_html_fields = []
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        fields = [field for field in self.rendered_html_fields if update_fields is None or field in update_fields]
+        self.render_html_fields(fields)
+
+        if update_fields is not None:
+            kwargs['update_fields'] = [
+                *update_fields,
+                *[f'{field}_html' for field in fields],
+                *[f'{field}_excerpt' for field in fields],
+            ]
+
+        return super().save(*args, **kwargs)
+
+    def render_html_fields(self, fields=None):
+        """Render given fields, default all rendered html fields. Used by save and the bulk write paths"""
+        for field in self.rendered_html_fields if fields is None else fields:
+            html, excerpt = sanitize_html(getattr(self, field))
+            setattr(self, f'{field}_html', html)
+            setattr(self, f'{field}_excerpt', excerpt)
+
+
+class ActivityMixin:
+    """Remember loaded values of `activity_fields`, changed values are written to the item activity"""
+
+    activity_fields = []
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        obj = super().from_db(db, field_names, values)
+        if all(field in field_names for field in cls.activity_fields):
+            obj.loaded_activity = obj.get_activity_values()
+        return obj
+
+    def get_activity_values(self):
+        return {field: getattr(self, field) for field in self.activity_fields}
+
+    def get_activity_changes(self):
+        """Get changed activity fields as {field: [old, new]} and remember the current values"""
+        loaded = getattr(self, 'loaded_activity', None)
+        self.loaded_activity = self.get_activity_values()
+        if loaded is None:
+            return {}
+        return {field: [loaded[field], value] for field, value in self.loaded_activity.items() if loaded[field] != value}
+
+
+class HourlyRateSetting(models.Expression):
+    """PROJECTS['HOURLY_RATE'] setting as query parameter, setting is read when the query is compiled"""
+
+    def __init__(self):
+        super().__init__(output_field=models.FloatField())
+
+    def as_sql(self, compiler, connection):
+        return '%s', [float(app_settings.HOURLY_RATE)]
 
-class Project(models.BaseModel):
+
+def current_rate_subquery(**filters):
+    """Rate of the last period that started today or before"""
+    return models.Subquery(
+        HourlyRate.objects.filter(valid_from__lte=timezone.now().date(), **filters).order_by('-valid_from').values('rate')[:1])
+
+
+class ProjectManager(models.BaseManager):
+    """Project manager, annotates the computed list view columns so sorting and filtering is done by the database"""
+
+    def get_queryset(self):
+        # Current rate of the project rate timeline, see rates.get_timelines
+        default_rate = Coalesce(
+            Cast(current_rate_subquery(project__isnull=True), models.FloatField()),
+            HourlyRateSetting(),
+            output_field=models.FloatField(),
+        )
+        hourly_rate = models.Case(
+            models.When(
+                has_rate_history=True,
+                then=Coalesce(
+                    Cast(current_rate_subquery(project=models.OuterRef('pk')), models.FloatField()),
+                    default_rate,
+                    output_field=models.FloatField(),
+                ),
+            ),
+            default=Coalesce(Cast('project_hourly_rate', models.FloatField()), default_rate, output_field=models.FloatField()),
+            output_field=models.FloatField(),
+        )
+        budget_hours = models.Case(
+            models.When(
+                project_type=Project.TYPE_FIXED,
+                then=Cast('fixed_price', models.FloatField()) / NullIf(hourly_rate, 0.0),
+            ),
+            default=None,
+            output_field=models.FloatField(),
+        )
+
+        return super().get_queryset().annotate(
+            has_rate_history=models.Exists(HourlyRate.objects.filter(project=models.OuterRef('pk'))),
+        ).annotate(
+            progress=models.ExpressionWrapper(
+                models.F('completed_items') * 100.0 / NullIf(models.F('open_items') + models.F('completed_items'), 0),
+                output_field=models.FloatField(),
+            ),
+            budget_hours=budget_hours,
+            budget_used=models.ExpressionWrapper(
+                models.F('total_billed') * 100.0 / NullIf(budget_hours, 0.0),
+                output_field=models.FloatField(),
+            ),
+            revenue=models.Case(
+                models.When(project_type=Project.TYPE_FIXED, then=Cast('fixed_price', models.FloatField())),
+                default=models.F('total_revenue'),
+                output_field=models.FloatField(),
+            ),
+        )
+
+    def for_object(self, obj):
+        """Projects connected to given object, uses the (for_object_type, for_object_id) index"""
+        return self.get_queryset().filter(
+            for_object_type=ContentType.objects.get_for_model(obj),
+            for_object_id=obj.pk,
+        )
+
+
+def prefetch_for_objects(projects):
+    """Fetch the for_object of given projects with one query per content type"""
+    projects = list(projects)
+    models.prefetch_related_objects(projects, 'for_object')
+    return projects
+
+
+def get_object_projects(obj, page=1, page_size=25):
+    """Get page of projects connected to given object, newest first"""
+    page = Paginator(Project.objects.for_object(obj).order_by('-id'), page_size).get_page(page)
+    page.object_list = prefetch_for_objects(page.object_list)
+    return page
+
+
+class Project(RenderedHtmlMixin, models.BaseModel):
     STATUS_DRAFT = 10
     STATUS_ACTIVE = 20
     STATUS_ON_HOLD = 30
@@ -47,6 +203,8 @@ class Project(models.BaseModel):
     status = models.IntegerField(choices=STATUS_CHOICES, default=STATUS_DRAFT)
     project_type = models.IntegerField(choices=TYPE_CHOICES, default=TYPE_FIXED)
     description = models.TextField(default='', null=True, blank=True)
+    description_html = models.TextField(default='', blank=True)
+    description_excerpt = models.CharField(max_length=256, default='', blank=True)
 
     deadline = models.DateField(default=None, null=True, blank=True)
     started_on = models.DateField(default=None, null=True, blank=True)
@@ -64,17 +222,195 @@ class Project(models.BaseModel):
     total_items_estimate = models.FloatField(default=0.0)
     total_worked = models.FloatField(default=0.0)
     total_billed = models.FloatField(default=0.0)
+    # Billed hours priced at the rate of their date
+    total_revenue = models.FloatField(default=0.0)
+
+    objects = ProjectManager()
+
+    rendered_html_fields = ['description']
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['for_object_type', 'for_object_id']),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        project = super().from_db(db, field_names, values)
+        # Remember rate so a change is recorded in the rate history
+        if 'project_hourly_rate' in field_names:
+            project.loaded_hourly_rate = project.project_hourly_rate
+        if 'project_type' in field_names:
+            project.loaded_project_type = project.project_type
+        return project
 
     @property
     def hourly_rate(self):
-        return float(self.project_hourly_rate if self.project_hourly_rate else app_settings.HOURLY_RATE)
+        """Current hourly rate of project"""
+        from .rates import get_timelines
+
+        if not hasattr(self, 'current_hourly_rate'):
+            self.current_hourly_rate = get_timelines([self])[self.id].rate_on(timezone.now().date())
+        return self.current_hourly_rate
 
     def save(self, *args, **kwargs):
         self.code = str(self.code).upper()
-        super().save(*args, **kwargs)
+        rate_changed = self.pk and getattr(self, 'loaded_hourly_rate', self.project_hourly_rate) != self.project_hourly_rate
+        # Default rate changes only reprice hourly projects
+        type_changed = self.pk and getattr(self, 'loaded_project_type', self.project_type) != self.project_type
 
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if rate_changed:
+                self.record_hourly_rate(self.loaded_hourly_rate)
+            if rate_changed or type_changed:
+                self.update_revenue()
+        self.loaded_hourly_rate = self.project_hourly_rate
+        self.loaded_project_type = self.project_type
+        self.__dict__.pop('current_hourly_rate', None)
 
-class Item(models.BaseModel):
+    def record_hourly_rate(self, previous_rate):
+        """Record changed project rate from today, the previous rate stays valid for the hours before. Caller reprices"""
+        today = timezone.now().date()
+        if previous_rate and not self.hourly_rates.exists():
+            HourlyRate(project=self, valid_from=date.min, rate=previous_rate).save(reprice=False)
+
+        HourlyRate.objects.filter(project=self, valid_from__gt=today).delete()
+        rate = HourlyRate.objects.filter(project=self, valid_from=today).first() or HourlyRate(project=self, valid_from=today)
+        rate.rate = self.project_hourly_rate
+        rate.save(reprice=False)
+
+    def update_revenue(self):
+        """Price billed hours at the rate of their date"""
+        update_revenues([self])
+
+    def save_stats(self, *fields):
+        """Save derived stat fields with a queryset update, this skips the auditlog and search index signals"""
+        Project.objects.filter(id=self.id).update(**{field: getattr(self, field) for field in fields})
+
+    def update_item_totals(self):
+        """Update open, completed and estimate totals from the items"""
+        result = self.items.aggregate(
+            open=models.Count('pk', filter=models.Q(completed_on__isnull=True)),
+            closed=models.Count('pk', filter=models.Q(completed_on__isnull=False)),
+            total_items_estimate=models.Sum('estimate', filter=models.Q(completed_on__isnull=True))
+        )
+
+        self.open_items = int(result['open'] or 0)
+        self.completed_items = int(result['closed'] or 0)
+        self.total_items_estimate = float(result['total_items_estimate'] or 0)
+        # Increment id is only written under the lock, a stale project must not overwrite it
+        self.save_stats('open_items', 'completed_items', 'total_items_estimate')
+
+    def add_item_totals(self, open_items, completed_items, estimate):
+        """Add item counts and open estimate to the totals with a single UPDATE"""
+        Project.objects.filter(id=self.id).update(
+            open_items=Coalesce(models.F('open_items'), 0) + open_items,
+            completed_items=Coalesce(models.F('completed_items'), 0) + completed_items,
+            total_items_estimate=Coalesce(models.F('total_items_estimate'), 0.0) + estimate,
+        )
+        self.open_items = int(self.open_items or 0) + open_items
+        self.completed_items = int(self.completed_items or 0) + completed_items
+        self.total_items_estimate = float(self.total_items_estimate or 0.0) + estimate
+
+    def update_worked_totals(self):
+        """Update worked and billed totals from the item totals"""
+        with transaction.atomic():
+            # Lock project so totals added by parallel worklogs are not overwritten with a stale sum
+            Project.objects.select_for_update().filter(id=self.id).values_list('id').first()
+            result = self.items.aggregate(
+                total_worked=models.Sum('total_worked'),
+                total_billed=models.Sum('total_billed'),
+            )
+            self.total_worked = float(result['total_worked'] or 0.0)
+            self.total_billed = float(result['total_billed'] or 0.0)
+            self.save_stats('total_worked', 'total_billed')
+
+    def add_worked_totals(self, worked, billed, revenue=0.0):
+        """Add worked and billed hours and their revenue to the totals with a single UPDATE, safe for parallel worklogs"""
+        Project.objects.filter(id=self.id).update(
+            total_worked=Coalesce(models.F('total_worked'), 0.0) + worked,
+            total_billed=Coalesce(models.F('total_billed'), 0.0) + billed,
+            total_revenue=Coalesce(models.F('total_revenue'), 0.0) + revenue,
+        )
+        self.total_worked = float(self.total_worked or 0.0) + worked
+        self.total_billed = float(self.total_billed or 0.0) + billed
+        self.total_revenue = float(self.total_revenue or 0.0) + revenue
+
+
+class HourlyRate(models.BaseModel):
+    """Hourly rate that is valid from date until the next rate, rates without project are the default"""
+
+    project = models.ForeignKey(Project, related_name='hourly_rates', on_delete=models.CASCADE, null=True, blank=True)
+    valid_from = models.DateField()
+    rate = models.PriceField(null=True, blank=True, help_text='Empty uses the default rates')
+
+    class Meta:
+        unique_together = ('project', 'valid_from')
+
+    def save(self, *args, reprice=True, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if reprice:
+                self.update_revenues()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            self.update_revenues()
+        return result
+
+    def update_revenues(self):
+        """Reprice projects that use this rate"""
+        projects = Project._base_manager.only('id', 'project_hourly_rate')
+        if self.project_id:
+            update_revenues(projects.filter(id=self.project_id))
+        else:
+            update_revenues(projects.filter(project_type=Project.TYPE_HOURLY_BASED))
+
+    def generate_verbose_name(self):
+        return f"{self.rate or 'Default'} from {self.valid_from}"
+
+
+def update_revenues(projects, batch_size=500, default_rate=None):
+    """Price billed hours of given projects, in batches of two queries and an update"""
+    from .rates import get_revenues
+
+    projects = list(projects)
+    for start in range(0, len(projects), batch_size):
+        batch = projects[start:start + batch_size]
+        revenues = get_revenues(batch, default_rate)
+        for project in batch:
+            project.total_revenue = revenues[project.id]
+        Project.objects.bulk_update(batch, ['total_revenue'])
+    return len(projects)
+
+
+def update_default_revenues(rate=None):
+    """Reprice hourly projects when the HOURLY_RATE setting changed since they were priced, gives back the repriced count"""
+    rate = float(app_settings.HOURLY_RATE if rate is None else rate)
+    if cache.get(DEFAULT_RATE_CACHE_KEY) == rate:
+        return 0
+
+    count = update_revenues(
+        Project._base_manager.filter(project_type=Project.TYPE_HOURLY_BASED).only('id', 'project_hourly_rate'), default_rate=rate)
+    cache.set(DEFAULT_RATE_CACHE_KEY, rate, None)
+    return count
+
+
+def add_revenues(changes):
+    """Add revenue of billed hour changes to the project totals, changes are (project_id, date, billed)"""
+    from .rates import get_revenue_deltas
+
+    changes = list(changes)
+    if not changes:
+        return
+    projects = Project._base_manager.filter(id__in={project_id for project_id, _, _ in changes}).only('id', 'project_hourly_rate')
+    for project_id, revenue in get_revenue_deltas(projects, changes).items():
+        Project.objects.filter(id=project_id).update(total_revenue=Coalesce(models.F('total_revenue'), 0.0) + revenue)
+
+
+class Item(ActivityMixin, RenderedHtmlMixin, models.BaseModel):
     TYPE_FEATURE = 10
     TYPE_ENHANCEMENT = 20
     TYPE_TASK = 30
@@ -110,43 +446,119 @@ class Item(models.BaseModel):
     code = models.CharField(max_length=32)
     name = models.CharField(max_length=256)
     description = models.TextField(default='', null=True, blank=True)
+    description_html = models.TextField(default='', blank=True)
+    description_excerpt = models.CharField(max_length=256, default='', blank=True)
     completed_on = models.DateField(default=None, null=True, blank=True)
 
     estimate = models.FloatField(null=True, blank=True)
     non_billable = models.BooleanField(default=False, blank=True)
 
+    # Backlog position, fractional key so a move only updates the moved item
+    rank = models.CharField(max_length=255, default='', blank=True)
+
+    # Dependency schedule, kept up to date by the dependency graph
+    dependency_order = models.IntegerField(default=0, blank=True)
+    earliest_finish = models.FloatField(default=0.0, blank=True)
+    critical_predecessor = models.ForeignKey(
+        'self', related_name='+', on_delete=models.SET_NULL, null=True, blank=True, default=None)
+
     # Item stats
     total_worked = models.FloatField(default=0.0, blank=True)
     total_billed = models.FloatField(default=0.0, blank=True)
 
+    # Hours of worklogs in detached partitions, added to the sums of the worklogs that are left
+    detached_worked = models.FloatField(default=0.0, blank=True)
+    detached_billed = models.FloatField(default=0.0, blank=True)
+
+    rendered_html_fields = ['description']
+    activity_fields = ['item_type', 'priority', 'name', 'estimate', 'completed_on', 'non_billable']
+
     class Meta:
         permissions = (
             ("limit_add_item", "Limit add"),
             ("limit_change_item", "Limit change"),
         )
+        indexes = [
+            models.Index(fields=['project', 'rank']),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        item = super().from_db(db, field_names, values)
+        # Remember schedule values so saves that do not change them skip the dependency graph
+        if 'estimate' in field_names and 'completed_on' in field_names:
+            item.loaded_schedule = (item.estimate, item.completed_on)
+        return item
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
+        if not self.rank:
+            # New items are added to the end of the backlog
+            self.rank = rank_between(
+                Item.objects.filter(project_id=self.project_id).order_by('-rank').values_list('rank', flat=True).first(),
+                None,
+            )
 
-        result = self.project.items.aggregate(
-            open=models.Count('pk', filter=models.Q(completed_on__isnull=True)),
-            closed=models.Count('pk', filter=models.Q(completed_on__isnull=False)),
-            total_items_estimate=models.Sum('estimate', filter=models.Q(completed_on__isnull=True))
-        )
+        update_fields = kwargs.get('update_fields')
+        schedule_changed = (update_fields is None or 'estimate' in update_fields or 'completed_on' in update_fields) and (
+            getattr(self, 'loaded_schedule', None) != (self.estimate, self.completed_on))
+        # Open, completed and estimate totals of the project only change with the schedule values or a new item
+        old_totals = None if self.pk else (0, 0, 0.0)
+        if schedule_changed and getattr(self, 'loaded_schedule', None):
+            old_totals = self.get_item_totals(*self.loaded_schedule)
+        totals_changed = schedule_changed or not self.pk
+        if not self.pk:
+            # New items have no dependencies yet
+            self.earliest_finish = 0.0 if self.completed_on else float(self.estimate or 0.0)
+            schedule_changed = False
 
-        self.project.open_items = int(result['open'] or 0)
-        self.project.completed_items = int(result['closed'] or 0)
-        self.project.total_items_estimate = float(result['total_items_estimate'] or 0)
+        super().save(*args, **kwargs)
 
+        if schedule_changed:
+            from .dependencies import update_item_schedule
+            update_item_schedule(self)
+        self.loaded_schedule = (self.estimate, self.completed_on)
 
         if not self.code:
             with CacheLock('set-item-code', self.project_id):
                 self.project.refresh_from_db() # get latest value
                 self.project.item_increment_id += 1
+                self.project.save_stats('item_increment_id')
                 self.code = f"{self.project.code}-{self.project.item_increment_id}"
                 self.save(update_fields=['code'])
 
-        self.project.save(update_fields=['item_increment_id', 'open_items', 'completed_items', 'total_items_estimate'])
+        if totals_changed and old_totals:
+            new_totals = self.get_item_totals(self.estimate, self.completed_on)
+            self.project.add_item_totals(*(new - old for new, old in zip(new_totals, old_totals)))
+        elif totals_changed:
+            # Schedule values the item was loaded with are unknown
+            self.project.update_item_totals()
+
+    @staticmethod
+    def get_item_totals(estimate, completed_on):
+        """Open items, completed items and open estimate an item adds to the project totals"""
+        if completed_on:
+            return 0, 1, 0.0
+        return 1, 0, float(estimate or 0.0)
+
+    def move(self, after=None, before=None):
+        """Move item in backlog between given items, only the rank of this item is updated"""
+        from .tasks import rebalance_item_ranks
+
+        if after and before and not after.rank < before.rank:
+            # Neighbours have equal keys, spread keys of the backlog first
+            rebalance_ranks(self.project_id)
+            after.refresh_from_db(fields=['rank'])
+            before.refresh_from_db(fields=['rank'])
+
+        self.rank = rank_between(after.rank if after else None, before.rank if before else None)
+        # updated_at is part of the version stamp of the project overview
+        self.updated_at = timezone.now()
+        Item.objects.filter(id=self.id).update(rank=self.rank, updated_at=self.updated_at)
+        publish_item(self)
+
+        if len(self.rank) > app_settings.RANK_REBALANCE_LENGTH:
+            project_id = self.project_id
+            transaction.on_commit(lambda: rebalance_item_ranks.delay(project_id))
 
     @classmethod
     def get_type_icon(cls, item_type):
@@ -185,18 +597,164 @@ class Item(models.BaseModel):
         return f"<i class='{class_mapping[priority]} {icon}'></i>"
 
 
-class Comment(models.BaseModel):
+class Comment(RenderedHtmlMixin, models.BaseModel):
     item = models.ForeignKey(Item, related_name='comments', on_delete=models.CASCADE)
     comment = models.TextField(default='')
+    comment_html = models.TextField(default='', blank=True)
+    comment_excerpt = models.CharField(max_length=256, default='', blank=True)
+
+    rendered_html_fields = ['comment']
 
     def generate_verbose_name(self):
-        comment = strip_tags(self.comment)
+        comment = self.comment_excerpt
         if len(comment) > 20:
             return f"{comment:.20}..."
         return comment
 
 
-class WorkLog(models.BaseModel):
+class ItemDependency(models.BaseModel):
+    """Item is blocked by another item of the same project"""
+
+    item = models.ForeignKey(Item, related_name='dependencies', on_delete=models.CASCADE)
+    blocked_by = models.ForeignKey(Item, related_name='blocking', on_delete=models.CASCADE)
+
+    class Meta:
+        unique_together = ('item', 'blocked_by')
+
+    def save(self, *args, graph=None, **kwargs):
+        """
+        Save dependency and update the schedule of the project, raises DependencyCycleError
+
+        The graph loaded to validate the form is reused when the project did not change since.
+        """
+        from .dependencies import DependencyGraph, lock_project
+
+        with transaction.atomic():
+            lock_project(self.item.project_id)
+            if graph is None or not graph.is_current():
+                graph = DependencyGraph.load(self.item.project_id, [self.item_id], blocker_id=self.blocked_by_id)
+            graph.add_edge(self.blocked_by_id, self.item_id)
+            super().save(*args, **kwargs)
+            graph.save()
+
+    def delete(self, *args, **kwargs):
+        """Delete dependency and update the schedule of the project"""
+        from .dependencies import DependencyGraph, lock_project
+
+        with transaction.atomic():
+            lock_project(self.item.project_id)
+            graph = DependencyGraph.load(self.item.project_id, [self.item_id])
+            graph.remove_edge(self.blocked_by_id, self.item_id)
+            result = super().delete(*args, **kwargs)
+            graph.save()
+        return result
+
+    def generate_verbose_name(self):
+        return f"{self.item.code} blocked by {self.blocked_by.code}"
+
+
+def rebalance_ranks(project_id):
+    """Give the backlog items of project evenly spread short rank keys, keeping their order"""
+    with transaction.atomic():
+        items = list(
+            Item._base_manager.select_for_update().filter(project_id=project_id).order_by('rank', 'id').only('id', 'rank', 'updated_at')
+        )
+        now = timezone.now()
+        for item, rank in zip(items, rank_keys(len(items))):
+            item.rank = rank
+            item.updated_at = now
+        Item._base_manager.bulk_update(items, ['rank', 'updated_at'], batch_size=500)
+    return len(items)
+
+
+class WorkLogInvoicedError(ValueError):
+    """Raised when an invoiced worklog is changed or deleted"""
+
+
+class WorkLogManager(models.BaseManager):
+    """WorkLog manager with the batched write path"""
+
+    def bulk_log(self, worklogs):
+        """
+        Save worklogs in batch, new worklogs are inserted and existing worklogs updated with one query per batch.
+
+        Billed hours are allocated the same as WorkLog.save and the item and project totals are updated once.
+        The created_by of new worklogs is not set from the current request and must be set by the caller.
+        """
+        worklogs = list(worklogs)
+        if not worklogs:
+            return worklogs
+
+        with transaction.atomic():
+            # Lock items so parallel worklogs allocate billed hours one after the other
+            items = Item.objects.select_for_update().in_bulk({worklog.item_id for worklog in worklogs})
+            total_billed = {item.id: float(item.total_billed or 0.0) for item in items.values()}
+            revenue_changes = []
+            for old in self.filter(id__in=[worklog.id for worklog in worklogs if worklog.id]).only(
+                    'item_id', 'date', 'billed', 'invoiced_on'):
+                if old.invoiced_on:
+                    raise WorkLogInvoicedError(f'Worklog {old.id} is invoiced on {old.invoiced_on} and can not be changed')
+                total_billed[old.item_id] -= float(old.billed or 0.0)
+                revenue_changes.append((items[old.item_id].project_id, old.date, -float(old.billed or 0.0)))
+
+            now = timezone.now()
+            for worklog in worklogs:
+                worklog.item = items[worklog.item_id]
+                worklog.allocate_billed(total_billed[worklog.item_id])
+                total_billed[worklog.item_id] += float(worklog.billed)
+                revenue_changes.append((worklog.item.project_id, worklog.date, float(worklog.billed)))
+
+                if not worklog.description:
+                    worklog.description = f'Working on item {worklog.item.code}'
+                worklog.render_html_fields()
+                worklog.verbose_name = worklog.generate_verbose_name()
+                worklog.updated_at = now
+
+            created = [not worklog.id for worklog in worklogs]
+            self.bulk_create([worklog for worklog in worklogs if not worklog.id], batch_size=500)
+            self.bulk_update(
+                [worklog for worklog in worklogs if worklog.id],
+                ['date', 'worked', 'billed', 'description', 'description_html', 'description_excerpt', 'verbose_name', 'updated_at'],
+                batch_size=500,
+            )
+            self.refresh_totals(items.keys())
+            add_revenues(revenue_changes)
+
+            # Bulk writes send no signals, ids of created worklogs are not known on every database
+            from .activity import record_worklog
+            for worklog, is_created in zip(worklogs, created):
+                publish_worklog(worklog, worklog.item.project_id)
+                record_worklog(worklog, worklog.item.project_id, is_created)
+
+        return worklogs
+
+    def refresh_totals(self, item_ids):
+        """Recalculate worked and billed totals of given items and their projects, revenue is added by the caller"""
+        totals = {
+            row['item']: row for row in self.filter(item_id__in=item_ids).values('item').annotate(
+                total_worked=models.Sum('worked'),
+                total_billed=models.Sum('billed'),
+            )
+        }
+
+        from .alerts import check_item_worked, check_project_worked
+
+        items = list(Item.objects.filter(id__in=item_ids))
+        for item in items:
+            worked = float(item.total_worked or 0.0)
+            item.total_worked = float(totals.get(item.id, {}).get('total_worked') or 0.0) + float(item.detached_worked or 0.0)
+            item.total_billed = float(totals.get(item.id, {}).get('total_billed') or 0.0) + float(item.detached_billed or 0.0)
+            check_item_worked(item, worked, item.total_worked)
+        Item.objects.bulk_update(items, ['total_worked', 'total_billed'])
+
+        for project in Project.objects.filter(id__in={item.project_id for item in items}):
+            worked = float(project.total_worked or 0.0)
+            project.update_worked_totals()
+            if project.project_type == Project.TYPE_FIXED:
+                check_project_worked(project.id, worked, project.total_worked, project.budget_hours)
+
+
+class WorkLog(ActivityMixin, RenderedHtmlMixin, models.BaseModel):
     item = models.ForeignKey(Item, related_name='worklogs', on_delete=models.CASCADE)
 
     date = models.DateField()
@@ -206,18 +764,110 @@ class WorkLog(models.BaseModel):
         help_text='On empty this wil be auto filled based on estimate and remaining billed hours, when there is no estimate billed will always be same as worked')
 
     description = models.TextField(default='', null=True, blank=True)
+    description_html = models.TextField(default='', blank=True)
+    description_excerpt = models.CharField(max_length=256, default='', blank=True)
+
+    # Worklog is written by a timer, timer intervals of the same user, item and day are merged into it
+    timer = models.BooleanField(default=False, blank=True)
+
+    # Set when the billed hours are on an invoice, the invoice line keeps the invoiced revenue
+    invoiced_on = models.DateField(default=None, null=True, blank=True)
+    invoice_reference = models.CharField(max_length=64, default='', blank=True)
+    invoice_line = models.ForeignKey(
+        'InvoiceLine', related_name='invoiced_worklogs', on_delete=models.SET_NULL, default=None, null=True, blank=True)
+
+    objects = WorkLogManager()
+
+    rendered_html_fields = ['description']
+    activity_fields = ['date', 'worked', 'billed']
+
+    class Meta:
+        indexes = [
+            # Only uninvoiced worklogs are looked up, invoiced rows are kept out of the index
+            models.Index(
+                fields=['item', 'date'], name='projects_worklog_uninvoiced', condition=models.Q(invoiced_on__isnull=True)),
+        ]
 
     def save(self, *args, **kwargs):
-        result = self.item.worklogs.exclude(id=self.id).aggregate(
-            total_worked=models.Sum('worked'),
-            total_billed=models.Sum('billed'),
-        )
-        self.item.total_worked = (float(result['total_worked']) if result['total_worked'] else 0.0) + float(self.worked)
-        total_billed = float(result['total_billed']) if result['total_billed'] else 0.0
+        from .rates import get_timelines
+
+        with transaction.atomic():
+            # Lock item so parallel worklogs allocate billed hours one after the other
+            item = Item.objects.select_for_update().get(id=self.item_id)
+            self.item.estimate = item.estimate
+            self.item.non_billable = item.non_billable
+
+            result = item.worklogs.exclude(id=self.id).aggregate(
+                total_worked=models.Sum('worked'),
+                total_billed=models.Sum('billed'),
+            )
+            old = WorkLog.objects.filter(id=self.id).values_list('date', 'billed', 'invoiced_on').first() if self.id else None
+            if old and old[2]:
+                raise WorkLogInvoicedError(f'Worklog is invoiced on {old[2]} and can not be changed')
+            total_worked = float(result['total_worked'] or 0.0) + float(item.detached_worked or 0.0) + float(self.worked)
+            total_billed = float(result['total_billed'] or 0.0) + float(item.detached_billed or 0.0)
 
+            self.allocate_billed(total_billed)
+            total_billed += float(self.billed)
+
+            if not self.description:
+                self.description = f'Working on item {self.item.code}'
+
+            # Only the billed hours of this worklog are priced, the rest of the history keeps its revenue
+            timeline = get_timelines([self.item.project])[self.item.project_id]
+            revenue_delta = float(self.billed) * timeline.rate_on(self.date)
+            if old:
+                revenue_delta -= float(old[1] or 0.0) * timeline.rate_on(old[0])
+
+            worked_delta = total_worked - float(item.total_worked or 0.0)
+            self.item.project.add_worked_totals(worked_delta, total_billed - float(item.total_billed or 0.0), revenue_delta)
+            self.item.total_worked = total_worked
+            self.item.total_billed = total_billed
+            self.item.save(update_fields=['total_billed', 'total_worked'])
+
+            super().save(*args, **kwargs)
+            self.check_alerts(float(item.total_worked or 0.0), worked_delta)
+
+    def delete(self, *args, **kwargs):
+        """Delete worklog and take its hours off the totals, invoiced worklogs can not be deleted"""
+        from .rates import get_timelines
+
+        with transaction.atomic():
+            item = Item.objects.select_for_update().get(id=self.item_id)
+            old = WorkLog.objects.filter(id=self.id).values_list('date', 'worked', 'billed', 'invoiced_on').first()
+            if old and old[3]:
+                raise WorkLogInvoicedError(f'Worklog is invoiced on {old[3]} and can not be deleted')
+
+            result = super().delete(*args, **kwargs)
+            if old:
+                worked, billed = float(old[1] or 0.0), float(old[2] or 0.0)
+                revenue = billed * get_timelines([self.item.project])[self.item.project_id].rate_on(old[0])
+                self.item.project.add_worked_totals(-worked, -billed, -revenue)
+                self.item.total_worked = float(item.total_worked or 0.0) - worked
+                self.item.total_billed = float(item.total_billed or 0.0) - billed
+                self.item.save(update_fields=['total_billed', 'total_worked'])
+                # Alerts of thresholds the worked hours drop under are removed
+                self.check_alerts(float(item.total_worked or 0.0), -worked)
+        return result
+
+    def check_alerts(self, old_item_worked, worked_delta):
+        """Check budget alerts with the worked hours delta of this write"""
+        from .alerts import check_item_worked, check_project_worked
+
+        if not worked_delta:
+            return
+
+        check_item_worked(self.item, old_item_worked, old_item_worked + worked_delta)
+        if self.item.project.project_type == Project.TYPE_FIXED:
+            # Row is locked by the totals update, read back the total including parallel writes
+            total_worked, budget_hours = Project.objects.filter(id=self.item.project_id).values_list(
+                'total_worked', 'budget_hours').get()
+            check_project_worked(self.item.project_id, total_worked - worked_delta, total_worked, budget_hours)
+
+    def allocate_billed(self, total_billed):
+        """Fill empty billed hours based on the item estimate and the hours already billed on the item"""
         if self.item.non_billable:
             self.billed = 0
-            self.item.total_billed = 0
         elif not self.billed and not self.item.estimate:
             self.billed = self.worked
         elif not self.billed:
@@ -227,26 +877,182 @@ class WorkLog(models.BaseModel):
             else:
                 self.billed = 0
 
-        self.item.total_billed = total_billed + float(self.billed)
+    def generate_verbose_name(self):
+        description = self.description_excerpt
+        if len(description) > 20:
+            return f"{description:.20}..."
+        return description
+
 
-        if not self.description:
-            self.description = f'Working on item {self.item.code}'
+class WorkLogArchive(models.Model):
+    """Zlib compressed JSON list of the original worklogs that are compacted into a worklog"""
 
-        self.item.save(update_fields=['total_billed', 'total_worked'])
+    # Partitioned worklogs have a primary key on (id, date), there is no unique id to reference
+    worklog = models.OneToOneField(WorkLog, related_name='archive', on_delete=models.CASCADE, db_constraint=False)
+    count = models.IntegerField(default=0)
+    data = models.BinaryField()
 
-        # Update project totals
-        result = self.item.project.items.aggregate(
-            total_worked=models.Sum('total_worked'),
-            total_billed=models.Sum('total_billed'),
-        )
-        self.item.project.total_worked = float(result['total_worked'] or 0.0)
-        self.item.project.total_billed = float(result['total_billed'] or 0.0)
-        self.item.project.save(update_fields=['total_worked', 'total_billed'])
+    def get_worklogs(self):
+        return json.loads(zlib.decompress(self.data))
+
+    def set_worklogs(self, worklogs):
+        self.count = len(worklogs)
+        self.data = zlib.compress(json.dumps(worklogs, cls=DjangoJSONEncoder).encode(), 9)
 
-        super().save(*args, **kwargs)
+
+class InvoiceLine(models.BaseModel):
+    """Billed hours of an item at one rate on an invoice, the total is the revenue of the invoiced worklogs"""
+
+    project = models.ForeignKey(Project, related_name='invoice_lines', on_delete=models.CASCADE)
+    item = models.ForeignKey(Item, related_name='invoice_lines', on_delete=models.SET_NULL, null=True, blank=True)
+    invoiced_on = models.DateField()
+    reference = models.CharField(max_length=64, default='', blank=True)
+    description = models.CharField(max_length=256, default='', blank=True)
+    rate = models.PriceField(default=0.0)
+    hours = models.FloatField(default=0.0)
+    worklog_count = models.IntegerField(default=0)
+    total = models.PriceField(default=0.0)
 
     def generate_verbose_name(self):
-        description = strip_tags(self.description)
-        if len(description) > 20:
-            return f"{description:.20}..."
-        return description
+        return f"{self.reference or self.invoiced_on} {self.description}"
+
+
+class BudgetAlert(models.BaseModel):
+    """Raised budget alert, the unique key makes sure a threshold is only alerted once"""
+
+    RULE_PROJECT_BUDGET = 'project_budget'
+    RULE_ITEM_ESTIMATE = 'item_estimate'
+
+    RULE_CHOICES = (
+        (RULE_PROJECT_BUDGET, _('Project budget hours')),
+        (RULE_ITEM_ESTIMATE, _('Item estimate')),
+    )
+
+    key = models.CharField(max_length=128, unique=True)
+    rule = models.CharField(max_length=32, choices=RULE_CHOICES)
+    project = models.ForeignKey(Project, related_name='budget_alerts', on_delete=models.CASCADE)
+    item = models.ForeignKey(Item, related_name='budget_alerts', on_delete=models.CASCADE, null=True, blank=True)
+    threshold = models.IntegerField()
+    worked = models.FloatField()
+    limit = models.FloatField()
+
+    @staticmethod
+    def get_key(rule, project_id, item_id, threshold):
+        return f'{rule}-{project_id}-{item_id or 0}-{threshold}'
+
+    @property
+    def message(self):
+        if self.rule == self.RULE_ITEM_ESTIMATE:
+            return _('{code}: worked {worked}h passed {threshold}% of estimate {limit}h').format(
+                code=self.item.code, worked=round(self.worked, 2), threshold=self.threshold, limit=round(self.limit, 2))
+        return _('{code}: worked {worked}h passed {threshold}% of budget {limit}h').format(
+            code=self.project.code, worked=round(self.worked, 2), threshold=self.threshold, limit=round(self.limit, 2))
+
+    def generate_verbose_name(self):
+        return self.key
+
+
+class Activity(models.Model):
+    """
+    Append-only activity of the items of a project, written in batches after commit.
+
+    Relations have no database constraints and no cascades, activity of deleted items is kept.
+    Feeds are read newest first on the (project, id) and (item, id) indexes.
+    """
+
+    EVENT_ITEM_CREATED = 'item_created'
+    EVENT_ITEM_CHANGED = 'item_changed'
+    EVENT_ITEM_DELETED = 'item_deleted'
+    EVENT_ITEM_MOVED = 'item_moved'
+    EVENT_COMMENT_ADDED = 'comment_added'
+    EVENT_COMMENT_DELETED = 'comment_deleted'
+    EVENT_WORKLOG_ADDED = 'worklog_added'
+    EVENT_WORKLOG_CHANGED = 'worklog_changed'
+    EVENT_WORKLOG_DELETED = 'worklog_deleted'
+
+    EVENT_CHOICES = (
+        (EVENT_ITEM_CREATED, _('Created item')),
+        (EVENT_ITEM_CHANGED, _('Changed item')),
+        (EVENT_ITEM_DELETED, _('Deleted item')),
+        (EVENT_ITEM_MOVED, _('Moved item')),
+        (EVENT_COMMENT_ADDED, _('Added comment')),
+        (EVENT_COMMENT_DELETED, _('Deleted comment')),
+        (EVENT_WORKLOG_ADDED, _('Logged hours')),
+        (EVENT_WORKLOG_CHANGED, _('Changed worklog')),
+        (EVENT_WORKLOG_DELETED, _('Deleted worklog')),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    project = models.ForeignKey(Project, related_name='+', on_delete=models.DO_NOTHING, db_constraint=False, db_index=False)
+    item = models.ForeignKey(
+        Item, related_name='+', on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, null=True, blank=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name='+', on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+        null=True, blank=True)
+    event = models.CharField(max_length=32, choices=EVENT_CHOICES)
+    changes = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'id'], name='projects_activity_project'),
+            models.Index(fields=['item', 'id'], name='projects_activity_item'),
+        ]
+
+    def __str__(self):
+        return self.get_event_display()
+
+    @property
+    def message(self):
+        model = WorkLog if self.event.startswith('worklog') else Item
+        changes = []
+        for field, value in self.changes.items():
+            if isinstance(value, list):
+                old, new = [self.display_value(model, field, part) for part in value]
+                changes.append(f'{field.replace("_", " ")} {old} → {new}')
+            else:
+                changes.append(f'{field.replace("_", " ")} {self.display_value(model, field, value)}')
+        return '{}: {}'.format(self.get_event_display(), ', '.join(changes)) if changes else self.get_event_display()
+
+    @staticmethod
+    def display_value(model, field, value):
+        try:
+            choices = dict(model._meta.get_field(field).choices or [])
+        except models.FieldDoesNotExist:
+            choices = {}
+        return choices.get(value, '-' if value is None else value)
+
+
+class Subscription(models.BaseModel):
+    """User follows the activity of a project or a single item"""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.CASCADE)
+    project = models.ForeignKey(Project, related_name='subscriptions', on_delete=models.CASCADE, null=True, blank=True)
+    item = models.ForeignKey(Item, related_name='subscriptions', on_delete=models.CASCADE, null=True, blank=True)
+
+    class Meta:
+        unique_together = [
+            ('project', 'user'),
+            ('item', 'user'),
+        ]
+
+    def generate_verbose_name(self):
+        return f'{self.user} - {self.item or self.project}'
+
+
+class Notification(models.Model):
+    """Activity queued for the next digest of a subscribed user, removed when the digest is sent"""
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.CASCADE)
+    project = models.ForeignKey(Project, related_name='+', on_delete=models.CASCADE, db_index=False)
+    item = models.ForeignKey(Item, related_name='+', on_delete=models.CASCADE, null=True, blank=True, db_index=False)
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name='+', on_delete=models.SET_NULL, null=True, blank=True, db_index=False)
+    event = models.CharField(max_length=32, choices=Activity.EVENT_CHOICES)
+    changes = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    @property
+    def message(self):
+        return Activity(event=self.event, changes=self.changes).message
@@ -0,0 +1,120 @@
+"""
+Move items to another project
+
+A block of codes is reserved in the target project first, then the items are re-parented, re-coded and
+appended to the target backlog with bulk updates. Comments and worklogs stay on their items. Dependencies
+with items that stay behind are removed, schedules and stats of all projects are recalculated once.
+Item alerts move with the items, budget alerts of fixed price projects are checked with the new totals.
+Items with invoiced worklogs are not moved, their revenue is on an invoice line of the source project.
+"""
+from django.db import transaction
+from django.db.models import Q, Sum
+from trionyx.utils import CacheLock
+
+from .activity import record
+from .alerts import check_project_worked
+from .capacity import invalidate_projects
+from .conf import settings as app_settings
+from .dependencies import DependencyGraph, lock_project
+from .events import RELOAD_EVENT, publish
+from .models import Project, Item, ItemDependency, WorkLog, BudgetAlert, Activity, add_revenues
+from .ranking import rank_between, rank_keys
+
+
+class MoveError(ValueError):
+    """Raised when items can not be moved"""
+
+
+def get_invoiced_items(item_ids):
+    """Codes of the items with invoiced worklogs"""
+    return list(Item.objects.filter(id__in=item_ids, worklogs__invoiced_on__isnull=False).values_list(
+        'code', flat=True).order_by('code').distinct())
+
+
+def reserve_codes(project, count):
+    """Reserve count item codes of project, gives back the first increment id"""
+    with CacheLock('set-item-code', project.id):
+        project.refresh_from_db(fields=['item_increment_id'])
+        first = project.item_increment_id + 1
+        project.item_increment_id += count
+        project.save_stats('item_increment_id')
+    return first
+
+
+def move_items(items, target):
+    """Move items to target project, gives back the number of moved items, raises MoveError for invoiced items"""
+    item_ids = [item.id if isinstance(item, Item) else item for item in items]
+    count = Item.objects.filter(id__in=item_ids).exclude(project=target).count()
+    if not count:
+        return 0
+
+    # Codes are reserved and written before the move, like new items. A failed move leaves a gap
+    first = reserve_codes(target, count)
+
+    with transaction.atomic():
+        items = list(Item.objects.select_for_update().filter(id__in=item_ids).exclude(
+            project=target).select_related('project').order_by('project', 'rank', 'id')[:count])
+        source_ids = {item.project_id for item in items}
+        for project_id in sorted({*source_ids, target.id}):
+            lock_project(project_id)
+
+        invoiced = get_invoiced_items([item.id for item in items])
+        if invoiced:
+            raise MoveError('Items with invoiced worklogs can not be moved: {}'.format(', '.join(invoiced)))
+
+        # Billed hours of the moved items leave the source revenue and are priced at the rates of the target
+        revenue_changes = []
+        for project_id, day, billed in WorkLog.objects.filter(item__in=[item.id for item in items]).values_list(
+                'item__project', 'date').annotate(billed=Sum('billed')).order_by():
+            revenue_changes.extend([(project_id, day, -float(billed or 0.0)), (target.id, day, float(billed or 0.0))])
+
+        last_rank = Item.objects.filter(project=target).order_by('-rank').values_list('rank', flat=True).first()
+        prefix = rank_between(last_rank, None)
+        moved = {}
+        for item, number, rank in zip(items, range(first, first + len(items)), rank_keys(len(items))):
+            moved[item.id] = (item.project.code, item.code)
+            item.project = target
+            item.code = f'{target.code}-{number}'
+            item.rank = prefix + rank
+            item.verbose_name = item.generate_verbose_name()
+        Item.objects.bulk_update(items, ['project', 'code', 'rank', 'verbose_name'], batch_size=500)
+
+        # Dependencies are kept within a project
+        ItemDependency.objects.filter(
+            Q(item__in=moved.keys()) & ~Q(blocked_by__in=moved.keys()) | ~Q(item__in=moved.keys()) & Q(blocked_by__in=moved.keys())
+        ).delete()
+
+        alerts = list(BudgetAlert.objects.filter(item__in=moved.keys()))
+        for alert in alerts:
+            alert.project = target
+            alert.key = BudgetAlert.get_key(alert.rule, target.id, alert.item_id, alert.threshold)
+        BudgetAlert.objects.bulk_update(alerts, ['project', 'key'])
+
+        add_revenues(revenue_changes)
+        for project in Project.objects.filter(id__in={*source_ids, target.id}):
+            graph = DependencyGraph.load(project.id)
+            graph.rebuild()
+            graph.save()
+            project.update_item_totals()
+            old_worked = float(project.total_worked or 0.0)
+            project.update_worked_totals()
+            if project.project_type == Project.TYPE_FIXED:
+                check_project_worked(project.id, old_worked, project.total_worked, project.budget_hours)
+            publish(project.id, RELOAD_EVENT)
+
+        for item in items:
+            project_code, code = moved[item.id]
+            record(Activity.EVENT_ITEM_MOVED, target.id, item.id, {
+                'project': [project_code, target.code],
+                'code': [code, item.code],
+            })
+
+        # Activity is recorded on the target, forecasts of the source projects change as well
+        transaction.on_commit(lambda: invalidate_projects(source_ids))
+
+        if len(items[-1].rank) > app_settings.RANK_REBALANCE_LENGTH:
+            from .tasks import rebalance_item_ranks
+            target_id = target.id
+            transaction.on_commit(lambda: rebalance_item_ranks.delay(target_id))
+
+    return len(items)
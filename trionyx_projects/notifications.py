@@ -0,0 +1,147 @@
+"""
+Comment and worklog notifications
+
+Activities of a committed transaction are queued as notifications for the users that subscribed to
+the project or item, the user that made the change is skipped. A periodic task coalesces the queued
+notifications into one digest mail per user, the mails of a batch of users are sent over one SMTP
+connection. Every mail is sent on its own, the notifications of a user are removed when the mail is sent.
+A failed mail or batch is logged and sent on the next run, later mails and batches are still sent.
+"""
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.template.loader import render_to_string
+
+from .conf import settings as app_settings
+from .models import Subscription, Notification
+
+logger = logging.getLogger(__name__)
+
+DIGEST_LOCK_KEY = 'trionyx-projects-notification-digest'
+
+
+def queue_notifications(activities):
+    """Queue notifications of activities for the subscribed users, with one subscription query"""
+    activities = [activity for activity in activities if activity.event in app_settings.NOTIFICATION_EVENTS]
+    if not activities:
+        return 0
+
+    project_ids = {activity.project_id for activity in activities}
+    item_ids = {activity.item_id for activity in activities if activity.item_id}
+    subscribers = defaultdict(set)
+    for user_id, project_id, item_id in Subscription.objects.filter(
+            Q(project__in=project_ids) | Q(item__in=item_ids)).values_list('user', 'project', 'item'):
+        subscribers[('project', project_id) if project_id else ('item', item_id)].add(user_id)
+
+    notifications = []
+    for activity in activities:
+        user_ids = subscribers[('project', activity.project_id)] | subscribers[('item', activity.item_id)]
+        notifications.extend(
+            Notification(
+                user_id=user_id,
+                project_id=activity.project_id,
+                item_id=activity.item_id,
+                actor_id=activity.user_id,
+                event=activity.event,
+                changes=activity.changes,
+                created_at=activity.created_at,
+            )
+            for user_id in user_ids if user_id != activity.user_id
+        )
+    Notification.objects.bulk_create(notifications, batch_size=500)
+    return len(notifications)
+
+
+def get_digest_message(user, notifications):
+    """Digest mail of the notifications of user, grouped per item"""
+    items = defaultdict(list)
+    for notification in notifications:
+        label = f'{notification.item.code} - {notification.item.name}' if notification.item else str(notification.project)
+        items[label].append(notification)
+
+    return EmailMessage(
+        subject=f'{len(notifications)} updates on your projects',
+        body=render_to_string('trionyx_projects/notification_digest.txt', {
+            'user': user,
+            'items': dict(items),
+        }),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+
+
+def send_digests(batch_size=None):
+    """
+    Send one digest mail per user with queued notifications, gives back the number of sent mails.
+
+    Only one run sends at a time, a run that finds the lock taken sends nothing.
+    """
+    batch_size = batch_size or app_settings.NOTIFICATION_DIGEST_BATCH
+    if not cache.add(DIGEST_LOCK_KEY, 'true', app_settings.NOTIFICATION_DIGEST_LOCK_TIMEOUT):
+        return 0
+
+    try:
+        last_id = Notification.objects.order_by('-id').values_list('id', flat=True).first()
+        user_ids = list(Notification.objects.filter(id__lte=last_id or 0).order_by('user').values_list('user', flat=True).distinct())
+
+        sent = 0
+        for index in range(0, len(user_ids), batch_size):
+            try:
+                sent += send_digest_batch(user_ids[index:index + batch_size], last_id)
+            except Exception as e:
+                logger.exception(e)
+        return sent
+    finally:
+        cache.delete(DIGEST_LOCK_KEY)
+
+
+def send_digest_batch(user_ids, last_id):
+    """Send digests of users over one connection, gives back the number of sent mails"""
+    notifications = defaultdict(list)
+    for notification in Notification.objects.filter(user__in=user_ids, id__lte=last_id).select_related(
+            'user', 'project', 'item', 'actor').order_by('id'):
+        notifications[notification.user].append(notification)
+
+    # Users without email get no mail, their notifications are removed
+    done_user_ids = [user.id for user in notifications if not user.email]
+    sent = 0
+    connection = get_connection()
+    try:
+        for user, rows in notifications.items():
+            if not user.email:
+                continue
+            try:
+                if connection.send_messages([get_digest_message(user, rows)]):
+                    done_user_ids.append(user.id)
+                    sent += 1
+            except Exception as e:
+                logger.exception(f'Digest mail to {user.email} failed: {e}')
+                # Connection is opened again for the next mail
+                connection.close()
+    finally:
+        connection.close()
+
+    Notification.objects.filter(user__in=done_user_ids, id__lte=last_id).delete()
+    return sent
+
+
+def subscribe(user, obj):
+    """Subscribe user to project or item"""
+    Subscription.objects.get_or_create(user=user, **{get_field(obj): obj})
+
+
+def unsubscribe(user, obj):
+    """Remove subscription of user on project or item"""
+    Subscription.objects.filter(user=user, **{get_field(obj): obj}).delete()
+
+
+def is_subscribed(user, obj):
+    return Subscription.objects.filter(user=user, **{get_field(obj): obj}).exists()
+
+
+def get_field(obj):
+    return 'project' if obj._meta.model_name == 'project' else 'item'
@@ -0,0 +1,217 @@
+"""
+PostgreSQL range partitioning of worklogs by date
+
+Enabled with the PROJECTS_WORKLOG_PARTITIONING setting. The worklog table becomes a partitioned table with
+a partition per month, the existing rows are attached as one legacy partition and dates without a month
+partition go to the default partition. The primary key is (id, date), ids stay unique by the shared sequence.
+Month partitions are created ahead by a scheduled task, old partitions are detached without touching their rows.
+
+Totals are recalculated from the worklogs that are left. Hours of a detached partition are added to the
+detached_worked and detached_billed of their items, so the item and project totals keep them. Revenue is not
+kept: a partition is only detached when its billed hours do not count for revenue, hourly billed hours must be
+on an invoice line. The oldest partitions are detached first and detaching stops at a partition that is still read.
+"""
+import logging
+import re
+from datetime import date
+
+from django.db import connection as default_connection, transaction
+from django.utils import timezone
+
+from .conf import settings as app_settings
+from .models import Project
+
+TABLE = 'trionyx_projects_worklog'
+LEGACY_PARTITION = f'{TABLE}_legacy'
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+logger = logging.getLogger(__name__)
+
+BOUND_RE = re.compile(r"FROM \((?:'(?P<start>[\d-]+)'|MINVALUE)\) TO \((?:'(?P<end>[\d-]+)'|MAXVALUE)\)")
+
+
+class PartitionError(Exception):
+    """Raised when worklogs can not be partitioned"""
+
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def get_partition_name(month):
+    return f'{TABLE}_y{month.year}m{month.month:02}'
+
+
+def is_partitioned(connection=None):
+    """Worklog table is a partitioned table"""
+    connection = connection or default_connection
+    if connection.vendor != 'postgresql':
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [TABLE])
+        return cursor.fetchone() is not None
+
+
+def get_partitions(connection=None):
+    """Get list of (name, start, end) of the worklog partitions, start and end are None when unbounded"""
+    connection = connection or default_connection
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname',
+            [TABLE],
+        )
+        partitions = []
+        for name, bound in cursor.fetchall():
+            match = BOUND_RE.search(bound)
+            if not match:
+                # Default partition
+                continue
+            partitions.append((
+                name,
+                date.fromisoformat(match.group('start')) if match.group('start') else None,
+                date.fromisoformat(match.group('end')) if match.group('end') else None,
+            ))
+        return partitions
+
+
+def partition_table(connection=None, months_ahead=None):
+    """
+    Convert the worklog table to a partitioned table, the existing table is attached as legacy partition.
+
+    Indexes and foreign keys are created on the partitioned table with the same names,
+    the matching indexes of the legacy partition are attached instead of build again.
+    """
+    connection = connection or default_connection
+    if connection.vendor != 'postgresql':
+        raise PartitionError('Worklog partitioning needs PostgreSQL')
+    if is_partitioned(connection):
+        return
+
+    qn = connection.ops.quote_name
+    today = timezone.now().date()
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {qn(TABLE)} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(f'SELECT max(date) FROM {qn(TABLE)}')
+        last = cursor.fetchone()[0]
+        first_month = add_months(max(last or today, today), 1)
+
+        cursor.execute(
+            'SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid '
+            'WHERE x.indrelid = to_regclass(%s) AND NOT x.indisprimary',
+            [TABLE],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute("SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = to_regclass(%s)", [TABLE])
+        constraints = cursor.fetchall()
+        primary_key = [name for name, contype, _ in constraints if contype == 'p'][0]
+        cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [TABLE, 'id'])
+        sequence = cursor.fetchone()[0]
+
+        cursor.execute(f'ALTER TABLE {qn(TABLE)} RENAME TO {qn(LEGACY_PARTITION)}')
+        cursor.execute(f'ALTER TABLE {qn(LEGACY_PARTITION)} RENAME CONSTRAINT {qn(primary_key)} TO {qn(f"{LEGACY_PARTITION}_pkey")}')
+        for name, _ in indexes:
+            cursor.execute(f'ALTER INDEX {qn(name)} RENAME TO {qn(name[:56] + "_legacy")}')
+
+        cursor.execute(
+            f'CREATE TABLE {qn(TABLE)} (LIKE {qn(LEGACY_PARTITION)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE) '
+            f'PARTITION BY RANGE (date)'
+        )
+        cursor.execute(f'ALTER TABLE {qn(TABLE)} ADD CONSTRAINT {qn(primary_key)} PRIMARY KEY (id, date)')
+        # Sequence is dropped with its owner, the legacy partition can be detached and dropped
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {qn(TABLE)}.id')
+
+        cursor.execute(f"ALTER TABLE {qn(TABLE)} ATTACH PARTITION {qn(LEGACY_PARTITION)} FOR VALUES FROM (MINVALUE) TO ('{first_month}')")
+        cursor.execute(f'CREATE TABLE {qn(DEFAULT_PARTITION)} PARTITION OF {qn(TABLE)} DEFAULT')
+
+        # Definitions are read before the rename and create the indexes on the partitioned table
+        for _, definition in indexes:
+            cursor.execute(definition)
+        for name, contype, definition in constraints:
+            if contype == 'f':
+                cursor.execute(f'ALTER TABLE {qn(TABLE)} ADD CONSTRAINT {qn(name)} {definition}')
+
+    create_partitions(connection, months_ahead)
+
+
+def create_partitions(connection=None, months_ahead=None):
+    """Create the month partitions from the current month until given months ahead, gives back the created names"""
+    connection = connection or default_connection
+    months_ahead = app_settings.WORKLOG_PARTITIONS_AHEAD if months_ahead is None else months_ahead
+    qn = connection.ops.quote_name
+
+    partitions = get_partitions(connection)
+    covered_until = max((end for _, _, end in partitions if end), default=None)
+    this_month = timezone.now().date().replace(day=1)
+
+    created = []
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        for index in range(months_ahead + 1):
+            month = add_months(this_month, index)
+            if covered_until and month < covered_until:
+                continue
+
+            # Rows of the month in the default partition are checked by PostgreSQL, the create fails on any
+            name = get_partition_name(month)
+            cursor.execute(f"CREATE TABLE {qn(name)} PARTITION OF {qn(TABLE)} FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')")
+            created.append(name)
+    return created
+
+
+def is_priced(name, connection=None):
+    """Partition has billed hours of hourly based projects that are priced with the rates, not by an invoice line"""
+    connection = connection or default_connection
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT 1 FROM {qn(name)} w JOIN trionyx_projects_item i ON i.id = w.item_id '
+            f'JOIN trionyx_projects_project p ON p.id = i.project_id '
+            f'WHERE w.invoice_line_id IS NULL AND w.billed > 0 AND p.project_type = %s LIMIT 1',
+            [Project.TYPE_HOURLY_BASED],
+        )
+        return cursor.fetchone() is not None
+
+
+def detach_partitions(before, connection=None):
+    """
+    Detach partitions that end on or before given date, the tables are kept. Gives back the detached names.
+
+    The hours of a partition are added to the detached totals of the items in the same transaction.
+    """
+    connection = connection or default_connection
+    qn = connection.ops.quote_name
+
+    detached = []
+    for name, _, end in sorted(get_partitions(connection), key=lambda partition: partition[2] or date.max):
+        if not end or end > before:
+            break
+        if is_priced(name, connection):
+            logger.warning(f'Partition {name} has billed hours without invoice line, it is not detached')
+            break
+
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {qn(name)} IN SHARE MODE')
+            cursor.execute(
+                f'UPDATE trionyx_projects_item i SET detached_worked = i.detached_worked + t.worked, '
+                f'detached_billed = i.detached_billed + t.billed FROM ('
+                f'SELECT item_id, coalesce(sum(worked), 0) AS worked, coalesce(sum(billed), 0) AS billed '
+                f'FROM {qn(name)} GROUP BY item_id) t WHERE i.id = t.item_id'
+            )
+            cursor.execute(f'ALTER TABLE {qn(TABLE)} DETACH PARTITION {qn(name)}')
+        detached.append(name)
+    return detached
+
+
+def roll_partitions(connection=None):
+    """Create the partitions ahead and detach the partitions older than WORKLOG_PARTITIONS_DETACH_MONTHS"""
+    connection = connection or default_connection
+    if not is_partitioned(connection):
+        return [], []
+
+    created = create_partitions(connection)
+    detached = []
+    if app_settings.WORKLOG_PARTITIONS_DETACH_MONTHS:
+        detached = detach_partitions(add_months(timezone.now().date(), -app_settings.WORKLOG_PARTITIONS_DETACH_MONTHS), connection)
+    return created, detached
@@ -0,0 +1,472 @@
+"""Project tab and item sidebar layouts, registered lazily by layouts"""
+from trionyx.layout import (
+    Component, Container, Row, Column4, Column8, Column12, Panel,
+    TableDescription, Html, Button, Table, OnclickLink, Field, Badge,
+    HtmlTemplate, ButtonGroup
+)
+from trionyx.renderer import renderer, price_value_renderer
+from trionyx.urls import model_url
+from trionyx.utils import get_current_request
+from django.urls import reverse
+
+from .conf import settings as app_settings
+from .models import Project, Item, ItemDependency, Comment, WorkLog
+from .apps import render_status
+from .timers import get_running_timer
+from .activity import get_feed
+from .dependencies import get_critical_path, predict_completion
+
+# Tab is only reloaded when the backlog is not kept up to date by change events
+RELOAD_TAB_CALLBACK = """function(data, dialog){
+    if (data.success) {
+        dialog.close();
+        projectsEvents.reloadTab('general');
+    }
+}"""
+
+RELOAD_SIDEBAR_CALLBACK = """function(data, dialog){
+    if (data.success) {
+        dialog.close();
+        projectsEvents.reloadTab('general');
+        reloadSidebar();
+    }
+}"""
+
+
+def hours(value):
+    return f"{value}h" if value else '0h'
+
+
+def get_stats(obj):
+    """Rendered project or item totals, these are updated from change events"""
+    if isinstance(obj, Project):
+        return {
+            field: renderer.render_field(obj, field)
+            for field in ['total_items_estimate', 'total_worked', 'total_billed']
+        }
+    return {field: hours(getattr(obj, field)) for field in ['estimate', 'total_worked', 'total_billed']}
+
+
+def stat_field(field, label=None, css_class=None):
+    """Description field for total that is marked for change events"""
+    return {
+        'field': field,
+        'renderer': lambda value, data_object, **options: '<span data-projects-stat="{}-{}-{}">{}</span>'.format(
+            data_object._meta.model_name, data_object.id, field, get_stats(data_object)[field]),
+        **({'label': label} if label else {}),
+        **({'class': css_class} if css_class else {}),
+    }
+
+
+def backlog_table(items, **options):
+    """Backlog table, rows are marked with the item id for change events"""
+    return Table(
+        items,
+        {
+            'field': 'item_type',
+            'renderer': lambda value, data_object, **options: '<span data-projects-item="{}">{}</span>'.format(
+                data_object.id, Item.get_type_icon(value))
+        },
+        {
+            'field': 'priority',
+            'renderer': lambda value, **options: Item.get_priority_icon(value)
+        },
+        {
+            'field': 'code',
+            'value': OnclickLink(
+                Field('code'),
+                sidebar=True,
+            )
+        },
+        {
+            'field': 'name',
+            'class': 'width-100'
+        },
+        {
+            'field': 'estimate',
+            'value': Badge(
+                Field('estimate', renderer=lambda value, data_object: f"{value}h" if value else '&nbsp;'),
+                css_class="badge estimate-badge"
+            ),
+            'class': 'text-right',
+        },
+        header=False,
+        **options
+    )
+
+
+def worklog_table(request, worklogs, **options):
+    """Item worklogs table, rows are marked with the worklog id for change events"""
+    return Table(
+        worklogs,
+        {
+            'field': 'date',
+            'renderer': lambda value, data_object, **options: '<span data-projects-worklog="{}">{}</span>'.format(
+                data_object.id, renderer.render_field(data_object, 'date'))
+        },
+        {
+            'field': 'created_by',
+            'label': 'User',
+        },
+        {
+            'field': 'description_html',
+            'label': 'Description',
+        },
+        {
+            'field': 'worked',
+            'label': 'W',
+        },
+        {
+            'field': 'billed',
+            'label': 'B',
+        },
+        {
+            'label': 'Options',
+            'width': '60px',
+            'value': ButtonGroup(
+                Button(
+                    '<i class="fa fa-edit"></i>',
+                    css_class='btn bg-theme btn-xs',
+                    dialog=True,
+                    model_url='dialog-edit',
+                    dialog_options={'callback': RELOAD_SIDEBAR_CALLBACK},
+                    should_render=lambda comp: comp.object.created_by == request.user or request.user.is_superuser,
+                ) if request.user.has_perm('trionyx_projects.change_worklog') else None,
+                Button(
+                    '<i class="fa fa-times"></i>',
+                    css_class='btn bg-red btn-xs',
+                    dialog=True,
+                    model_url='dialog-delete',
+                    dialog_options={'callback': RELOAD_SIDEBAR_CALLBACK},
+                    should_render=lambda comp: comp.object.created_by == request.user or request.user.is_superuser,
+                ) if request.user.has_perm('trionyx_projects.delete_worklog') else None,
+            )
+        },
+        **options
+    )
+
+
+def planning_panel(obj):
+    """Critical path of the project dependencies and the predicted completion"""
+    path, remaining = get_critical_path(obj.id)
+    completion = predict_completion(remaining)
+    late = obj.deadline and completion > obj.deadline
+
+    return Panel(
+        'Planning',
+        TableDescription(
+            {
+                'label': 'Critical path',
+                'value': hours(round(remaining, 2)),
+            },
+            {
+                'label': 'Predicted completion',
+                'value': renderer.render_value(completion),
+                'format': '<strong class="text-danger">{}</strong>' if late else '<strong>{}</strong>',
+            },
+        ),
+        Table(
+            path,
+            {
+                'field': 'code',
+                'value': OnclickLink(
+                    Field('code'),
+                    sidebar=True,
+                )
+            },
+            {
+                'field': 'name',
+                'class': 'width-100'
+            },
+            {
+                'field': 'earliest_finish',
+                'label': 'Finish',
+                'renderer': lambda value, **options: hours(round(value, 2)),
+                'class': 'text-right',
+            },
+            header=False,
+        ),
+    )
+
+
+def dependency_table(request, dependencies, field):
+    """Blocked by or blocking items of an item"""
+    return Table(
+        dependencies,
+        {
+            'field': field,
+            'label': 'Item',
+            'renderer': lambda value, **options: value.code,
+        },
+        {
+            'field': field,
+            'label': 'Name',
+            'renderer': lambda value, **options: value.name,
+            'class': 'width-100',
+        },
+        {
+            'label': 'Options',
+            'width': '30px',
+            'value': Button(
+                '<i class="fa fa-times"></i>',
+                css_class='btn bg-red btn-xs',
+                dialog=True,
+                model_url='dialog-delete',
+                dialog_options={'callback': RELOAD_SIDEBAR_CALLBACK},
+            ) if request.user.has_perm('trionyx_projects.delete_itemdependency') else None,
+        },
+        header=False,
+    )
+
+
+def activity_table(activities, **options):
+    """Activity feed table, next pages are appended by the load more button"""
+    return Table(
+        activities,
+        {
+            'field': 'created_at',
+            'label': 'Date',
+        },
+        {
+            'field': 'user',
+        },
+        {
+            'field': 'item',
+            'renderer': lambda value, data_object, **options: value.code if value else data_object.changes.get('code', ''),
+        },
+        {
+            'field': 'message',
+            'label': 'Activity',
+            'class': 'width-100',
+        },
+        **options
+    )
+
+
+def project_overview(obj):
+    return Container(
+        Row(
+            Column8(
+                Panel(
+                    'Backlog',
+                    backlog_table(obj.items.order_by('rank', 'id'), id='projects-backlog'),
+                    Button(
+                        'Add item',
+                        model_url='dialog-create',
+                        model_params={
+                            'project': obj.id
+                        },
+                        model_code='limited' if not get_current_request().user.has_perm('trionyx_projects.add_item') and get_current_request().user.has_perm('trionyx_projects.limit_add_item') else None,
+                        dialog=True,
+                        dialog_options={'callback': RELOAD_TAB_CALLBACK},
+                        css_class='btn btn-flat bg-theme btn-block',
+                        object=Item()
+                    ),
+                )
+            ),
+            Column4(
+                Panel(
+                    'Project details',
+                    TableDescription(
+                        {
+                            'field': 'status',
+                            'renderer': lambda value, data_object, **options: render_status(data_object),
+                        },
+                        'created_at',
+                        'project_type',
+                        {
+                            'label': 'deadline',
+                            'value': obj.deadline if obj.deadline else 'n/a',
+                            'format': '<strong>{}</strong>'
+                        },
+                        {
+                            'field': 'hour_rate',
+                            'value': price_value_renderer(obj.hourly_rate)
+                        },
+                        stat_field('total_items_estimate', label='Total hours') if obj.project_type == Project.TYPE_HOURLY_BASED else {
+                          'label': 'Calculated hours',
+                          'value': round(float(obj.fixed_price if obj.fixed_price else 0) / float(obj.hourly_rate), 2),
+                        },
+
+                        {
+                            'label': 'Calculated price',
+                            'value': price_value_renderer(obj.total_revenue),
+                            'format': '<strong>{}</strong>'
+                        } if obj.project_type == Project.TYPE_HOURLY_BASED else {
+                            'field': 'fixed_price',
+                            'format': '<strong>{}</strong>'
+                        },
+                    )
+                ),
+                planning_panel(obj) if ItemDependency.objects.filter(item__project=obj).exists() else None,
+                Panel(
+                    'Logged hours',
+                    TableDescription(
+                        stat_field('total_worked'),
+                        stat_field('total_billed'),
+                    ),
+                ) if get_current_request().user.has_perm('trionyx_projects.view_worklog') else None,
+                Panel(
+                    'Description',
+                    Html(obj.description_html),
+                    collapse=False
+                )
+            )
+        ),
+        HtmlTemplate('trionyx_projects/project_events.html', {'poll_interval': app_settings.EVENTS_POLL_INTERVAL}),
+        HtmlTemplate(
+            'trionyx_projects/project_ranking.html'
+        ) if get_current_request().user.has_perm('trionyx_projects.change_item') else None,
+    )
+
+
+def project_activity(obj):
+    activities, before = get_feed(project_id=obj.id)
+    return Container(
+        Row(
+            Column12(
+                Panel(
+                    'Activity',
+                    activity_table(activities, id='projects-activity'),
+                    HtmlTemplate('trionyx_projects/project_activity.html', {'project': obj, 'before': before}),
+                )
+            )
+        )
+    )
+
+
+def item_sidebar(request, obj):
+    content = Component(
+        Panel(
+            'Description',
+            Html(obj.description_html),
+        ),
+        Panel(
+            'Info',
+            TableDescription(
+                {
+                    'field': 'item_type',
+                    'renderer': lambda value, data_object, **options: "{} {}".format(
+                        data_object.get_type_icon(data_object.item_type),
+                        data_object.get_item_type_display(),
+                    )
+                },
+                {
+                    'field': 'priority',
+                    'renderer': lambda value, data_object, **options: "{} {}".format(
+                        data_object.get_priority_icon(data_object.priority),
+                        data_object.get_priority_display(),
+                    )
+                },
+                'created_at',
+                'updated_at',
+            ),
+        ),
+        Panel(
+            'Dependencies',
+            Button(
+                'Add blocked by',
+                model_url='dialog-create',
+                model_params={
+                    'item': obj.id
+                },
+                dialog=True,
+                dialog_options={'callback': RELOAD_SIDEBAR_CALLBACK},
+                css_class='btn btn-flat bg-theme btn-block',
+                object=ItemDependency()
+            ) if request.user.has_perm('trionyx_projects.add_itemdependency') else None,
+            Html('<strong>Blocked by</strong>'),
+            dependency_table(request, obj.dependencies.select_related('blocked_by').order_by('blocked_by__rank'), 'blocked_by'),
+            Html('<strong>Blocks</strong>'),
+            dependency_table(request, obj.blocking.select_related('item').order_by('item__rank'), 'item'),
+        ),
+        Panel(
+            'Comments',
+            Button(
+                'Add comment',
+                model_url='dialog-create',
+                model_params={
+                    'item': obj.id
+                },
+                dialog=True,
+                dialog_reload_sidebar=True,
+                css_class='btn btn-flat bg-theme btn-block',
+                object=Comment()
+            ),
+             *[Component(
+                 HtmlTemplate('trionyx_projects/project_comment.html', object=comment, lock_object=True),
+            ) for comment in obj.comments.order_by('-created_at')]
+        ) if request.user.has_perm('trionyx_projects.view_comment') else None,
+        Panel(
+            'Worklogs',
+            Button(
+                'Add worklog',
+                model_url='dialog-create',
+                model_params={
+                    'item': obj.id
+                },
+                dialog=True,
+                dialog_options={'callback': RELOAD_SIDEBAR_CALLBACK},
+                css_class='btn btn-flat bg-theme btn-block',
+                object=WorkLog()
+            ),
+            worklog_table(request, obj.worklogs.order_by('-date', 'id'), id=f'projects-worklogs-{obj.id}'),
+        ) if request.user.has_perm('trionyx_projects.view_worklog') else None,
+    )
+
+    content.set_object(obj)
+    timer = get_running_timer(request.user)
+
+    return {
+        'title': f"{obj.code} - {obj.name}",
+        'fixed_content': TableDescription(
+            stat_field('estimate', css_class='text-right'),
+            stat_field(
+                'total_worked', label='Logged', css_class='text-right'
+            ) if request.user.has_perm('trionyx_projects.view_worklog') else None,
+            stat_field(
+                'total_billed', label='Billed', css_class='text-right'
+            ) if request.user.has_perm('trionyx_projects.view_worklog') else None,
+            css_class='no-margin',
+            object=obj,
+        ).render({}, request),
+        'content': content.render({}, request),
+        'actions': [
+            *([{
+                'label': 'Stop timer' if timer and timer['item_id'] == obj.id else 'Start timer',
+                'url': reverse('trionyx_projects:item-timer', kwargs={'pk': obj.id}),
+                'dialog': True,
+                'reload': True,
+            }] if request.user.has_perm('trionyx_projects.add_worklog') else []),
+            {
+                'label': 'Edit',
+                'url': model_url(obj, 'dialog-edit', code='limited' if not get_current_request().user.has_perm('trionyx_projects.add_item') and get_current_request().user.has_perm('trionyx_projects.limit_add_item') else None),
+                'dialog': True,
+                'dialog_options': {
+                    'callback': """
+                        if (data.success) { 
+                            projectsEvents.reloadTab('general');
+                            reloadSidebar();
+                            dialog.close();
+                        };
+                    """
+                },
+            },
+            {
+                'label': 'Delete',
+                'class': 'text-danger',
+                'url': model_url(obj, 'dialog-delete'),
+                'dialog': True,
+                'dialog_options': {
+                    'callback': """
+                        if (data.success) { 
+                            projectsEvents.reloadTab('general');
+                            closeSidebar();
+                            dialog.close();
+                        };
+                    """
+                },
+                'divider': True,
+            }
+        ]
+    }
@@ -0,0 +1,55 @@
+"""Fractional rank keys, there is always a key between two keys so moving an item only updates that item"""
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+
+
+def rank_between(before=None, after=None):
+    """
+    Give key that sorts between before and after, None is the start or end of the list.
+
+    Keys are read as base 36 fractions, the key is a shortest fraction between both. At the start
+    and end of the list the key is placed next to the neighbour, so repeated inserts there grow
+    a digit per 35 inserts. Keys never end with the lowest digit so there is always room before a key.
+    """
+    before = before or ''
+    if after is not None and not before < after:
+        raise ValueError(f'Rank "{before}" is not before "{after}"')
+
+    key = ''
+    index = 0
+    while True:
+        low = DIGITS.index(before[index]) if index < len(before) else 0
+        high = DIGITS.index(after[index]) if after is not None and index < len(after) else BASE
+
+        if high - low > 1:
+            if index >= len(before) and after is not None:
+                # Only bound by after, stay close to it to leave room for the next insert before it
+                return key + DIGITS[high - 1]
+            if index < len(before) and after is None:
+                # Only bound by before, stay close to it to leave room for the next insert after it
+                return key + DIGITS[low + 1]
+            return key + DIGITS[(low + high) // 2]
+
+        key += DIGITS[low]
+        if high - low == 1:
+            # Key is now below after, remaining digits only have to be above before
+            after = None
+        index += 1
+
+
+def rank_keys(count):
+    """Give count evenly spread keys of minimal length, used to rebalance a list"""
+    length = 1
+    while BASE ** length <= count:
+        length += 1
+
+    step = BASE ** length // (count + 1)
+    keys = []
+    for position in range(1, count + 1):
+        value = step * position
+        digits = []
+        for _ in range(length):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        keys.append(''.join(reversed(digits)).rstrip(DIGITS[0]))
+    return keys
@@ -0,0 +1,102 @@
+"""
+Effective dated hourly rates
+
+A rate is valid from its date until the next rate. Project rates fall back to the default rates
+(without project) before their first date, default rates fall back to the HOURLY_RATE setting.
+Billed hours are priced per day: days are bisected against the rate boundaries and the hours of
+each period are multiplied with its rate once. Worklog writes only price their own change, the full
+history is priced again when a rate changes. Invoiced hours keep the total of their invoice line.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+
+from django.db.models import Q, Sum
+
+from .conf import settings as app_settings
+from .models import HourlyRate, InvoiceLine, WorkLog
+
+
+class RateTimeline:
+    """Sorted rate periods of a project or the default rates, a period without rate uses the fallback"""
+
+    def __init__(self, periods, fallback):
+        periods = sorted(periods)
+        self.boundaries = [valid_from for valid_from, _ in periods]
+        self.rates = [float(rate) if rate is not None else None for _, rate in periods]
+        self.fallback = fallback
+
+    def rate_on(self, day):
+        """Rate on given date"""
+        index = bisect_right(self.boundaries, day)
+        if index and self.rates[index - 1] is not None:
+            return self.rates[index - 1]
+        return self.fallback.rate_on(day) if isinstance(self.fallback, RateTimeline) else float(self.fallback)
+
+    def price(self, hours_per_day):
+        """Price list of (date, hours)"""
+        rates = [None, *self.rates]
+        period_hours = [0.0] * len(rates)
+        fallback_hours = []
+        for day, hours in hours_per_day:
+            index = bisect_right(self.boundaries, day)
+            if rates[index] is None:
+                fallback_hours.append((day, hours))
+            else:
+                period_hours[index] += float(hours or 0.0)
+
+        total = sum(hours * rate for hours, rate in zip(period_hours, rates) if rate is not None)
+        if isinstance(self.fallback, RateTimeline):
+            return total + self.fallback.price(fallback_hours)
+        return total + sum(float(hours or 0.0) for _, hours in fallback_hours) * float(self.fallback)
+
+
+def get_timelines(projects, default_rate=None):
+    """Get rate timeline per project id, with one query. Default rate replaces the HOURLY_RATE setting"""
+    periods = defaultdict(list)
+    for project_id, valid_from, rate in HourlyRate.objects.filter(
+        Q(project__in=[project.id for project in projects]) | Q(project__isnull=True),
+    ).values_list('project_id', 'valid_from', 'rate'):
+        periods[project_id].append((valid_from, rate))
+
+    default = RateTimeline(periods[None], app_settings.HOURLY_RATE if default_rate is None else default_rate)
+    timelines = {}
+    for project in projects:
+        if periods[project.id]:
+            timelines[project.id] = RateTimeline(periods[project.id], default)
+        elif project.project_hourly_rate:
+            # Project rate without history is used for all billed hours
+            timelines[project.id] = RateTimeline([], project.project_hourly_rate)
+        else:
+            timelines[project.id] = default
+    return timelines
+
+
+def get_revenues(projects, default_rate=None):
+    """Get revenue of billed hours per project id, with three queries for any number of projects"""
+    projects = list(projects)
+    hours_per_day = defaultdict(list)
+    for row in WorkLog.objects.filter(
+        item__project__in=[project.id for project in projects],
+        invoice_line__isnull=True,
+    ).values('item__project', 'date').annotate(billed=Sum('billed')).order_by():
+        hours_per_day[row['item__project']].append((row['date'], row['billed']))
+
+    invoiced = dict(InvoiceLine.objects.filter(
+        project__in=[project.id for project in projects],
+    ).values('project').annotate(total=Sum('total')).values_list('project', 'total').order_by())
+
+    timelines = get_timelines(projects, default_rate)
+    return {
+        project.id: timelines[project.id].price(hours_per_day[project.id]) + float(invoiced.get(project.id) or 0.0)
+        for project in projects
+    }
+
+
+def get_revenue_deltas(projects, changes):
+    """Get revenue change per project id of billed hour changes, changes are (project_id, date, billed)"""
+    timelines = get_timelines(projects)
+    deltas = defaultdict(float)
+    for project_id, day, billed in changes:
+        if billed:
+            deltas[project_id] += float(billed) * timelines[project_id].rate_on(day)
+    return dict(deltas)
@@ -0,0 +1,118 @@
+"""
+Deferred registration
+
+Trionyx imports layouts.py and forms.py of every app when Django starts, also in Celery workers and
+management commands that never render a view. The registration modules of this app are imported on
+the first web request or on the first lookup of a model of this app in the Trionyx form register instead.
+The form register keeps the forms per model alias, only the entries of the models of this app are lazy,
+lookups of other apps and the form register itself are left as they are.
+
+Menu items get a lazy url, the menu compares the url as string so it is resolved on first use.
+"""
+import functools
+import threading
+from importlib import import_module
+
+from django.core.signals import request_started
+
+
+def load_first(name):
+    """Dict method that imports the registration modules first"""
+    method = getattr(dict, name)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.registration.load()
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+class LazyForms(dict):
+    """Forms of a model in the Trionyx form register, reading them imports the registration modules first"""
+
+    def __init__(self, registration, forms):
+        super().__init__(forms)
+        self.registration = registration
+
+    get = load_first('get')
+    items = load_first('items')
+    keys = load_first('keys')
+    values = load_first('values')
+    __getitem__ = load_first('__getitem__')
+    __contains__ = load_first('__contains__')
+    __iter__ = load_first('__iter__')
+    __len__ = load_first('__len__')
+
+
+class LazyRegistration:
+    """Modules that are imported once, on the first request or form lookup of a model of this app"""
+
+    def __init__(self):
+        self.modules = []
+        self.menu_paths = []
+        self.loaded = False
+        self.loading = False
+        self.connected = False
+        self.lock = threading.RLock()
+
+    def add(self, module):
+        """Add module that is imported on first use"""
+        self.modules.append(module)
+        self.loaded = False
+        self.connect()
+
+    def add_menu_item(self, path, name, url_name, **kwargs):
+        """Add menu item with the url of url_name, the url is not resolved on startup"""
+        from django.urls import reverse_lazy
+        from trionyx.menu import app_menu
+        app_menu.add_item(path, name, url=reverse_lazy(url_name), **kwargs)
+        self.menu_paths.append(path)
+        self.loaded = False
+        self.connect()
+
+    def connect(self):
+        """Load on the first request and on the first form register lookup of a model of this app"""
+        if self.connected:
+            return
+        self.connected = True
+
+        from django.apps import apps
+        from trionyx.config import models_config
+        from trionyx.forms import form_register
+        request_started.connect(self.on_request, dispatch_uid='trionyx_projects_lazy_registration')
+        for model in apps.get_app_config('trionyx_projects').get_models():
+            alias = models_config.get_model_name(model)
+            form_register.forms[alias] = LazyForms(self, form_register.forms.get(alias, {}))
+
+    def on_request(self, **kwargs):
+        self.load()
+
+    def load(self):
+        """Import the registration modules, safe to call from parallel threads"""
+        if self.loaded:
+            return
+
+        with self.lock:
+            # The modules register forms, which reads the lazy forms again in this thread
+            if self.loaded or self.loading:
+                return
+            self.loading = True
+            try:
+                for module in self.modules:
+                    import_module(module)
+                self.resolve_menu_urls()
+                self.loaded = True
+            finally:
+                self.loading = False
+
+    def resolve_menu_urls(self):
+        """Replace the lazy urls of the menu items by their string"""
+        from trionyx.menu import app_menu
+        for path in self.menu_paths:
+            item = app_menu.root_item
+            for code in path.split('/'):
+                item = item.child_by_code(code)
+            item.url = str(item.url)
+
+
+lazy_registration = LazyRegistration()
@@ -0,0 +1,135 @@
+"""Sanitize Wysiwyg HTML on write so rendering is a plain string emit"""
+import re
+from html import escape
+from html.parser import HTMLParser
+
+ALLOWED_TAGS = {
+    'a', 'b', 'blockquote', 'br', 'code', 'div', 'em', 'font', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img',
+    'li', 'ol', 'p', 'pre', 's', 'span', 'strike', 'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'tfoot', 'th',
+    'thead', 'tr', 'u', 'ul',
+}
+
+VOID_TAGS = {'br', 'hr', 'img'}
+
+# Tags that separate words in the plain text excerpt
+BLOCK_TAGS = {'blockquote', 'br', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'p', 'pre', 'td', 'th', 'tr'}
+
+# Tags that are removed together with their content
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template'}
+
+ALLOWED_ATTRIBUTES = {
+    '*': {'class', 'style', 'title'},
+    'a': {'href', 'target'},
+    'img': {'src', 'alt', 'width', 'height'},
+    'font': {'color'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan'},
+}
+
+URL_ATTRIBUTES = {'href', 'src'}
+
+ALLOWED_URL_SCHEMES = {'http', 'https', 'mailto', 'tel'}
+
+EXCERPT_LENGTH = 200
+
+UNSAFE_STYLE_RE = re.compile(r'expression|javascript:|url\s*\(|@import|behavior', re.IGNORECASE)
+URL_SCHEME_RE = re.compile(r'^([a-z][a-z0-9+.-]*):', re.IGNORECASE)
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def is_safe_url(tag, value):
+    """Check if url has an allowed scheme, only images can use inline data"""
+    url = ''.join(value.split()).lower()
+    match = URL_SCHEME_RE.match(url)
+    if not match:
+        return True
+    if tag == 'img' and url.startswith('data:image/'):
+        return True
+    return match.group(1) in ALLOWED_URL_SCHEMES
+
+
+class HtmlSanitizer(HTMLParser):
+    """Rebuild HTML with only allowed tags and attributes, and collect the plain text"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.open_tags = []
+        self.drop_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth += 1
+            return
+
+        if self.drop_depth or tag not in ALLOWED_TAGS:
+            return
+
+        allowed = ALLOWED_ATTRIBUTES['*'] | ALLOWED_ATTRIBUTES.get(tag, set())
+        clean_attrs = []
+        for name, value in attrs:
+            value = value or ''
+            if name not in allowed:
+                continue
+            if name in URL_ATTRIBUTES and not is_safe_url(tag, value):
+                continue
+            if name == 'style' and UNSAFE_STYLE_RE.search(value):
+                continue
+            clean_attrs.append(f' {name}="{escape(value)}"')
+
+        if tag == 'a' and any(name == 'target' for name, _ in attrs):
+            clean_attrs.append(' rel="noopener noreferrer"')
+
+        self.html.append('<{}{}>'.format(tag, ''.join(clean_attrs)))
+
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth = max(self.drop_depth - 1, 0)
+            return
+
+        if self.drop_depth or tag not in self.open_tags:
+            return
+
+        # Close tags that where left open inside this tag
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.html.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+
+    def handle_data(self, data):
+        if self.drop_depth:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.html.append(f'</{self.open_tags.pop()}>')
+
+
+def sanitize_html(value):
+    """Give sanitized html and plain text excerpt for given Wysiwyg value"""
+    parser = HtmlSanitizer()
+    parser.feed(value or '')
+    parser.close()
+
+    text = WHITESPACE_RE.sub(' ', ''.join(parser.text)).strip()
+    excerpt = f'{text[:EXCERPT_LENGTH - 3]}...' if len(text) > EXCERPT_LENGTH else text
+    return ''.join(parser.html).strip(), excerpt
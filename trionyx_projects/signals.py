@@ -0,0 +1,75 @@
+"""App signals"""
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from trionyx.trionyx.models import SystemVariable
+
+from .models import Activity, Item, ItemDependency, Comment, WorkLog
+from .dependencies import reschedule_items
+from . import activity, events
+
+
+@receiver(post_save, sender=Item)
+def item_saved(sender, instance, created, **kwargs):
+    """Publish and record item change"""
+    events.publish_item(instance)
+    activity.record_item(instance, created)
+
+
+@receiver(pre_delete, sender=Item)
+def item_deleting(sender, instance, **kwargs):
+    """Remember blocked items, dependencies are deleted with the item"""
+    instance.blocked_item_ids = list(ItemDependency.objects.filter(blocked_by=instance).values_list('item_id', flat=True))
+
+
+@receiver(post_delete, sender=Item)
+def item_deleted(sender, instance, **kwargs):
+    """Publish and record item delete and update schedule of the items it blocked"""
+    events.publish_item(instance, deleted=True)
+    activity.record(Activity.EVENT_ITEM_DELETED, instance.project_id, instance.id, {'code': instance.code, 'name': instance.name})
+    reschedule_items(instance.project_id, getattr(instance, 'blocked_item_ids', []))
+
+
+@receiver(post_save, sender=WorkLog)
+def worklog_saved(sender, instance, created, **kwargs):
+    """Publish and record worklog change"""
+    events.publish_worklog(instance, instance.item.project_id)
+    activity.record_worklog(instance, instance.item.project_id, created)
+
+
+@receiver(post_delete, sender=WorkLog)
+def worklog_deleted(sender, instance, **kwargs):
+    """Publish and record worklog delete"""
+    events.publish_worklog(instance, instance.item.project_id, deleted=True)
+    activity.record(Activity.EVENT_WORKLOG_DELETED, instance.item.project_id, instance.item_id, {
+        'date': instance.date,
+        'worked': instance.worked,
+    })
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    """Record added comment"""
+    if created:
+        activity.record(Activity.EVENT_COMMENT_ADDED, instance.item.project_id, instance.item_id, {
+            'comment': instance.comment_excerpt[:64],
+        }, instance.created_by_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """Record comment delete"""
+    activity.record(Activity.EVENT_COMMENT_DELETED, instance.item.project_id, instance.item_id, {
+        'comment': instance.comment_excerpt[:64],
+    })
+
+
+@receiver(post_save, sender=SystemVariable)
+@receiver(post_delete, sender=SystemVariable)
+def system_variable_changed(sender, instance, **kwargs):
+    """Reprice hourly projects when the default hourly rate variable changes"""
+    if instance.code == 'PROJECTS_HOURLY_RATE':
+        from .tasks import update_default_revenues
+        # Variables are cached until after this signal, a removed variable is picked up by the cron task
+        rate = instance.value if kwargs['signal'] is post_save else None
+        transaction.on_commit(lambda: update_default_revenues.delay(rate))
@@ -0,0 +1,19 @@
+/* Append the next page of the project activity feed */
+$(document).on('click', '#projects-activity-more', function () {
+    var $button = $(this);
+    $button.prop('disabled', true);
+
+    $.get($button.data('url'), {before: $button.attr('data-before')}, function (response) {
+        if (response.status !== 'success') {
+            $button.prop('disabled', false);
+            return;
+        }
+
+        $('#component-projects-activity tbody').append($(response.data.html).find('tbody tr'));
+        if (response.data.before) {
+            $button.attr('data-before', response.data.before).prop('disabled', false);
+        } else {
+            $button.remove();
+        }
+    });
+});
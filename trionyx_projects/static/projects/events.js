@@ -0,0 +1,147 @@
+/* Patch project backlog and item sidebar rows from polled change events */
+var projectsEvents = (function () {
+    var projectId = null;
+    var eventsUrl = null;
+    var rowsUrl = null;
+    var lastId = null;
+    var poller = null;
+    var pending = null;
+    var timeout = null;
+
+    function resetPending() {
+        pending = {items: {}, worklogs: {}, statItems: {}};
+    }
+
+    function subscribe(id, url, changesUrl, interval) {
+        rowsUrl = changesUrl;
+        if (poller && projectId === id) {
+            return;
+        }
+        clearTimeout(poller);
+
+        projectId = id;
+        eventsUrl = url;
+        lastId = null;
+        resetPending();
+        poller = setTimeout(function () {
+            poll(interval * 1000);
+        }, 0);
+    }
+
+    function poll(delay) {
+        if (!$('#component-projects-backlog').length) {
+            // Project page is closed
+            poller = null;
+            projectId = null;
+            return;
+        }
+
+        var id = projectId;
+        $.get(eventsUrl, lastId === null ? {} : {last_id: lastId}, function (response) {
+            if (response.status !== 'success' || id !== projectId) {
+                return;
+            }
+            lastId = response.data.last_id;
+            $.each(response.data.events, function (index, event) {
+                if (event.type === 'reload') {
+                    trionyx_reload_tab('general');
+                    reloadSidebar();
+                    return false;
+                }
+                queue(event);
+            });
+        }).always(function () {
+            if (id === projectId) {
+                poller = setTimeout(function () {
+                    poll(delay);
+                }, delay);
+            }
+        });
+    }
+
+    function isConnected() {
+        return poller !== null && lastId !== null && $('#component-projects-backlog').length > 0;
+    }
+
+    function reloadTab(tab) {
+        if (!isConnected() && typeof trionyx_reload_tab === 'function') {
+            trionyx_reload_tab(tab);
+        }
+    }
+
+    function queue(event) {
+        if (event.type === 'item') {
+            if (event.action === 'deleted') {
+                $('[data-projects-item="' + event.id + '"]').closest('tr').remove();
+            } else {
+                pending.items[event.id] = true;
+            }
+            pending.statItems[event.id] = true;
+        } else if (event.type === 'worklog') {
+            if (event.action === 'deleted') {
+                $('[data-projects-worklog="' + event.id + '"]').closest('tr').remove();
+            } else if (event.id) {
+                pending.worklogs[event.id] = true;
+            } else if ($('#component-projects-worklogs-' + event.item_id).length) {
+                // Worklogs written in bulk have no id
+                reloadSidebar();
+            }
+            pending.statItems[event.item_id] = true;
+        }
+
+        // Changes of one save are combined in one request
+        clearTimeout(timeout);
+        timeout = setTimeout(flush, 250);
+    }
+
+    function flush() {
+        var changes = pending;
+        resetPending();
+
+        $.get(rowsUrl, {
+            items: Object.keys(changes.items).join(','),
+            worklogs: Object.keys(changes.worklogs).join(','),
+            stat_items: Object.keys(changes.statItems).join(',')
+        }, function (response) {
+            if (response.status !== 'success') {
+                return;
+            }
+            var data = response.data;
+
+            $.each(changes.items, function (id) {
+                patchRow('#component-projects-backlog', '[data-projects-item="' + id + '"]', data.items[id], false);
+            });
+
+            $.each(data.worklogs, function (id, row) {
+                var itemId = data.worklog_items[id];
+                patchRow('#component-projects-worklogs-' + itemId, '[data-projects-worklog="' + id + '"]', row, true);
+            });
+
+            $.each(data.stats, function (key, value) {
+                $('[data-projects-stat="' + key + '"]').html(value);
+            });
+        });
+    }
+
+    function patchRow(table, marker, html, prepend) {
+        var $current = $(marker).closest('tr');
+        if (!html) {
+            $current.remove();
+            return;
+        }
+
+        var $row = $(html).find('tbody tr').first();
+        if ($current.length) {
+            $current.replaceWith($row);
+        } else if (prepend) {
+            $(table + ' tbody').prepend($row);
+        } else {
+            $(table + ' tbody').append($row);
+        }
+    }
+
+    return {
+        subscribe: subscribe,
+        reloadTab: reloadTab
+    };
+})();
@@ -0,0 +1,72 @@
+/* Drag and drop ranking of the project backlog */
+var projectsRanking = (function () {
+    var rankUrl = null;
+    var $dragged = null;
+    var startAfter = null;
+    var rows = '#component-projects-backlog tbody tr';
+
+    function init(url) {
+        rankUrl = url;
+    }
+
+    function itemId($row) {
+        return $row ? $row.find('[data-projects-item]').data('projects-item') : '';
+    }
+
+    $(document).on('mousedown', rows, function () {
+        if (rankUrl) {
+            $(this).attr('draggable', true);
+        }
+    });
+
+    $(document).on('dragstart', rows, function (event) {
+        $dragged = $(this);
+        startAfter = itemId($dragged.prev('tr'));
+        event.originalEvent.dataTransfer.effectAllowed = 'move';
+        event.originalEvent.dataTransfer.setData('text/plain', itemId($dragged));
+    });
+
+    $(document).on('dragover', rows, function (event) {
+        if (!$dragged || this === $dragged[0]) {
+            return;
+        }
+        event.preventDefault();
+
+        var rect = this.getBoundingClientRect();
+        if (event.originalEvent.clientY < rect.top + rect.height / 2) {
+            $(this).before($dragged);
+        } else {
+            $(this).after($dragged);
+        }
+    });
+
+    $(document).on('drop', rows, function (event) {
+        event.preventDefault();
+    });
+
+    $(document).on('dragend', rows, function () {
+        if (!$dragged) {
+            return;
+        }
+
+        var $row = $dragged;
+        $dragged = null;
+        $row.removeAttr('draggable');
+        if (itemId($row.prev('tr')) === startAfter) {
+            return;
+        }
+
+        $.post(rankUrl.replace('/0/', '/' + itemId($row) + '/'), {
+            after: itemId($row.prev('tr')),
+            before: itemId($row.next('tr'))
+        }, function (response) {
+            if (response.status !== 'success') {
+                trionyx_reload_tab('general');
+            }
+        });
+    });
+
+    return {
+        init: init
+    };
+})();
@@ -0,0 +1,127 @@
+/* Weekly timesheet grid, changed cells are saved in one request */
+var projectsTimesheet = (function () {
+    var dataUrl = null;
+    var week = null;
+    var editable = false;
+    var itemIds = [];
+
+    function init(url, start, canEdit) {
+        dataUrl = url;
+        week = start;
+        editable = canEdit;
+        load({});
+    }
+
+    function hours(value) {
+        return value ? Math.round(value * 100) / 100 : '';
+    }
+
+    function handleResponse(response) {
+        if (response.status !== 'success') {
+            alert(response.message);
+            return;
+        }
+        render(response.data);
+    }
+
+    function load(params) {
+        params.week = week;
+        params.items = itemIds.join(',');
+        $.get(dataUrl, params, handleResponse);
+    }
+
+    function render(data) {
+        var $table = $('#projects-timesheet');
+        var $head = $('<tr>').append($('<th>').text('Item'));
+        var $foot = $('<tr>').append($('<th>').text('Total'));
+        var total = 0;
+
+        week = data.week;
+        itemIds = $.map(data.rows, function (row) {
+            return row.item_id;
+        });
+        $('#projects-timesheet-week').text(
+            moment(data.days[0]).format('D MMM') + ' - ' + moment(data.days[data.days.length - 1]).format('D MMM YYYY')
+        );
+
+        $.each(data.days, function (index, day) {
+            $head.append($('<th class="text-center">').text(moment(day).format('dd D')));
+            $foot.append($('<th class="text-center">').text(hours(data.totals[day])));
+            total += data.totals[day];
+        });
+        $head.append($('<th class="text-right">').text('Total'));
+        $foot.append($('<th class="text-right">').text(hours(total)));
+
+        var $body = $('<tbody>');
+        $.each(data.rows, function (index, row) {
+            var rowTotal = 0;
+            var $row = $('<tr>').append($('<td>').text(row.code + ' - ' + row.name));
+            $.each(data.days, function (dayIndex, day) {
+                var value = hours(row.hours[day]);
+                rowTotal += row.hours[day] || 0;
+                $row.append($('<td>').append(
+                    $('<input type="number" min="0" max="24" step="0.25" class="form-control input-sm text-right">')
+                        .val(value)
+                        .attr('data-original', value)
+                        .attr('data-item', row.item_id)
+                        .attr('data-date', day)
+                        .prop('disabled', !editable)
+                ));
+            });
+            $row.append($('<td class="text-right">').text(hours(rowTotal)));
+            $body.append($row);
+        });
+
+        $table.find('thead').empty().append($head);
+        $table.find('tbody').replaceWith($body);
+        $table.find('tfoot').empty().append($foot);
+    }
+
+    function save() {
+        var entries = [];
+        $('#projects-timesheet tbody input').each(function () {
+            var $input = $(this);
+            if (String($input.val()) !== String($input.attr('data-original'))) {
+                entries.push({
+                    item: $input.data('item'),
+                    date: $input.data('date'),
+                    hours: parseFloat($input.val() || 0)
+                });
+            }
+        });
+        if (!entries.length) {
+            return;
+        }
+
+        $.ajax({
+            url: dataUrl + '?' + $.param({week: week, items: itemIds.join(',')}),
+            type: 'POST',
+            contentType: 'application/json',
+            data: JSON.stringify({entries: entries}),
+            success: handleResponse
+        });
+    }
+
+    $(document).on('click', '[data-projects-timesheet-week]', function (event) {
+        event.preventDefault();
+        var offset = parseInt($(this).data('projects-timesheet-week'));
+        week = offset ? moment(week).add(offset, 'days').format('YYYY-MM-DD') : '';
+        itemIds = [];
+        load({});
+    });
+
+    $(document).on('submit', '#projects-timesheet-add', function (event) {
+        event.preventDefault();
+        var $code = $(this).find('[name=code]');
+        if ($code.val()) {
+            load({add: $code.val()});
+            $code.val('');
+        }
+    });
+
+    $(document).on('click', '#projects-timesheet-save', save);
+
+    return {
+        init: init
+    };
+})();
@@ -0,0 +1,51 @@
+"""App tasks"""
+from trionyx.tasks import shared_task
+from trionyx.trionyx.models import AuditLogEntry
+
+
+@shared_task
+def create_auditlog_entry(**entry):
+    """Write auditlog entry that was deferred from the save path"""
+    AuditLogEntry.objects.create(**entry)
+
+
+@shared_task
+def update_default_revenues(rate=None):
+    """Reprice hourly projects when the default hourly rate changed"""
+    from .models import update_default_revenues
+    return update_default_revenues(rate)
+
+
+@shared_task
+def flush_worklog_timers():
+    """Write buffered timer intervals as worklogs"""
+    from .timers import flush_timers
+    return flush_timers()
+
+
+@shared_task
+def rebalance_item_ranks(project_id):
+    """Spread backlog rank keys of project when they get long"""
+    from .models import rebalance_ranks
+    return rebalance_ranks(project_id)
+
+
+@shared_task
+def compact_worklogs():
+    """Merge worklogs before the compact horizon"""
+    from .compaction import compact_worklogs
+    return compact_worklogs()
+
+
+@shared_task
+def roll_worklog_partitions():
+    """Create the worklog partitions ahead and detach old partitions"""
+    from .partitions import roll_partitions
+    return roll_partitions()
+
+
+@shared_task
+def send_notification_digests():
+    """Send the queued notifications as one digest mail per user"""
+    from .notifications import send_digests
+    return send_digests()
@@ -0,0 +1,197 @@
+"""
+Worklog timers, running timers and finished intervals are kept in the cache and flushed as merged worklogs
+
+Timers and intervals are stored per user in the PROJECTS_TIMER_CACHE. Start and stop only touch the keys
+of the user, the index of users with intervals is written when a user gets a first interval after a flush.
+Timers only avoid database writes with a memory cache like Redis or Memcached, on the Trionyx default
+DatabaseCache every start and stop is a cache row write.
+
+An interval is capped at PROJECTS_TIMER_MAX_HOURS, a timer that is left running does not log days of hours.
+Intervals over midnight are split per day. Intervals of items that are deleted while the timer ran are
+dropped on flush, the other intervals are kept when the flush fails.
+"""
+import logging
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .conf import settings as app_settings
+from .models import Item, WorkLog
+
+logger = logging.getLogger(__name__)
+
+TIMER_KEY = 'trionyx-projects-timer-{user_id}'
+INTERVALS_KEY = 'trionyx-projects-timer-intervals-{user_id}'
+USERS_KEY = 'trionyx-projects-timer-users'
+LOCK_KEY = 'trionyx-projects-timer-lock-{key}'
+
+
+def get_cache():
+    return caches[app_settings.TIMER_CACHE]
+
+
+@contextmanager
+def lock(key, timeout=10):
+    """Lock on the timer cache, add is atomic on the memory caches"""
+    cache = get_cache()
+    lock_key = LOCK_KEY.format(key=key)
+    while not cache.add(lock_key, 'true', timeout):
+        time.sleep(0.05)
+    try:
+        yield
+    finally:
+        cache.delete(lock_key)
+
+
+def get_running_timer(user):
+    """Get running timer of user as dict with item_id and started_at timestamp"""
+    return get_cache().get(TIMER_KEY.format(user_id=user.id))
+
+
+def start_timer(item, user):
+    """Start timer on item, a running timer of the user is stopped first"""
+    with lock(user.id):
+        _stop_timer(user)
+        get_cache().set(TIMER_KEY.format(user_id=user.id), {
+            'item_id': item.id,
+            'started_at': time.time(),
+        }, None)
+
+
+def stop_timer(user):
+    """Stop running timer of user and buffer the intervals, gives back the intervals"""
+    with lock(user.id):
+        return _stop_timer(user)
+
+
+def _stop_timer(user):
+    cache = get_cache()
+    timer = cache.get(TIMER_KEY.format(user_id=user.id))
+    if not timer:
+        return None
+
+    cache.delete(TIMER_KEY.format(user_id=user.id))
+    intervals = split_interval(user.id, timer['item_id'], timer['started_at'], time.time())
+    _buffer_intervals(user.id, intervals)
+    return intervals
+
+
+def split_interval(user_id, item_id, started_at, stopped_at):
+    """Split interval per local day, the total is capped at TIMER_MAX_HOURS"""
+    stopped_at = min(stopped_at, started_at + float(app_settings.TIMER_MAX_HOURS) * 3600)
+    start = timezone.localtime(datetime.fromtimestamp(started_at, timezone.utc))
+    end = timezone.localtime(datetime.fromtimestamp(stopped_at, timezone.utc))
+
+    intervals = []
+    while start < end:
+        next_day = timezone.make_aware(datetime.combine(start.date() + timedelta(days=1), datetime.min.time()))
+        until = min(end, next_day)
+        intervals.append({
+            'user_id': user_id,
+            'item_id': item_id,
+            'date': start.date().isoformat(),
+            'seconds': (until - start).total_seconds(),
+        })
+        start = until
+    return intervals
+
+
+def buffer_intervals(intervals):
+    """Add intervals to the flush buffers of their users"""
+    per_user = defaultdict(list)
+    for interval in intervals:
+        per_user[interval['user_id']].append(interval)
+
+    for user_id, user_intervals in per_user.items():
+        with lock(user_id):
+            _buffer_intervals(user_id, user_intervals)
+
+
+def _buffer_intervals(user_id, intervals):
+    if not intervals:
+        return
+
+    cache = get_cache()
+    buffered = cache.get(INTERVALS_KEY.format(user_id=user_id))
+    cache.set(INTERVALS_KEY.format(user_id=user_id), [*(buffered or []), *intervals], None)
+    if buffered is None:
+        # First interval since the last flush, the flush removes the user from the index before it reads the buffers
+        with lock(USERS_KEY):
+            cache.set(USERS_KEY, [*cache.get(USERS_KEY, []), user_id], None)
+
+
+def pop_intervals():
+    """Take the buffered intervals of all users"""
+    cache = get_cache()
+    with lock(USERS_KEY):
+        user_ids = set(cache.get(USERS_KEY, []))
+        cache.delete(USERS_KEY)
+
+    intervals = []
+    for user_id in user_ids:
+        with lock(user_id):
+            intervals.extend(cache.get(INTERVALS_KEY.format(user_id=user_id)) or [])
+            cache.delete(INTERVALS_KEY.format(user_id=user_id))
+    return intervals
+
+
+def flush_timers():
+    """Write buffered intervals as worklogs merged per user, item and day, gives back the number of written worklogs"""
+    intervals = pop_intervals()
+    if not intervals:
+        return 0
+
+    item_ids = set(Item.objects.filter(id__in={interval['item_id'] for interval in intervals}).values_list('id', flat=True))
+    dropped = [interval for interval in intervals if interval['item_id'] not in item_ids]
+    if dropped:
+        logger.warning(f'Dropped {len(dropped)} timer intervals of deleted items {sorted({row["item_id"] for row in dropped})}')
+        intervals = [interval for interval in intervals if interval['item_id'] in item_ids]
+
+    try:
+        merged = defaultdict(float)
+        for interval in intervals:
+            merged[(interval['user_id'], interval['item_id'], interval['date'])] += interval['seconds']
+
+        existing = {
+            (worklog.created_by_id, worklog.item_id, worklog.date.isoformat()): worklog
+            for worklog in WorkLog.objects.filter(
+                timer=True,
+                invoiced_on__isnull=True,
+                created_by_id__in={key[0] for key in merged},
+                item_id__in={key[1] for key in merged},
+                date__in={parse_date(key[2]) for key in merged},
+            )
+        }
+
+        worklogs = []
+        for (user_id, item_id, day), seconds in merged.items():
+            hours = round(seconds / 3600, 4)
+            worklog = existing.get((user_id, item_id, day))
+
+            if worklog:
+                worklog.worked = round(worklog.worked + hours, 4)
+                worklog.billed = None
+            elif hours > 0:
+                worklog = WorkLog(
+                    item_id=item_id,
+                    created_by_id=user_id,
+                    date=parse_date(day),
+                    worked=hours,
+                    timer=True,
+                )
+            else:
+                continue
+            worklogs.append(worklog)
+
+        WorkLog.objects.bulk_log(worklogs)
+    except Exception:
+        # Keep intervals for the next flush
+        buffer_intervals(intervals)
+        raise
+
+    return len(worklogs)
@@ -0,0 +1,143 @@
+"""Weekly timesheet of a user, worklogs pivoted per item and day and written back in one batch"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Item, WorkLog
+
+DAYS = 7
+
+
+class TimesheetError(ValueError):
+    """Raised when timesheet entries can not be saved"""
+
+
+def get_week_start(day=None):
+    """Monday of the week of given day"""
+    day = day or timezone.now().date()
+    return day - timedelta(days=day.weekday())
+
+
+def get_timesheet(user, week_start, extra_item_ids=None):
+    """
+    Hours of user per item and day of the week, with one grouped query.
+
+    Rows are the items with worklogs in the week and the given extra items.
+    """
+    days = [week_start + timedelta(days=index) for index in range(DAYS)]
+    rows = {}
+
+    for row in WorkLog.objects.filter(
+        created_by=user,
+        date__range=(days[0], days[-1]),
+    ).values(
+        'item', 'item__code', 'item__name', 'item__project', 'item__project__code', 'date',
+    ).annotate(worked=Sum('worked')).order_by():
+        get_row(rows, row['item'], row['item__code'], row['item__name'], row['item__project'], row['item__project__code'])[
+            'hours'][row['date'].isoformat()] = round(row['worked'], 4)
+
+    extra_item_ids = set(extra_item_ids or []) - set(rows)
+    for item_id, code, name, project_id, project_code in Item.objects.filter(id__in=extra_item_ids).values_list(
+            'id', 'code', 'name', 'project', 'project__code'):
+        get_row(rows, item_id, code, name, project_id, project_code)
+
+    totals = defaultdict(float)
+    for row in rows.values():
+        for day, hours in row['hours'].items():
+            totals[day] += hours
+
+    return {
+        'week': days[0].isoformat(),
+        'days': [day.isoformat() for day in days],
+        'rows': sorted(rows.values(), key=lambda row: (row['project_code'], row['item_id'])),
+        'totals': {day.isoformat(): round(totals[day.isoformat()], 4) for day in days},
+    }
+
+
+def get_row(rows, item_id, code, name, project_id, project_code):
+    """Get or add timesheet row of item"""
+    if item_id not in rows:
+        rows[item_id] = {
+            'item_id': item_id,
+            'code': code,
+            'name': name,
+            'project_id': project_id,
+            'project_code': project_code,
+            'hours': {},
+        }
+    return rows[item_id]
+
+
+def save_timesheet(user, entries):
+    """
+    Set hours of user per item and day, entries are (item_id, date, hours) with the new total of the cell.
+
+    The difference with the current total is added to the newest uninvoiced worklog of the cell or
+    written as a new worklog, lowered hours are taken from the newest uninvoiced worklogs first.
+    All cells are written with one batched worklog write, emptied worklogs are deleted with WorkLog.delete
+    so their activity and events are recorded. Gives back the number of changed cells.
+    """
+    cells = {(int(item_id), day): round(float(hours or 0.0), 4) for item_id, day, hours in entries}
+    if not cells:
+        return 0
+    if any(hours < 0 or hours > 24 for hours in cells.values()):
+        raise TimesheetError('Hours of a day must be between 0 and 24')
+
+    with transaction.atomic():
+        # Lock items so the cell totals do not change while they are compared
+        items = Item.objects.select_for_update().in_bulk({item_id for item_id, _ in cells})
+        if len(items) != len({item_id for item_id, _ in cells}):
+            raise TimesheetError('Unknown item in timesheet')
+
+        worklogs = defaultdict(list)
+        for worklog in WorkLog.objects.filter(
+            created_by=user,
+            item_id__in=items.keys(),
+            date__in={day for _, day in cells},
+        ).order_by('-invoiced_on', 'id'):
+            worklogs[(worklog.item_id, worklog.date)].append(worklog)
+
+        changed, deleted = [], []
+        changed_cells = 0
+        for (item_id, day), hours in cells.items():
+            cell = worklogs.get((item_id, day), [])
+            delta = round(hours - sum(worklog.worked for worklog in cell), 4)
+            if not delta:
+                continue
+            changed_cells += 1
+
+            editable = [worklog for worklog in cell if not worklog.invoiced_on]
+            if delta > 0 and editable:
+                editable[-1].worked = round(editable[-1].worked + delta, 4)
+                changed.append(editable[-1])
+            elif delta > 0:
+                changed.append(WorkLog(item=items[item_id], date=day, worked=delta, created_by=user))
+            else:
+                for worklog in reversed(editable):
+                    take = min(worklog.worked, -delta)
+                    remaining = round(worklog.worked - take, 4)
+                    delta = round(delta + take, 4)
+                    if remaining:
+                        worklog.worked = remaining
+                        changed.append(worklog)
+                    else:
+                        # Deleted worklogs keep their hours for the activity
+                        deleted.append(worklog)
+                    if not delta:
+                        break
+                if delta:
+                    raise TimesheetError(f'Hours of {items[item_id].code} on {day} are invoiced and can not be lowered')
+
+        for worklog in changed:
+            # Billed hours are allocated again for the new worked hours
+            worklog.billed = None
+
+        for worklog in deleted:
+            worklog.item = items[worklog.item_id]
+            worklog.delete()
+        WorkLog.objects.bulk_log(changed)
+
+    return changed_cells
@@ -0,0 +1,306 @@
+"""
+Portable project export and import
+
+A project is written as gzip compressed JSON Lines: a header, the project, its hourly rates, items,
+invoice lines, dependencies, comments and worklogs. Every line is one row, rows are read and written in chunks so memory
+does not grow with the number of comments and worklogs. Import gives the items new ids and codes in the new
+project and inserts the rows in batches without the save side effects, schedule and stats are calculated
+once at the end. Users are matched on email, relations to other models, alerts and activity are not exported.
+"""
+import gzip
+import json
+import sys
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from .dependencies import DependencyGraph
+from .models import Project, HourlyRate, Item, InvoiceLine, ItemDependency, Comment, WorkLog, WorkLogArchive
+
+VERSION = 1
+
+MODELS = {
+    'hourly_rate': HourlyRate,
+    'item': Item,
+    'invoice_line': InvoiceLine,
+    'dependency': ItemDependency,
+    'comment': Comment,
+    'worklog': WorkLog,
+}
+
+# Relations that are written as reference of the row and are remapped on import
+EXCLUDE_FIELDS = {
+    'id', 'created_by', 'project', 'item', 'blocked_by', 'critical_predecessor', 'for_object_type', 'for_object_id',
+    'invoice_line',
+}
+
+
+class TransferError(ValueError):
+    """Raised when a project export can not be imported"""
+
+
+@contextmanager
+def open_archive(path, mode='r'):
+    """Open gzip JSON Lines archive for text read or write, - is stdin or stdout"""
+    if path == '-':
+        stream = sys.stdin.buffer if mode == 'r' else sys.stdout.buffer
+        with gzip.open(stream, f'{mode}t', encoding='utf-8') as fileobj:
+            yield fileobj
+    else:
+        with gzip.open(path, f'{mode}t', encoding='utf-8') as fileobj:
+            yield fileobj
+
+
+def get_fields(model):
+    """Concrete fields of model that are exported as value"""
+    return [field for field in model._meta.concrete_fields if field.name not in EXCLUDE_FIELDS]
+
+
+def write(fileobj, record):
+    fileobj.write(json.dumps(record, cls=DjangoJSONEncoder, separators=(',', ':')))
+    fileobj.write('\n')
+
+
+def export_rows(fileobj, name, queryset, references, chunk_size, archive=False):
+    """
+    Write rows of queryset, references are the relation lookups written next to the field values.
+
+    With archive the originals of compacted worklogs are written uncompressed with the worklog.
+    """
+    fields = [field.attname for field in get_fields(queryset.model)]
+    lookups = [*references.values(), 'archive__data'] if archive else references.values()
+    count = 0
+    for row in queryset.order_by('id').values('id', *fields, *lookups).iterator(chunk_size=chunk_size):
+        record = {'model': name, 'id': row.pop('id')}
+        for reference, lookup in references.items():
+            record[reference] = row.pop(lookup)
+        data = row.pop('archive__data', None)
+        if data is not None:
+            record['archive'] = WorkLogArchive(data=bytes(data)).get_worklogs()
+        record['fields'] = row
+        write(fileobj, record)
+        count += 1
+    return count
+
+
+def export_project(project, fileobj, chunk_size=1000):
+    """Write project with its items, comments and worklogs to the text file, gives back the row count per model"""
+    write(fileobj, {'model': 'header', 'version': VERSION, 'code': project.code})
+    export_rows(fileobj, 'project', Project.objects.filter(id=project.id), {'created_by': 'created_by__email'}, chunk_size)
+
+    counts = {}
+    counts['hourly_rate'] = export_rows(fileobj, 'hourly_rate', HourlyRate.objects.filter(project=project), {
+        'created_by': 'created_by__email',
+    }, chunk_size)
+    counts['item'] = export_rows(fileobj, 'item', Item.objects.filter(project=project), {
+        'created_by': 'created_by__email',
+    }, chunk_size)
+    counts['invoice_line'] = export_rows(fileobj, 'invoice_line', InvoiceLine.objects.filter(project=project), {
+        'created_by': 'created_by__email',
+        'item': 'item_id',
+    }, chunk_size)
+    counts['dependency'] = export_rows(fileobj, 'dependency', ItemDependency.objects.filter(item__project=project), {
+        'created_by': 'created_by__email',
+        'item': 'item_id',
+        'blocked_by': 'blocked_by_id',
+    }, chunk_size)
+    counts['comment'] = export_rows(fileobj, 'comment', Comment.objects.filter(item__project=project), {
+        'created_by': 'created_by__email',
+        'item': 'item_id',
+    }, chunk_size)
+    counts['worklog'] = export_rows(fileobj, 'worklog', WorkLog.objects.filter(item__project=project), {
+        'created_by': 'created_by__email',
+        'item': 'item_id',
+        'invoice_line': 'invoice_line_id',
+    }, chunk_size, archive=True)
+    return counts
+
+
+class ProjectImporter:
+    """Import rows of a project export in order, rows of the same model are inserted per chunk"""
+
+    def __init__(self, code=None, name=None, chunk_size=1000):
+        self.code = code
+        self.name = name
+        self.chunk_size = chunk_size
+        self.project = None
+        self.old_code = None
+        self.item_ids = {}
+        self.invoice_line_ids = {}
+        self.user_ids = {}
+        self.buffer_model = None
+        self.buffer = []
+        self.counts = {name: 0 for name in MODELS}
+
+    def add(self, record):
+        """Add exported row"""
+        if record['model'] == 'project':
+            return self.create_project(record)
+        if record['model'] not in MODELS:
+            raise TransferError(f'Unknown row {record["model"]}')
+        if self.project is None:
+            raise TransferError('Project row is missing')
+
+        if self.buffer_model != record['model'] or len(self.buffer) >= self.chunk_size:
+            self.flush()
+            self.buffer_model = record['model']
+        self.buffer.append(record)
+
+    def finish(self):
+        """Insert remaining rows and calculate schedule and stats"""
+        self.flush()
+        self.project.save_stats('item_increment_id')
+
+        graph = DependencyGraph.load(self.project.id)
+        graph.rebuild()
+        graph.save()
+        self.project.update_item_totals()
+        self.project.update_worked_totals()
+        self.project.update_revenue()
+
+    def get_user_ids(self, records):
+        """Get user id of the exported emails, unknown users are empty"""
+        emails = {record.get('created_by') for record in records} - set(self.user_ids) - {None}
+        if emails:
+            self.user_ids.update({email: None for email in emails})
+            self.user_ids.update(get_user_model().objects.filter(email__in=emails).values_list('email', 'id'))
+        return [self.user_ids.get(record.get('created_by')) for record in records]
+
+    def build(self, model, record, user_id, **relations):
+        """Make model instance of exported row"""
+        values = record['fields']
+        instance = model(
+            **{field.attname: field.to_python(values[field.attname]) for field in get_fields(model) if field.attname in values},
+            **relations,
+        )
+        instance.created_by_id = user_id
+        return instance
+
+    def create_project(self, record):
+        """Create project with the normal save, the new project is indexed and audited like any new project"""
+        if self.project is not None:
+            raise TransferError('Export has more than one project')
+
+        project = self.build(Project, record, self.get_user_ids([record])[0])
+        self.old_code = project.code
+        project.code = (self.code or project.code).upper()
+        project.name = self.name or project.name
+        if Project.objects.filter(code=project.code).exists():
+            raise TransferError(f'Project with code {project.code} already exists, import it with another code')
+
+        project.save()
+        self.project = project
+
+    def get_item_code(self, code):
+        """Code of item in the new project, codes that do not follow the project code get a new number"""
+        prefix = f'{self.old_code}-'
+        if code.startswith(prefix):
+            return f'{self.project.code}-{code[len(prefix):]}'
+        self.project.item_increment_id += 1
+        return f'{self.project.code}-{self.project.item_increment_id}'
+
+    def flush(self):
+        """Insert buffered rows"""
+        records, self.buffer = self.buffer, []
+        if not records:
+            return
+
+        model = MODELS[self.buffer_model]
+        user_ids = self.get_user_ids(records)
+        if self.buffer_model == 'hourly_rate':
+            insert(HourlyRate, [
+                self.build(HourlyRate, record, user_id, project_id=self.project.id) for record, user_id in zip(records, user_ids)
+            ])
+        elif self.buffer_model == 'item':
+            items = [
+                self.build(Item, record, user_id, project_id=self.project.id) for record, user_id in zip(records, user_ids)
+            ]
+            codes = {}
+            for item, record in zip(items, records):
+                item.code = self.get_item_code(item.code)
+                codes[item.code] = record['id']
+            insert(Item, items)
+
+            # Bulk inserts only give back ids on some databases, codes are unique within the project
+            for code, item_id in Item.objects.filter(project=self.project, code__in=codes.keys()).values_list('code', 'id'):
+                self.item_ids[codes[code]] = item_id
+        elif self.buffer_model == 'invoice_line':
+            for record, user_id in zip(records, user_ids):
+                # Worklogs reference the new line id, invoice lines are few and inserted one by one
+                line = self.build(
+                    InvoiceLine, record, user_id,
+                    project_id=self.project.id, item_id=self.get_item_id(record['item']) if record['item'] else None)
+                self.invoice_line_ids[record['id']] = InvoiceLine._base_manager._insert(
+                    [line], fields=insert_fields(InvoiceLine), return_id=True, raw=True)
+        elif self.buffer_model == 'dependency':
+            insert(ItemDependency, [
+                self.build(
+                    ItemDependency, record, user_id,
+                    item_id=self.get_item_id(record['item']), blocked_by_id=self.get_item_id(record['blocked_by']))
+                for record, user_id in zip(records, user_ids)
+            ])
+        else:
+            instances = [
+                self.build(model, record, user_id, item_id=self.get_item_id(record['item']))
+                for record, user_id in zip(records, user_ids)
+            ]
+            if model is WorkLog:
+                for worklog, record in zip(instances, records):
+                    worklog.invoice_line_id = self.invoice_line_ids.get(record.get('invoice_line'))
+            insert(model, [instance for instance, record in zip(instances, records) if not record.get('archive')])
+
+            for worklog, record in zip(instances, records):
+                if record.get('archive'):
+                    # Archive needs the new worklog id, compacted worklogs with archive are inserted one by one
+                    worklog.id = WorkLog._base_manager._insert(
+                        [worklog], fields=insert_fields(WorkLog), return_id=True, raw=True)
+                    for original in record['archive']:
+                        original['created_by'] = worklog.created_by_id
+                    archive = WorkLogArchive(worklog=worklog)
+                    archive.set_worklogs(record['archive'])
+                    archive.save()
+
+        self.counts[self.buffer_model] += len(records)
+
+    def get_item_id(self, old_id):
+        if old_id not in self.item_ids:
+            raise TransferError(f'Row references unknown item {old_id}')
+        return self.item_ids[old_id]
+
+
+def insert_fields(model):
+    return [field for field in model._meta.concrete_fields if not field.primary_key]
+
+
+def insert(model, instances):
+    """Insert rows with their own timestamps and verbose names, no save methods and signals are run"""
+    fields = insert_fields(model)
+    batch_size = max(connection.ops.bulk_batch_size(fields, instances), 1)
+    for index in range(0, len(instances), batch_size):
+        model._base_manager._insert(instances[index:index + batch_size], fields=fields, raw=True)
+
+
+def import_project(fileobj, code=None, name=None, chunk_size=1000):
+    """
+    Import project export from the text file in one transaction, gives back the new project and the row count per model.
+
+    The project gets the exported code unless another code is given, the code must not exist.
+    """
+    records = (json.loads(line) for line in fileobj if line.strip())
+    header = next(records, None)
+    if not header or header.get('model') != 'header':
+        raise TransferError('File is not a project export')
+    if header.get('version') != VERSION:
+        raise TransferError(f'Export version {header.get("version")} is not supported')
+
+    importer = ProjectImporter(code, name, chunk_size)
+    with transaction.atomic():
+        for record in records:
+            importer.add(record)
+        if importer.project is None:
+            raise TransferError('Project row is missing')
+        importer.finish()
+
+    return importer.project, importer.counts
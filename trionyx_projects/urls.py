@@ -0,0 +1,20 @@
+"""App urls"""
+from django.urls import path
+
+from . import views
+from .models import Project, Item
+
+app_name = 'trionyx_projects'
+
+urlpatterns = [
+    path('projects/item/<int:pk>/timer/', views.ItemTimerDialog.as_view(), name='item-timer'),
+    path('projects/item/<int:pk>/rank/', views.ItemRankJsendView.as_view(), name='item-rank'),
+    path('projects/item/<int:pk>/subscribe/', views.SubscriptionDialog.as_view(model=Item), name='item-subscribe'),
+    path('projects/project/<int:pk>/subscribe/', views.SubscriptionDialog.as_view(model=Project), name='project-subscribe'),
+    path('projects/project/<int:pk>/move-items/', views.ProjectMoveItemsDialog.as_view(), name='project-move-items'),
+    path('projects/project/<int:pk>/events/', views.ProjectEventsView.as_view(), name='project-events'),
+    path('projects/project/<int:pk>/activity/', views.ProjectActivityJsendView.as_view(), name='project-activity'),
+    path('projects/timesheet/', views.TimesheetView.as_view(), name='timesheet'),
+    path('projects/timesheet/data/', views.TimesheetJsendView.as_view(), name='timesheet-data'),
+    path('projects/project/<int:pk>/rows/', views.ProjectRowsJsendView.as_view(), name='project-rows'),
+]
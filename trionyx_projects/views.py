@@ -0,0 +1,265 @@
+"""App views"""
+import json
+
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_date
+from django.views.generic import TemplateView
+from trionyx.forms.helper import FormHelper
+from trionyx.views import DialogView, JsendView
+
+from .activity import get_feed
+from .events import get_backend, get_channel
+from .models import Project, Item, WorkLog
+from .timers import get_running_timer, start_timer, stop_timer
+
+
+def parse_ids(value):
+    """Parse comma separated ids"""
+    return [int(part) for part in (value or '').split(',') if part.strip().isdigit()]
+
+
+class ItemTimerDialog(DialogView):
+    """Start or stop the worklog timer of the current user on an item"""
+
+    model = Item
+    permission = 'trionyx_projects.add_worklog'
+
+    def display_dialog(self):
+        timer = get_running_timer(self.request.user)
+        running = timer and timer['item_id'] == self.object.id
+
+        return {
+            'title': f'{"Stop" if running else "Start"} timer: {self.object}',
+            'content': '<p>{}</p>'.format(
+                'Time is written as worklog when the timer is stopped.' if running
+                else 'A running timer on another item is stopped first.'
+            ),
+            'submit_label': 'Stop' if running else 'Start',
+        }
+
+    def handle_dialog(self):
+        timer = get_running_timer(self.request.user)
+        if timer and timer['item_id'] == self.object.id:
+            stop_timer(self.request.user)
+        else:
+            start_timer(self.object, self.request.user)
+
+        return {
+            'success': True,
+            'close': True,
+        }
+
+
+class SubscriptionDialog(DialogView):
+    """Subscribe the current user to the comment and worklog digest of a project or item"""
+
+    def display_dialog(self):
+        from .notifications import is_subscribed
+        subscribed = is_subscribed(self.request.user, self.object)
+
+        return {
+            'title': f'{"Unsubscribe from" if subscribed else "Subscribe to"} {self.object}',
+            'content': '<p>{}</p>'.format(
+                'You no longer receive the comment and worklog digest.' if subscribed
+                else 'New comments and worklogs are mailed to you in a periodic digest.'
+            ),
+            'submit_label': 'Unsubscribe' if subscribed else 'Subscribe',
+        }
+
+    def handle_dialog(self):
+        from .notifications import is_subscribed, subscribe, unsubscribe
+        if is_subscribed(self.request.user, self.object):
+            unsubscribe(self.request.user, self.object)
+        else:
+            subscribe(self.request.user, self.object)
+
+        return {
+            'success': True,
+            'close': True,
+        }
+
+
+class ProjectMoveItemsDialog(DialogView):
+    """Move selected items of the project to another project"""
+
+    model = Project
+    permission = 'trionyx_projects.change_item'
+
+    def display_dialog(self, form=None, success_message=None):
+        from .model_forms import MoveItemsForm
+        form = form or MoveItemsForm(self.object)
+        form.helper = FormHelper(form)
+        form.helper.form_tag = False
+
+        return {
+            'title': form.get_title(),
+            'content': self.render_to_string('trionyx/dialog/model_form.html', {
+                'form': form,
+                'success_message': success_message,
+            }),
+            'submit_label': form.get_submit_label(),
+            'success': bool(success_message),
+        }
+
+    def handle_dialog(self):
+        from .model_forms import MoveItemsForm
+        from .moves import move_items, MoveError
+        form = MoveItemsForm(self.object, data=self.request.POST)
+
+        success_message = None
+        if form.is_valid():
+            try:
+                count = move_items(form.cleaned_data['items'], form.cleaned_data['target'])
+                success_message = f'{count} items are moved to {form.cleaned_data["target"]}'
+            except MoveError as e:
+                form.add_error(None, str(e))
+
+        return self.display_dialog(form=form, success_message=success_message)
+
+
+class ProjectEventsView(JsendView):
+    """
+    Give project change events after the last id of the client, the page polls every EVENTS_POLL_INTERVAL seconds.
+
+    Answered at once without waiting for events, so a poll holds no worker thread.
+    """
+
+    def handle_request(self, request, pk):
+        if not request.user.has_perm('trionyx_projects.view_project'):
+            raise PermissionDenied()
+
+        project = get_object_or_404(Project, id=pk)
+        backend = get_backend()
+        channel = get_channel(project.id)
+
+        try:
+            last_id = int(request.GET['last_id'])
+        except (KeyError, ValueError):
+            return {'last_id': backend.get_last_id(channel), 'events': []}
+
+        events = backend.fetch(channel, last_id)
+        return {
+            'last_id': events[-1][0] if events else last_id,
+            'events': [event for _, event in events],
+        }
+
+
+class ProjectRowsJsendView(JsendView):
+    """Give rendered backlog and worklog rows and totals of changed objects"""
+
+    def handle_request(self, request, pk):
+        # layouts imports trionyx.urls, that includes these views
+        from .project_layouts import backlog_table, worklog_table, get_stats
+
+        if not request.user.has_perm('trionyx_projects.view_project'):
+            raise PermissionDenied()
+
+        project = Project.objects.get(id=pk)
+        items = project.items.filter(id__in=parse_ids(request.GET.get('items')))
+        worklogs = WorkLog.objects.none()
+        if request.user.has_perm('trionyx_projects.view_worklog'):
+            worklogs = WorkLog.objects.filter(
+                item__project=project,
+                id__in=parse_ids(request.GET.get('worklogs')),
+            ).select_related('created_by')
+
+        stats = {}
+        for obj in [project, *project.items.filter(id__in=parse_ids(request.GET.get('stat_items')))]:
+            for field, value in get_stats(obj).items():
+                stats[f'{obj._meta.model_name}-{obj.id}-{field}'] = value
+
+        return {
+            'items': {item.id: backlog_table([item]).render({}, request) for item in items},
+            'worklogs': {worklog.id: worklog_table(request, [worklog]).render({}, request) for worklog in worklogs},
+            'worklog_items': {worklog.id: worklog.item_id for worklog in worklogs},
+            'stats': stats,
+        }
+
+
+class ProjectActivityJsendView(JsendView):
+    """Give rendered activity rows of the page before given activity id"""
+
+    def handle_request(self, request, pk):
+        from .project_layouts import activity_table
+
+        if not request.user.has_perm('trionyx_projects.view_project'):
+            raise PermissionDenied()
+
+        activities, before = get_feed(before=int(request.GET.get('before') or 0), project_id=pk)
+        return {
+            'html': activity_table(activities).render({}, request),
+            'before': before,
+        }
+
+
+class ItemRankJsendView(JsendView):
+    """Move item in the backlog between the given items"""
+
+    def handle_request(self, request, pk):
+        if request.method != 'POST' or not request.user.has_perm('trionyx_projects.change_item'):
+            raise PermissionDenied()
+
+        item = Item.objects.get(id=pk)
+        neighbours = Item.objects.filter(project_id=item.project_id).in_bulk(
+            parse_ids(','.join([request.POST.get('after', ''), request.POST.get('before', '')]))
+        )
+        item.move(
+            after=neighbours.get(int(request.POST.get('after') or 0)),
+            before=neighbours.get(int(request.POST.get('before') or 0)),
+        )
+
+        return {
+            'rank': item.rank,
+        }
+
+
+class TimesheetView(TemplateView):
+    """Weekly timesheet of the current user"""
+
+    template_name = 'trionyx_projects/timesheet.html'
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.has_perm('trionyx_projects.view_worklog'):
+            raise PermissionDenied()
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        from .timesheets import get_week_start
+        return super().get_context_data(
+            week=get_week_start(parse_date(self.request.GET.get('week') or '')),
+            can_edit=self.request.user.has_perms(['trionyx_projects.add_worklog', 'trionyx_projects.change_worklog']),
+            **kwargs
+        )
+
+
+class TimesheetJsendView(JsendView):
+    """Give the weekly timesheet of the current user, posted hours of a week are saved in one batch"""
+
+    def handle_request(self, request):
+        from .timesheets import TimesheetError, get_week_start, get_timesheet, save_timesheet
+        if not request.user.has_perm('trionyx_projects.view_worklog'):
+            raise PermissionDenied()
+
+        week = get_week_start(parse_date(request.GET.get('week') or ''))
+        item_ids = parse_ids(request.GET.get('items'))
+
+        if request.method == 'POST':
+            if not request.user.has_perms(['trionyx_projects.add_worklog', 'trionyx_projects.change_worklog']):
+                raise PermissionDenied()
+
+            entries = []
+            for entry in json.loads(request.body)['entries']:
+                day = parse_date(entry['date'])
+                if not day or get_week_start(day) != week:
+                    raise TimesheetError(f'Date {entry["date"]} is not in week {week}')
+                entries.append((int(entry['item']), day, entry['hours']))
+            save_timesheet(request.user, entries)
+
+        if request.GET.get('add'):
+            item = Item.objects.filter(code__iexact=request.GET['add'].strip()).values_list('id', flat=True).first()
+            if not item:
+                raise TimesheetError(f'No item with code {request.GET["add"]}')
+            item_ids.append(item)
+
+        return get_timesheet(request.user, week, item_ids)
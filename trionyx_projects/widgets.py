@@ -0,0 +1,31 @@
+"""App dashboard widgets"""
+from trionyx.urls import model_url
+from trionyx.widgets import BaseWidget
+
+from .models import Project
+
+
+class ProjectCapacityWidget(BaseWidget):
+    """Forecast of the open backlog of projects at the current velocity"""
+
+    code = 'project_capacity'
+    name = 'Project capacity'
+    description = 'Forecast completion of the open backlog and the load of users against the deadlines'
+    permission = 'trionyx_projects.view_project'
+    default_width = 6
+    default_height = 30
+
+    def get_data(self, request, config):
+        from .capacity import get_plan
+        plan = get_plan()
+        return {
+            'projects': [
+                {
+                    **{key: value for key, value in forecast.items() if key != 'users'},
+                    'deadline': forecast['deadline'].isoformat() if forecast['deadline'] else '',
+                    'forecast': forecast['forecast'].isoformat() if forecast['forecast'] else '',
+                    'url': model_url(Project(pk=forecast['project_id']), 'view'),
+                } for forecast in plan['projects']
+            ],
+            'users': [user for user in plan['users'] if user['overbooked']],
+        }